@@ -18,6 +18,63 @@ if DATABASE_URL.startswith("postgres://"):
 
 print(f"🔗 DATABASE_URL: {DATABASE_URL}")
 
+# Сколько апдейтов обрабатывается одновременно (апдейты одного чата — по очереди)
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "20"))
+
+# Режим получения апдейтов: polling (по умолчанию) или webhook
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+# Публичный адрес бота (https://example.com), к нему добавляется WEBHOOK_PATH
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+# Секрет для заголовка X-Telegram-Bot-Api-Secret-Token (одинаковый на всех репликах)
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+
+# Хранилище состояний FSM: memory (теряется при рестарте), sql (таблица fsm_states) или redis
+FSM_STORAGE = os.getenv("FSM_STORAGE", "sql").lower()
+FSM_STATE_TTL = int(os.getenv("FSM_STATE_TTL", "86400"))  # секунд; брошенные анкеты удаляются
+FSM_FLUSH_INTERVAL = float(os.getenv("FSM_FLUSH_INTERVAL", "0.5"))  # секунд между пакетными записями
+# Кэш чтения FSM — только для одного процесса в режиме polling; 0 — читать состояние из БД на каждом апдейте
+FSM_READ_CACHE_TTL = float(os.getenv("FSM_READ_CACHE_TTL", "0"))  # секунд
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Хранилище лимитов частоты: memory (свое у каждого процесса), sql (таблица rate_limits) или redis
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_SYNC_INTERVAL = float(os.getenv("RATE_LIMIT_SYNC_INTERVAL", "1.0"))  # секунд между синхронизациями
+# Временные блокировки хранятся в таблице user_blocks; блокировки других процессов подтягиваются с этим интервалом
+BLOCK_LIST_REFRESH = float(os.getenv("BLOCK_LIST_REFRESH", "60"))  # секунд
+
+# Асинхронный режим работы с БД (AsyncSession поверх asyncpg/aiosqlite)
+# Если выключен, синхронные запросы выполняются в пуле потоков
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
+
+# Вывод всех SQL-запросов в лог (только для отладки)
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"
+# Метрики SQL-запросов и журнал медленных запросов
+SQL_METRICS = os.getenv("SQL_METRICS", "true").lower() == "true"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+# Кэш пользователей в памяти процесса
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "300"))  # секунд
+
+# Отрисованные карточки профилей (ключ включает profile_version, поэтому TTL только ограничивает память)
+PROFILE_CARD_CACHE_SIZE = int(os.getenv("PROFILE_CARD_CACHE_SIZE", "20000"))
+PROFILE_CARD_CACHE_TTL = int(os.getenv("PROFILE_CARD_CACHE_TTL", "3600"))  # секунд
+
+# Кому пользователь уже отправил запрос (исключаются из поиска)
+REQUESTED_CACHE_SIZE = int(os.getenv("REQUESTED_CACHE_SIZE", "10000"))
+REQUESTED_CACHE_TTL = int(os.getenv("REQUESTED_CACHE_TTL", "1800"))  # секунд
+
+# Индекс кандидатов в памяти (нужен numpy); пока он не загружен, поиск идет в SQL
+CANDIDATE_INDEX = os.getenv("CANDIDATE_INDEX", "false").lower() == "true"
+CANDIDATE_INDEX_REFRESH = int(os.getenv("CANDIDATE_INDEX_REFRESH", "300"))  # секунд между полными перезагрузками
+
+# Сессии поиска: хранятся только id кандидатов (memory или sql)
+SEARCH_SESSION_BACKEND = os.getenv("SEARCH_SESSION_BACKEND", "memory").lower()
+SEARCH_SESSION_MAX = int(os.getenv("SEARCH_SESSION_MAX", "10000"))
+SEARCH_SESSION_TTL = int(os.getenv("SEARCH_SESSION_TTL", "1800"))  # секунд
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "50"))
+
 # Настройки бота
 MAX_REQUESTS_PER_DAY = 10
 MIN_AGE = 18
@@ -1,7 +1,13 @@
+import asyncio
+import functools
+import inspect
+from contextlib import asynccontextmanager
+from typing import Union
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from config import DATABASE_URL
+from config import DATABASE_URL, DB_ASYNC, SQL_ECHO, SQL_METRICS, SLOW_QUERY_MS
 import logging
 
 # Настройка логирования
@@ -14,7 +20,7 @@ if DATABASE_URL.startswith("postgresql://"):
     # Настройки для PostgreSQL (Railway)
     engine = create_engine(
         DATABASE_URL, 
-        echo=True,
+        echo=SQL_ECHO,
         pool_pre_ping=True,  # Проверка соединения перед использованием
         pool_recycle=300,    # Пересоздание соединений каждые 5 минут
         pool_size=10,        # Размер пула соединений
@@ -29,17 +35,63 @@ else:
     # Настройки для SQLite (локальная разработка)
     engine = create_engine(
         DATABASE_URL, 
-        echo=True,
+        echo=SQL_ECHO,
         connect_args={"check_same_thread": False}
     )
     logger.info("🔗 Подключение к SQLite (локальная разработка)")
 
+if SQL_METRICS:
+    from database.instrumentation import instrument_engine
+    instrument_engine(engine, SLOW_QUERY_MS)
+
 # Создаем фабрику сессий
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def get_async_database_url(url: str) -> str:
+    """Получить URL базы данных с асинхронным драйвером"""
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+# Асинхронный движок (включается через DB_ASYNC)
+async_engine = None
+AsyncSessionLocal = None
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    if DATABASE_URL.startswith("postgresql://"):
+        async_engine = create_async_engine(
+            get_async_database_url(DATABASE_URL),
+            echo=SQL_ECHO,
+            pool_pre_ping=True,
+            pool_recycle=300,
+            pool_size=10,
+            max_overflow=20,
+            connect_args={
+                "timeout": 10,
+                "server_settings": {"application_name": "dating_bot"}
+            }
+        )
+    else:
+        async_engine = create_async_engine(get_async_database_url(DATABASE_URL), echo=SQL_ECHO)
+
+    if SQL_METRICS:
+        instrument_engine(async_engine.sync_engine, SLOW_QUERY_MS)
+
+    # expire_on_commit=False: после коммита атрибуты не перезагружаются лениво,
+    # что в асинхронном режиме привело бы к ошибке
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    logger.info("⚡ Включен асинхронный режим работы с базой данных")
+
 # Базовый класс для моделей
 Base = declarative_base()
 
+# Сессия, которую получают хендлеры (зависит от DB_ASYNC)
+DbSession = Union[Session, AsyncSession]
+
 def get_db() -> Session:
     """Получить сессию базы данных"""
     db = SessionLocal()
@@ -48,6 +100,68 @@ def get_db() -> Session:
     finally:
         db.close()
 
+@asynccontextmanager
+async def get_session():
+    """Получить сессию для хендлеров: AsyncSession в асинхронном режиме, иначе Session"""
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+def is_async_session(db) -> bool:
+    """Проверить, является ли сессия асинхронной"""
+    return isinstance(db, AsyncSession)
+
+async def commit_session(db: DbSession):
+    """Зафиксировать транзакцию сессии, не блокируя event loop"""
+    if is_async_session(db):
+        await db.commit()
+    else:
+        await asyncio.to_thread(db.commit)
+
+async def rollback_session(db: DbSession):
+    """Откатить транзакцию сессии, не блокируя event loop"""
+    if is_async_session(db):
+        await db.rollback()
+    else:
+        await asyncio.to_thread(db.rollback)
+
+def get_pool_status() -> dict:
+    """Получить состояние пула соединений (для мониторинга)"""
+    pool = async_engine.pool if async_engine is not None else engine.pool
+    size = pool.size() if hasattr(pool, 'size') else 0
+    max_overflow = getattr(pool, '_max_overflow', 0)
+    return {
+        'size': size,
+        'checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else 0,
+        'overflow': max(pool.overflow(), 0) if hasattr(pool, 'overflow') else 0,
+        'capacity': size + max(max_overflow, 0)
+    }
+
+def sync_fallback(sync_func):
+    """
+    Декоратор для асинхронных версий функций работы с БД.
+    
+    Если хендлер получил обычную Session (DB_ASYNC выключен), вызывается
+    синхронная версия в пуле потоков, чтобы не блокировать event loop.
+    """
+    def decorator(async_func):
+        signature = inspect.signature(async_func)
+
+        @functools.wraps(async_func)
+        async def wrapper(*args, **kwargs):
+            db = signature.bind(*args, **kwargs).arguments.get('db')
+            if is_async_session(db):
+                return await async_func(*args, **kwargs)
+            return await asyncio.to_thread(sync_func, *args, **kwargs)
+        return wrapper
+    return decorator
+
 def create_tables():
     """Создать все таблицы в базе данных"""
     try:
@@ -58,6 +172,23 @@ def create_tables():
         logger.error(f"❌ Ошибка создания таблиц: {e}")
         raise
 
+async def ping_database() -> bool:
+    """Проверить доступность БД без блокировки event loop (для /ready)"""
+    try:
+        if async_engine is not None:
+            async with async_engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+        else:
+            await asyncio.to_thread(_ping_database_sync)
+        return True
+    except Exception as e:
+        logger.error(f"❌ База данных недоступна: {e}")
+        return False
+
+def _ping_database_sync():
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
 def check_database_connection():
     """Проверить подключение к базе данных"""
     try:
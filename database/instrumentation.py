@@ -0,0 +1,67 @@
+"""
+Инструментирование SQL: латентность запросов, число строк и журнал медленных запросов
+"""
+
+import logging
+import re
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Бакеты латентности запросов (секунды)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+sql_duration = metrics.histogram(
+    "sql_query_duration_seconds", "Время выполнения SQL-запросов",
+    ("operation", "table"), buckets=SQL_BUCKETS
+)
+sql_rows = metrics.counter(
+    "sql_rows_affected_total", "Строки, измененные INSERT/UPDATE/DELETE", ("operation", "table")
+)
+sql_slow = metrics.counter(
+    "sql_slow_queries_total", "Запросы дольше порога SLOW_QUERY_MS", ("operation", "table")
+)
+
+_TABLE_PATTERN = re.compile(r'\b(?:FROM|INTO|UPDATE|JOIN)\s+"?(\w+)"?', re.IGNORECASE)
+
+def classify_statement(statement: str):
+    """Операция и основная таблица запроса (для меток с низкой кардинальностью)"""
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    match = _TABLE_PATTERN.search(statement)
+    return operation, match.group(1) if match else "-"
+
+def instrument_engine(engine: Engine, slow_query_ms: float = 200):
+    """
+    Подключить обработчики событий движка.
+
+    Для асинхронного движка передается async_engine.sync_engine.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        operation, table = classify_statement(statement)
+
+        sql_duration.observe(elapsed, operation=operation, table=table)
+        if operation in ("INSERT", "UPDATE", "DELETE") and cursor.rowcount > 0:
+            sql_rows.inc(cursor.rowcount, operation=operation, table=table)
+
+        if elapsed * 1000 >= slow_query_ms:
+            sql_slow.inc(operation=operation, table=table)
+            logger.warning(f"🐢 Медленный запрос {elapsed * 1000:.1f} мс: {statement[:500]}")
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # Снимаем отметку времени запроса, завершившегося ошибкой
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Table
+from sqlalchemy import event, inspect, Column, Integer, String, Text, Boolean, Date, DateTime, Float, ForeignKey, Table, LargeBinary, BigInteger, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -32,6 +32,8 @@ class User(Base):
     language = Column(String(10), default='ru')
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Растет при изменении полей карточки (ключ кэша отрисованных профилей)
+    profile_version = Column(Integer, nullable=False, default=1, server_default='1')
     
     # Поисковые предпочтения
     search_gender = Column(String(20), nullable=True)
@@ -45,6 +47,23 @@ class User(Base):
     # Связи
     sent_requests = relationship("Request", foreign_keys="Request.from_user_id", back_populates="from_user")
     received_requests = relationship("Request", foreign_keys="Request.to_user_id", back_populates="to_user")
+    
+    # Индексы для поиска (scripts/add_search_indexes.py для существующих БД)
+    __table_args__ = (
+        Index('ix_users_active_gender_age', 'is_active', 'gender', 'age'),
+        Index('ix_users_created_at_id', 'created_at', 'id'),
+    )
+
+# Поля, которые показываются в карточке профиля (get_user_profile_text).
+# Новое поле в карточке нужно добавить и сюда, иначе кэш карточек устареет
+PROFILE_CARD_FIELDS = ('gender', 'age', 'height', 'weight', 'marital_status', 'bio')
+
+@event.listens_for(User, 'before_update')
+def bump_profile_version(mapper, connection, target):
+    """Увеличить profile_version, если при flush изменилось поле карточки"""
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in PROFILE_CARD_FIELDS):
+        target.profile_version = (target.profile_version or 0) + 1
 
 class Request(Base):
     __tablename__ = "requests"
@@ -57,4 +76,50 @@ class Request(Base):
     
     # Связи
     from_user = relationship("User", foreign_keys=[from_user_id], back_populates="sent_requests")
-    to_user = relationship("User", foreign_keys=[to_user_id], back_populates="received_requests") 
\ No newline at end of file
+    to_user = relationship("User", foreign_keys=[to_user_id], back_populates="received_requests")
+    
+    __table_args__ = (
+        Index('ix_requests_from_user_created_at', 'from_user_id', 'created_at'),
+        Index('ux_requests_from_user_to_user', 'from_user_id', 'to_user_id', unique=True),
+        Index('ix_requests_to_user_status', 'to_user_id', 'status'),
+    )
+
+class RequestQuota(Base):
+    __tablename__ = "request_quotas"
+    
+    # Счетчик отправленных запросов пользователя за день (UTC)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class SearchSession(Base):
+    __tablename__ = "search_sessions"
+    
+    telegram_id = Column(BigInteger, primary_key=True)
+    candidate_ids = Column(LargeBinary, nullable=False)  # array('q').tobytes()
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+class FsmState(Base):
+    __tablename__ = "fsm_states"
+    
+    # Ключ DefaultKeyBuilder: fsm:<bot_id>:<chat_id>:<user_id>:<destiny>:<state|data>
+    key = Column(String(255), primary_key=True)
+    value = Column(Text, nullable=False)  # имя состояния или JSON с данными
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+class RateLimitState(Base):
+    __tablename__ = "rate_limits"
+    
+    # Общее состояние GCRA по ключу (пользователь, действие) для всех процессов бота
+    user_id = Column(BigInteger, primary_key=True)
+    action = Column(String(32), primary_key=True)
+    tat = Column(Float, nullable=False, index=True)  # секунды Unix-времени; в прошлом — лимит свободен
+
+class UserBlock(Base):
+    __tablename__ = "user_blocks"
+    
+    # Временная блокировка за спам; telegram_id, чтобы проверка не требовала поиска пользователя
+    telegram_id = Column(BigInteger, primary_key=True)
+    reason = Column(String(64), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,107 @@
+"""
+Кэш пользователей по telegram_id.
+
+Хранит не ORM-объекты, а неизменяемые снимки (UserSnapshot), поэтому
+их можно безопасно использовать после закрытия сессии и между апдейтами.
+"""
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import object_session
+
+from config import USER_CACHE_SIZE, USER_CACHE_TTL
+from database.models import User
+from utils.cache import TTLCache
+
+USER_FIELDS = tuple(column.name for column in User.__table__.columns)
+
+class UserSnapshot:
+    """Неизменяемый снимок строки users"""
+    
+    __slots__ = USER_FIELDS
+    
+    def __init__(self, **values):
+        for field in self.__slots__:
+            object.__setattr__(self, field, values.get(field))
+    
+    @classmethod
+    def from_orm(cls, user: User) -> "UserSnapshot":
+        """Создать снимок из ORM-объекта"""
+        return cls(**{field: getattr(user, field) for field in cls.__slots__})
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("UserSnapshot is read-only")
+    
+    def __repr__(self) -> str:
+        return f"UserSnapshot(id={self.id}, telegram_id={self.telegram_id})"
+
+class UserCache:
+    """Кэш снимков пользователей по telegram_id"""
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Языки, полученные узким запросом, когда полного снимка в кэше нет
+        self._languages = TTLCache(maxsize=maxsize, ttl=ttl)
+    
+    def get(self, telegram_id: int) -> UserSnapshot:
+        """Получить снимок пользователя"""
+        return self._cache.get(telegram_id)
+    
+    def put(self, user: User) -> UserSnapshot:
+        """Сохранить пользователя в кэш и вернуть снимок"""
+        snapshot = user if isinstance(user, UserSnapshot) else UserSnapshot.from_orm(user)
+        self._cache.set(snapshot.telegram_id, snapshot)
+        return snapshot
+    
+    def get_language(self, telegram_id: int) -> str:
+        """Получить язык пользователя из кэша"""
+        snapshot = self._cache.get(telegram_id)
+        if snapshot is not None:
+            return snapshot.language
+        return self._languages.get(telegram_id)
+    
+    def put_language(self, telegram_id: int, language: str):
+        """Сохранить язык пользователя в кэш"""
+        self._languages.set(telegram_id, language)
+    
+    def invalidate(self, telegram_id: int):
+        """Удалить пользователя из кэша"""
+        self._cache.pop(telegram_id)
+        self._languages.pop(telegram_id)
+    
+    def invalidate_on_commit(self, db, telegram_id: int):
+        """
+        Удалить пользователя из кэша сейчас и еще раз после коммита.
+        
+        Повторная инвалидация нужна, чтобы параллельный апдейт не закэшировал
+        старые данные, пока транзакция еще не зафиксирована.
+        """
+        self.invalidate(telegram_id)
+        session = db.sync_session if isinstance(db, AsyncSession) else db
+        event.listen(session, 'after_commit', lambda _session: self.invalidate(telegram_id), once=True)
+    
+    def clear(self):
+        """Очистить кэш"""
+        self._cache.clear()
+        self._languages.clear()
+    
+    def get_stats(self) -> dict:
+        """Получить статистику кэша"""
+        return self._cache.get_stats()
+
+# Глобальный экземпляр
+user_cache = UserCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def invalidate_changed_user(mapper, connection, target):
+    """
+    Сбросить кэш при любом изменении строки users через ORM.
+    
+    Срабатывает на flush, поэтому покрывает и обработчики, которые меняют
+    атрибуты User и коммитят сами (profile.py и др.). Массовые UPDATE
+    через Core этим событием не видны — там нужен явный invalidate_on_commit.
+    """
+    session = object_session(target)
+    if session is not None:
+        user_cache.invalidate_on_commit(session, target.telegram_id)
@@ -9,6 +9,7 @@ from sqlalchemy.orm import Session
 
 from database.database import get_db
 from database.models import User
+from database.user_cache import user_cache
 from keyboards.language import get_language_keyboard, get_language_settings_keyboard
 from keyboards.inline import get_main_menu_keyboard
 from locales.translations import get_text, is_supported_language
@@ -63,6 +64,7 @@ async def set_language(callback: CallbackQuery):
         # Обновляем язык пользователя
         user.language = lang
         db.commit()
+        user_cache.invalidate(user.telegram_id)
         db.close()
         
         await callback.answer(get_text('language_changed', lang), show_alert=True)
@@ -78,8 +80,3 @@ async def show_main_menu(callback: CallbackQuery, lang: str):
         get_text('main_menu', lang),
         reply_markup=get_main_menu_keyboard(lang)
     )
-
-def get_user_language(telegram_id: int, db: Session) -> str:
-    """Получить язык пользователя из базы данных"""
-    user = db.query(User).filter(User.telegram_id == telegram_id).first()
-    return user.language if user else 'ru' 
\ No newline at end of file
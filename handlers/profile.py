@@ -23,20 +23,12 @@ class ProfileEditStates(StatesGroup):
     waiting_for_interests = State()
     waiting_for_bio = State()
 
-def get_user_language(telegram_id: int, db: Session) -> str:
-    """Получить язык пользователя"""
-    user = db.query(User).filter(User.telegram_id == telegram_id).first()
-    return user.language if user else 'ru'
-
 @router.callback_query(F.data == "edit_profile")
-async def show_profile_edit_menu(callback: CallbackQuery):
+async def show_profile_edit_menu(callback: CallbackQuery, lang: str):
     """Показать меню редактирования профиля"""
     db = next(get_db())
     
     try:
-        # Получаем язык пользователя
-        lang = get_user_language(callback.from_user.id, db)
-        
         # Получаем пользователя
         user = db.query(User).filter(User.telegram_id == callback.from_user.id).first()
         if not user:
@@ -73,7 +65,6 @@ async def show_profile_edit_menu(callback: CallbackQuery):
         )
         
     except Exception as e:
-        lang = get_user_language(callback.from_user.id, db)
         await callback.message.edit_text(
             get_text('error_occurred', lang),
             reply_markup=get_main_menu_keyboard(lang)
@@ -83,19 +74,15 @@ async def show_profile_edit_menu(callback: CallbackQuery):
         db.close()
 
 @router.callback_query(F.data == "edit_age")
-async def edit_age(callback: CallbackQuery, state: FSMContext):
+async def edit_age(callback: CallbackQuery, state: FSMContext, lang: str):
     """Редактирование возраста"""
-    db = next(get_db())
-    lang = get_user_language(callback.from_user.id, db)
-    db.close()
-    
     await callback.message.edit_text(
         get_text('registration_age', lang)
     )
     await state.set_state(ProfileEditStates.waiting_for_age)
 
 @router.message(ProfileEditStates.waiting_for_age)
-async def handle_age_edit(message: Message, state: FSMContext):
+async def handle_age_edit(message: Message, state: FSMContext, lang: str):
     """Обработка редактирования возраста"""
     try:
         age = int(message.text)
@@ -103,7 +90,6 @@ async def handle_age_edit(message: Message, state: FSMContext):
             # Обновляем возраст в базе данных
             db = next(get_db())
             try:
-                lang = get_user_language(message.from_user.id, db)
                 user = db.query(User).filter(User.telegram_id == message.from_user.id).first()
                 user.age = age
                 db.commit()
@@ -121,14 +107,8 @@ async def handle_age_edit(message: Message, state: FSMContext):
             finally:
                 db.close()
         else:
-            db = next(get_db())
-            lang = get_user_language(message.from_user.id, db)
-            db.close()
             await message.answer(get_text('error_invalid_age', lang))
     except ValueError:
-        db = next(get_db())
-        lang = get_user_language(message.from_user.id, db)
-        db.close()
         await message.answer(get_text('error_invalid_age', lang))
 
 @router.callback_query(F.data == "edit_height")
@@ -219,7 +199,7 @@ async def edit_marital(callback: CallbackQuery, state: FSMContext):
     await state.set_state(ProfileEditStates.waiting_for_marital_status)
 
 @router.callback_query(F.data.startswith("marital:"))
-async def handle_marital_edit(callback: CallbackQuery, state: FSMContext):
+async def handle_marital_edit(callback: CallbackQuery, state: FSMContext, lang: str):
     """Обработка редактирования семейного положения"""
     marital_status = callback.data.split(":")[1]
     db = next(get_db())
@@ -235,7 +215,7 @@ async def handle_marital_edit(callback: CallbackQuery, state: FSMContext):
         await callback.answer("✅ Семейное положение обновлено!", show_alert=True)
         
         # Возвращаемся в меню редактирования профиля
-        await show_profile_edit_menu(callback)
+        await show_profile_edit_menu(callback, lang)
         
     except Exception as e:
         await callback.answer("❌ Ошибка при обновлении профиля", show_alert=True)
@@ -292,7 +272,7 @@ async def handle_interest_edit(callback: CallbackQuery, state: FSMContext):
     )
 
 @router.callback_query(F.data == "interests_save")
-async def save_interests(callback: CallbackQuery, state: FSMContext):
+async def save_interests(callback: CallbackQuery, state: FSMContext, lang: str):
     """Сохранение интересов"""
     data = await state.get_data()
     selected_interests = data.get("interests", [])
@@ -308,7 +288,7 @@ async def save_interests(callback: CallbackQuery, state: FSMContext):
         await callback.answer(f"✅ Интересы обновлены: {interests_text}", show_alert=True)
         
         # Возвращаемся в меню редактирования профиля
-        await show_profile_edit_menu(callback)
+        await show_profile_edit_menu(callback, lang)
         await state.clear()
         
     except Exception as e:
@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 
 from database.database import get_db
 from database.models import User, SearchSettings
+from database.user_cache import user_cache
 from keyboards.inline import get_gender_keyboard, get_age_keyboard, get_height_keyboard, get_weight_keyboard, get_marital_status_keyboard, get_interests_keyboard, get_main_menu_keyboard
 from keyboards.language import get_language_keyboard
 from locales.translations import get_text
@@ -28,20 +29,9 @@ class RegistrationStates(StatesGroup):
     waiting_for_interests = State()
     waiting_for_bio = State()
 
-def get_user_language(telegram_id: int, db: Session) -> str:
-    """Получить язык пользователя"""
-    user = db.query(User).filter(User.telegram_id == telegram_id).first()
-    return user.language if user else 'ru'
-
 @router.message(Command("start"))
 async def start_registration(message: Message, state: FSMContext):
     """Начало регистрации"""
-    # Проверяем защиту от спама
-    spam_check = spam_protection.check_action_spam(message.from_user.id, 'message')
-    if spam_check['is_spam']:
-        await message.answer("⚠️ Слишком много запросов. Попробуйте позже.")
-        return
-    
     db = next(get_db())
     
     try:
@@ -73,12 +63,6 @@ async def start_registration(message: Message, state: FSMContext):
 @router.callback_query(F.data.startswith("language:"))
 async def handle_language_selection(callback: CallbackQuery, state: FSMContext):
     """Обработка выбора языка"""
-    # Проверяем защиту от спама
-    spam_check = spam_protection.check_action_spam(callback.from_user.id, 'message')
-    if spam_check['is_spam']:
-        await callback.answer("⚠️ Слишком много запросов. Попробуйте позже.", show_alert=True)
-        return
-    
     lang = callback.data.split(":")[1]
     db = next(get_db())
     
@@ -89,6 +73,7 @@ async def handle_language_selection(callback: CallbackQuery, state: FSMContext):
             # Обновляем язык существующего пользователя
             existing_user.language = lang
             db.commit()
+            user_cache.invalidate(existing_user.telegram_id)
             
             await callback.message.edit_text(
                 get_text('language_changed', lang),
@@ -118,12 +103,6 @@ async def handle_language_selection(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(F.data.startswith("gender:"))
 async def handle_gender_selection(callback: CallbackQuery, state: FSMContext):
     """Обработка выбора пола"""
-    # Проверяем защиту от спама
-    spam_check = spam_protection.check_action_spam(callback.from_user.id, 'message')
-    if spam_check['is_spam']:
-        await callback.answer("⚠️ Слишком много запросов. Попробуйте позже.", show_alert=True)
-        return
-    
     gender = callback.data.split(":")[1]
     
     # Валидируем пол
@@ -148,12 +127,6 @@ async def handle_gender_selection(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(F.data.startswith("age:"))
 async def handle_age_selection(callback: CallbackQuery, state: FSMContext):
     """Обработка выбора возраста"""
-    # Проверяем защиту от спама
-    spam_check = spam_protection.check_action_spam(callback.from_user.id, 'message')
-    if spam_check['is_spam']:
-        await callback.answer("⚠️ Слишком много запросов. Попробуйте позже.", show_alert=True)
-        return
-    
     age_str = callback.data.split(":")[1]
     
     # Валидируем возраст
@@ -178,12 +151,6 @@ async def handle_age_selection(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(F.data.startswith("height:"))
 async def handle_height_selection(callback: CallbackQuery, state: FSMContext):
     """Обработка выбора роста"""
-    # Проверяем защиту от спама
-    spam_check = spam_protection.check_action_spam(callback.from_user.id, 'message')
-    if spam_check['is_spam']:
-        await callback.answer("⚠️ Слишком много запросов. Попробуйте позже.", show_alert=True)
-        return
-    
     height_str = callback.data.split(":")[1]
     
     # Валидируем рост
@@ -208,12 +175,6 @@ async def handle_height_selection(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(F.data.startswith("weight:"))
 async def handle_weight_selection(callback: CallbackQuery, state: FSMContext):
     """Обработка выбора веса"""
-    # Проверяем защиту от спама
-    spam_check = spam_protection.check_action_spam(callback.from_user.id, 'message')
-    if spam_check['is_spam']:
-        await callback.answer("⚠️ Слишком много запросов. Попробуйте позже.", show_alert=True)
-        return
-    
     weight_str = callback.data.split(":")[1]
     
     # Валидируем вес
@@ -238,12 +199,6 @@ async def handle_weight_selection(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(F.data.startswith("marital:"))
 async def handle_marital_selection(callback: CallbackQuery, state: FSMContext):
     """Обработка выбора семейного положения"""
-    # Проверяем защиту от спама
-    spam_check = spam_protection.check_action_spam(callback.from_user.id, 'message')
-    if spam_check['is_spam']:
-        await callback.answer("⚠️ Слишком много запросов. Попробуйте позже.", show_alert=True)
-        return
-    
     marital_status = callback.data.split(":")[1]
     
     # Валидируем семейное положение
@@ -268,12 +223,6 @@ async def handle_marital_selection(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(F.data.startswith("interest:"))
 async def handle_interest_selection(callback: CallbackQuery, state: FSMContext):
     """Обработка выбора интересов"""
-    # Проверяем защиту от спама
-    spam_check = spam_protection.check_action_spam(callback.from_user.id, 'message')
-    if spam_check['is_spam']:
-        await callback.answer("⚠️ Слишком много запросов. Попробуйте позже.", show_alert=True)
-        return
-    
     interest = callback.data.split(":")[1]
     data = await state.get_data()
     lang = data.get('language', 'ru')
@@ -299,12 +248,6 @@ async def handle_interest_selection(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(F.data == "interests_done")
 async def handle_interests_done(callback: CallbackQuery, state: FSMContext):
     """Завершение выбора интересов"""
-    # Проверяем защиту от спама
-    spam_check = spam_protection.check_action_spam(callback.from_user.id, 'message')
-    if spam_check['is_spam']:
-        await callback.answer("⚠️ Слишком много запросов. Попробуйте позже.", show_alert=True)
-        return
-    
     data = await state.get_data()
     lang = data.get('language', 'ru')
     selected_interests = data.get('interests', [])
@@ -325,8 +268,8 @@ async def handle_interests_done(callback: CallbackQuery, state: FSMContext):
 @router.message(RegistrationStates.waiting_for_bio)
 async def handle_bio_input(message: Message, state: FSMContext):
     """Обработка ввода описания о себе"""
-    # Проверяем защиту от спама
-    spam_check = spam_protection.check_message_spam(message.from_user.id, message.text)
+    # Проверяем содержимое на спам (частоту проверяет ThrottlingMiddleware)
+    spam_check = spam_protection.check_message_content(message.text)
     if spam_check['is_spam']:
         if spam_check['action'] == 'block':
             await message.answer("⚠️ Сообщение заблокировано из-за подозрительного содержимого.")
@@ -1,8 +1,14 @@
 import json
+from enum import Enum
+from typing import NamedTuple, Optional
+from sqlalchemy import select, func
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from database.models import Request, User
-from database.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import Request, RequestQuota, User
+from database.database import get_db, sync_fallback
 from locales.translations import get_text
+from services.requested_users import requested_users
 from config import MAX_REQUESTS_PER_DAY
 from datetime import datetime
 
@@ -22,10 +28,72 @@ def create_request(from_user_id: int, to_user_id: int, db: Session) -> Request:
         to_user_id=to_user_id
     )
     db.add(request)
-    db.commit()
-    db.refresh(request)
+    db.flush()
     return request
 
+class SendOutcome(str, Enum):
+    """Результат отправки запроса"""
+    SENT = 'sent'
+    DUPLICATE = 'duplicate'
+    QUOTA = 'quota'
+
+class SendRequestResult(NamedTuple):
+    outcome: SendOutcome
+    request_id: Optional[int] = None
+
+def _build_send_request_statements(db, from_user_id: int, to_user_id: int):
+    """
+    INSERT запроса и upsert дневного счетчика для диалекта сессии.
+    
+    Дубликат отсекает уникальный индекс (from_user_id, to_user_id),
+    лимит — условие count < MAX_REQUESTS_PER_DAY в upsert счетчика.
+    """
+    dialect = db.get_bind().dialect.name
+    insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+    
+    insert_request = insert(Request).values(
+        from_user_id=from_user_id,
+        to_user_id=to_user_id,
+        status='pending'
+    ).on_conflict_do_nothing(
+        index_elements=[Request.from_user_id, Request.to_user_id]
+    ).returning(Request.id)
+    
+    # Сутки считаются по UTC, как и Request.created_at (default=datetime.utcnow)
+    quota_insert = insert(RequestQuota).values(
+        user_id=from_user_id,
+        day=datetime.utcnow().date(),
+        count=1
+    )
+    upsert_quota = quota_insert.on_conflict_do_update(
+        index_elements=[RequestQuota.user_id, RequestQuota.day],
+        set_={'count': RequestQuota.count + 1},
+        where=RequestQuota.count < MAX_REQUESTS_PER_DAY
+    ).returning(RequestQuota.count)
+    
+    return insert_request, upsert_quota
+
+def send_request(from_user_id: int, to_user_id: int, db: Session) -> SendRequestResult:
+    """
+    Атомарно отправить запрос: без дубликатов и с учетом дневного лимита.
+    
+    Оба выражения выполняются в SAVEPOINT; если лимит исчерпан,
+    вставка запроса откатывается.
+    """
+    insert_request, upsert_quota = _build_send_request_statements(db, from_user_id, to_user_id)
+    
+    with db.begin_nested() as savepoint:
+        request_id = db.scalar(insert_request)
+        if request_id is None:
+            return SendRequestResult(SendOutcome.DUPLICATE)
+        
+        if db.scalar(upsert_quota) is None:
+            savepoint.rollback()
+            return SendRequestResult(SendOutcome.QUOTA)
+    
+    requested_users.add_on_commit(db, from_user_id, to_user_id)
+    return SendRequestResult(SendOutcome.SENT, request_id)
+
 def get_user_requests(user_id: int, db: Session, status: str = None):
     """Получить запросы пользователя"""
     query = db.query(Request).filter(Request.to_user_id == user_id)
@@ -39,7 +107,7 @@ def update_request_status(request_id: int, status: str, db: Session) -> bool:
         request = db.query(Request).filter(Request.id == request_id).first()
         if request:
             request.status = status
-            db.commit()
+            db.flush()
             return True
         return False
     except Exception as e:
@@ -57,7 +125,7 @@ def get_user_sent_requests(user_id: int, db: Session):
 
 def can_send_request(user_id: int, db: Session) -> bool:
     """Проверить, может ли пользователь отправить запрос (лимит)"""
-    today = datetime.now().date()
+    today = datetime.utcnow().date()
     today_requests = db.query(Request).filter(
         Request.from_user_id == user_id,
         Request.created_at >= today
@@ -67,7 +135,7 @@ def can_send_request(user_id: int, db: Session) -> bool:
 
 def get_requests_count(user_id: int, db: Session) -> dict:
     """Получить количество запросов пользователя"""
-    today = datetime.now().date()
+    today = datetime.utcnow().date()
     today_requests = db.query(Request).filter(
         Request.from_user_id == user_id,
         Request.created_at >= today
@@ -81,7 +149,80 @@ def get_requests_count(user_id: int, db: Session) -> dict:
         'limit': MAX_REQUESTS_PER_DAY
     }
 
-def get_user_language(telegram_id: int, db: Session) -> str:
-    """Получить язык пользователя"""
-    user = db.query(User).filter(User.telegram_id == telegram_id).first()
-    return user.language if user else 'ru' 
\ No newline at end of file
+# Асинхронные версии (DB_ASYNC). При обычной Session выполняются синхронные версии в потоке
+
+@sync_fallback(create_request)
+async def create_request_async(from_user_id: int, to_user_id: int, db: AsyncSession) -> Request:
+    """Создать новый запрос (асинхронно)"""
+    existing_request = await db.scalar(select(Request.id).where(
+        Request.from_user_id == from_user_id,
+        Request.to_user_id == to_user_id
+    ).limit(1))
+    
+    if existing_request:
+        return None
+    
+    request = Request(
+        from_user_id=from_user_id,
+        to_user_id=to_user_id
+    )
+    db.add(request)
+    await db.flush()
+    return request
+
+@sync_fallback(send_request)
+async def send_request_async(from_user_id: int, to_user_id: int, db: AsyncSession) -> SendRequestResult:
+    """Атомарно отправить запрос (асинхронно)"""
+    insert_request, upsert_quota = _build_send_request_statements(db, from_user_id, to_user_id)
+    
+    async with db.begin_nested() as savepoint:
+        request_id = await db.scalar(insert_request)
+        if request_id is None:
+            return SendRequestResult(SendOutcome.DUPLICATE)
+        
+        if await db.scalar(upsert_quota) is None:
+            await savepoint.rollback()
+            return SendRequestResult(SendOutcome.QUOTA)
+    
+    requested_users.add_on_commit(db, from_user_id, to_user_id)
+    return SendRequestResult(SendOutcome.SENT, request_id)
+
+@sync_fallback(get_user_requests)
+async def get_user_requests_async(user_id: int, db: AsyncSession, status: str = None):
+    """Получить запросы пользователя (асинхронно)"""
+    query = select(Request).where(Request.to_user_id == user_id)
+    if status:
+        query = query.where(Request.status == status)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+@sync_fallback(update_request_status)
+async def update_request_status_async(request_id: int, status: str, db: AsyncSession) -> bool:
+    """Обновить статус запроса (асинхронно)"""
+    try:
+        request = await db.get(Request, request_id)
+        if request:
+            request.status = status
+            await db.flush()
+            return True
+        return False
+    except Exception as e:
+        await db.rollback()
+        print(f"Ошибка обновления статуса запроса: {e}")
+        return False
+
+@sync_fallback(get_request_by_id)
+async def get_request_by_id_async(request_id: int, db: AsyncSession) -> Request:
+    """Получить запрос по ID (асинхронно)"""
+    return await db.get(Request, request_id)
+
+@sync_fallback(can_send_request)
+async def can_send_request_async(user_id: int, db: AsyncSession) -> bool:
+    """Проверить лимит запросов пользователя (асинхронно)"""
+    today = datetime.utcnow().date()
+    today_requests = await db.scalar(select(func.count()).select_from(Request).where(
+        Request.from_user_id == user_id,
+        Request.created_at >= today
+    ))
+    
+    return today_requests < MAX_REQUESTS_PER_DAY
@@ -14,20 +14,12 @@ from config import MAX_REQUESTS_PER_DAY
 
 router = Router()
 
-def get_user_language(telegram_id: int, db: Session) -> str:
-    """Получить язык пользователя"""
-    user = db.query(User).filter(User.telegram_id == telegram_id).first()
-    return user.language if user else 'ru'
-
 @router.callback_query(F.data == "search")
-async def start_search(callback: CallbackQuery):
+async def start_search(callback: CallbackQuery, lang: str):
     """Начало поиска пользователей"""
     db = next(get_db())
     
     try:
-        # Получаем язык пользователя
-        lang = get_user_language(callback.from_user.id, db)
-        
         # Получаем текущего пользователя
         current_user = db.query(User).filter(User.telegram_id == callback.from_user.id).first()
         if not current_user:
@@ -60,7 +52,6 @@ async def start_search(callback: CallbackQuery):
         await show_user_profile(callback, suitable_users[0], suitable_users[1:], lang)
         
     except Exception as e:
-        lang = get_user_language(callback.from_user.id, db)
         await callback.message.edit_text(
             get_text('error_occurred', lang),
             reply_markup=get_main_menu_keyboard(lang)
@@ -160,15 +151,12 @@ async def show_user_profile(callback: CallbackQuery, user: User, remaining_users
     )
 
 @router.callback_query(F.data.startswith("request_access:"))
-async def request_access(callback: CallbackQuery):
+async def request_access(callback: CallbackQuery, lang: str):
     """Запрос доступа к пользователю"""
     target_user_id = int(callback.data.split(":")[1])
     db = next(get_db())
     
     try:
-        # Получаем язык пользователя
-        lang = get_user_language(callback.from_user.id, db)
-        
         # Получаем пользователей
         current_user = db.query(User).filter(User.telegram_id == callback.from_user.id).first()
         target_user = db.query(User).filter(User.id == target_user_id).first()
@@ -224,19 +212,17 @@ async def request_access(callback: CallbackQuery):
         await show_next_user_or_menu(callback, db, current_user, lang)
         
     except Exception as e:
-        lang = get_user_language(callback.from_user.id, db)
         await callback.answer(get_text('error_occurred', lang), show_alert=True)
         print(f"Request access error: {e}")
     finally:
         db.close()
 
 @router.callback_query(F.data == "skip_profile")
-async def skip_profile(callback: CallbackQuery):
+async def skip_profile(callback: CallbackQuery, lang: str):
     """Пропустить профиль"""
     db = next(get_db())
     
     try:
-        lang = get_user_language(callback.from_user.id, db)
         current_user = db.query(User).filter(User.telegram_id == callback.from_user.id).first()
         if not current_user:
             await callback.message.edit_text(
@@ -248,7 +234,6 @@ async def skip_profile(callback: CallbackQuery):
         await show_next_user_or_menu(callback, db, current_user, lang)
         
     except Exception as e:
-        lang = get_user_language(callback.from_user.id, db)
         await callback.message.edit_text(
             get_text('error_occurred', lang),
             reply_markup=get_main_menu_keyboard(lang)
@@ -29,20 +29,12 @@ class SettingsStates(StatesGroup):
     waiting_for_max_weight = State()
     waiting_for_marital_preference = State()
 
-def get_user_language(telegram_id: int, db: Session) -> str:
-    """Получить язык пользователя"""
-    user = db.query(User).filter(User.telegram_id == telegram_id).first()
-    return user.language if user else 'ru'
-
 @router.callback_query(F.data == "search_settings")
-async def show_settings_menu(callback: CallbackQuery):
+async def show_settings_menu(callback: CallbackQuery, lang: str):
     """Показать меню настроек поиска"""
     db = next(get_db())
     
     try:
-        # Получаем язык пользователя
-        lang = get_user_language(callback.from_user.id, db)
-        
         # Получаем текущего пользователя
         current_user = db.query(User).filter(User.telegram_id == callback.from_user.id).first()
         if not current_user:
@@ -83,7 +75,6 @@ async def show_settings_menu(callback: CallbackQuery):
         )
         
     except Exception as e:
-        lang = get_user_language(callback.from_user.id, db)
         await callback.message.edit_text(
             get_text('error_occurred', lang),
             reply_markup=get_main_menu_keyboard(lang)
@@ -93,12 +84,8 @@ async def show_settings_menu(callback: CallbackQuery):
         db.close()
 
 @router.callback_query(F.data == "change_gender_preference")
-async def change_gender_preference(callback: CallbackQuery, state: FSMContext):
+async def change_gender_preference(callback: CallbackQuery, state: FSMContext, lang: str):
     """Изменить предпочтения по полу"""
-    db = next(get_db())
-    lang = get_user_language(callback.from_user.id, db)
-    db.close()
-    
     await callback.message.edit_text(
         get_text('settings_change_gender', lang),
         reply_markup=get_gender_preference_keyboard(lang)
@@ -106,15 +93,12 @@ async def change_gender_preference(callback: CallbackQuery, state: FSMContext):
     await state.set_state(SettingsStates.waiting_for_gender_preference)
 
 @router.callback_query(F.data.startswith("gender_pref:"))
-async def handle_gender_preference(callback: CallbackQuery, state: FSMContext):
+async def handle_gender_preference(callback: CallbackQuery, state: FSMContext, lang: str):
     """Обработка выбора предпочтений по полу"""
     gender_pref = callback.data.split(":")[1]
     db = next(get_db())
     
     try:
-        # Получаем язык пользователя
-        lang = get_user_language(callback.from_user.id, db)
-        
         # Получаем пользователя
         current_user = db.query(User).filter(User.telegram_id == callback.from_user.id).first()
         if not current_user:
@@ -136,10 +120,9 @@ async def handle_gender_preference(callback: CallbackQuery, state: FSMContext):
             return
         
         # Возвращаемся в меню настроек
-        await show_settings_menu(callback)
+        await show_settings_menu(callback, lang)
         
     except Exception as e:
-        lang = get_user_language(callback.from_user.id, db)
         await callback.answer(get_text('error_occurred', lang), show_alert=True)
         print(f"Gender preference error: {e}")
     finally:
@@ -338,7 +321,7 @@ async def change_marital_preference(callback: CallbackQuery, state: FSMContext):
     await state.set_state(SettingsStates.waiting_for_marital_preference)
 
 @router.callback_query(F.data.startswith("marital_pref:"))
-async def handle_marital_preference(callback: CallbackQuery, state: FSMContext):
+async def handle_marital_preference(callback: CallbackQuery, state: FSMContext, lang: str):
     """Обработка выбора предпочтений по семейному положению"""
     marital_pref = callback.data.split(":")[1]
     db = next(get_db())
@@ -359,7 +342,7 @@ async def handle_marital_preference(callback: CallbackQuery, state: FSMContext):
         await callback.answer("✅ Предпочтения по семейному положению обновлены!", show_alert=True)
         
         # Возвращаемся в меню настроек
-        await show_settings_menu(callback)
+        await show_settings_menu(callback, lang)
         
     except Exception as e:
         await callback.answer("❌ Ошибка при обновлении настроек", show_alert=True)
@@ -1,28 +1,54 @@
+from sqlalchemy import select, func, exists
 from sqlalchemy.orm import Session
-from database.models import User
-from database.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import User, Request
+from database.database import get_db, sync_fallback
+from database.user_cache import user_cache, UserSnapshot
 from locales.translations import get_text
+from services.profile_cards import profile_cards
+from services.candidate_index import candidate_index
+from services.requested_users import requested_users
 import logging
 
 logger = logging.getLogger(__name__)
 
-def get_user_by_telegram_id(telegram_id: int, db: Session) -> User:
-    """Получить пользователя по Telegram ID"""
+DEFAULT_LANGUAGE = 'ru'
+
+def get_user_by_telegram_id(telegram_id: int, db: Session) -> UserSnapshot:
+    """Получить пользователя по Telegram ID (сначала из кэша)"""
+    cached = user_cache.get(telegram_id)
+    if cached is not None:
+        return cached
+    return _load_user_by_telegram_id(telegram_id, db)
+
+def _load_user_by_telegram_id(telegram_id: int, db: Session) -> UserSnapshot:
+    """Загрузить пользователя из БД и положить снимок в кэш"""
     try:
         user = db.query(User).filter(User.telegram_id == telegram_id).first()
         if user:
             logger.info(f"👤 Пользователь найден: {telegram_id}")
-        else:
-            logger.info(f"❌ Пользователь не найден: {telegram_id}")
-        return user
+            return user_cache.put(user)
+        logger.info(f"❌ Пользователь не найден: {telegram_id}")
+        return None
     except Exception as e:
         logger.error(f"❌ Ошибка поиска пользователя {telegram_id}: {e}")
         return None
 
+def get_user_language(telegram_id: int, db: Session) -> str:
+    """Получить язык пользователя (кэш, затем запрос одной колонки)"""
+    lang = user_cache.get_language(telegram_id)
+    if lang is None:
+        lang = db.query(User.language).filter(User.telegram_id == telegram_id).scalar()
+        if lang is None:
+            return DEFAULT_LANGUAGE
+        user_cache.put_language(telegram_id, lang)
+    return lang
+
 def create_user(telegram_id: int, username: str = None, first_name: str = None, last_name: str = None, db: Session = None) -> User:
     """Создать нового пользователя"""
+    own_session = db is None
     try:
-        if db is None:
+        if own_session:
             db = next(get_db())
         
         logger.info(f"🆕 Создание пользователя: {telegram_id}")
@@ -34,8 +60,13 @@ def create_user(telegram_id: int, username: str = None, first_name: str = None,
             last_name=last_name
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        user_cache.invalidate_on_commit(db, telegram_id)
+        if own_session:
+            db.commit()
+            db.refresh(user)
+        else:
+            # Коммит выполняет DbSessionMiddleware в конце апдейта
+            db.flush()
         
         logger.info(f"✅ Пользователь создан: {telegram_id} (ID: {user.id})")
         return user
@@ -45,10 +76,12 @@ def create_user(telegram_id: int, username: str = None, first_name: str = None,
             db.rollback()
         raise
 
-def update_user_profile(user_id: int, **kwargs) -> bool:
+def update_user_profile(user_id: int, db: Session = None, **kwargs) -> bool:
     """Обновить профиль пользователя"""
+    own_session = db is None
     try:
-        db = next(get_db())
+        if own_session:
+            db = next(get_db())
         user = db.query(User).filter(User.id == user_id).first()
         
         if user:
@@ -63,7 +96,11 @@ def update_user_profile(user_id: int, **kwargs) -> bool:
                 else:
                     logger.warning(f"⚠️ Поле {key} не существует в модели User")
             
-            db.commit()
+            user_cache.invalidate_on_commit(db, user.telegram_id)
+            if own_session:
+                db.commit()
+            else:
+                db.flush()
             logger.info(f"✅ Профиль пользователя {user_id} обновлен успешно")
             return True
         else:
@@ -74,65 +111,268 @@ def update_user_profile(user_id: int, **kwargs) -> bool:
         if db:
             db.rollback()
         return False
+    finally:
+        if own_session and db:
+            db.close()
+
+def get_user_by_id(user_id: int, db: Session) -> User:
+    """Получить пользователя по ID"""
+    return db.query(User).filter(User.id == user_id).first()
+
+def get_users_stats(db: Session, recent_limit: int = 5) -> dict:
+    """Получить статистику пользователей для администратора"""
+    return {
+        'total': db.query(User).count(),
+        'active': db.query(User).filter(User.is_active == True).count(),
+        'with_profiles': db.query(User).filter(
+            User.gender.isnot(None),
+            User.age.isnot(None),
+            User.height.isnot(None),
+            User.weight.isnot(None)
+        ).count(),
+        'recent': db.query(User).order_by(User.created_at.desc()).limit(recent_limit).all()
+    }
 
 def get_user_profile_text(user: User, lang: str = 'ru') -> str:
-    """Получить текст профиля пользователя"""
+    """Получить текст профиля пользователя (из кэша карточек)"""
     if not user:
         return get_text('no_profile', lang)
-    
-    profile_text = f"👤 {get_text('user_profile', lang)}\n\n"
+    return profile_cards.get_or_render(user, lang, render_profile_text)
+
+def render_profile_text(user: User, lang: str = 'ru') -> str:
+    """Отрисовать текст профиля пользователя"""
+    lines = [f"👤 {get_text('user_profile', lang)}", ""]
     
     if user.gender:
-        profile_text += f"👤 {get_text('gender', lang)}: {user.gender}\n"
+        lines.append(f"👤 {get_text('gender', lang)}: {user.gender}")
     if user.age:
-        profile_text += f"🎂 {get_text('age', lang)}: {user.age}\n"
+        lines.append(f"🎂 {get_text('age', lang)}: {user.age}")
     if user.height:
-        profile_text += f"📏 {get_text('height', lang)}: {user.height} см\n"
+        lines.append(f"📏 {get_text('height', lang)}: {user.height} см")
     if user.weight:
-        profile_text += f"⚖️ {get_text('weight', lang)}: {user.weight} кг\n"
+        lines.append(f"⚖️ {get_text('weight', lang)}: {user.weight} кг")
     if user.marital_status:
-        profile_text += f"💍 {get_text('marital_status', lang)}: {user.marital_status}\n"
+        lines.append(f"💍 {get_text('marital_status', lang)}: {user.marital_status}")
     if user.bio:
-        profile_text += f"📝 {get_text('bio', lang)}: {user.bio}\n"
+        lines.append(f"📝 {get_text('bio', lang)}: {user.bio}")
     
-    return profile_text
+    lines.append("")
+    return "\n".join(lines)
 
-def search_users(user_id: int, db: Session, limit: int = 10):
-    """Поиск пользователей по критериям"""
-    current_user = db.query(User).filter(User.id == user_id).first()
-    if not current_user:
-        return []
-    
-    query = db.query(User).filter(
-        User.id != user_id,
-        User.is_active == True
-    )
+def get_search_conditions(current_user: User) -> list:
+    """Получить условия поиска по критериям пользователя"""
+    conditions = [
+        User.id != current_user.id,
+        User.is_active == True,
+        # Анти-join: уже запрошенные анкеты (индекс from_user_id, to_user_id)
+        ~exists().where(
+            Request.from_user_id == current_user.id,
+            Request.to_user_id == User.id
+        )
+    ]
     
     # Фильтр по полу
     if current_user.search_gender and current_user.search_gender != 'all':
-        query = query.filter(User.gender == current_user.search_gender)
+        conditions.append(User.gender == current_user.search_gender)
     
     # Фильтр по возрасту
     if current_user.min_age:
-        query = query.filter(User.age >= current_user.min_age)
+        conditions.append(User.age >= current_user.min_age)
     if current_user.max_age:
-        query = query.filter(User.age <= current_user.max_age)
+        conditions.append(User.age <= current_user.max_age)
     
     # Фильтр по росту
     if current_user.min_height:
-        query = query.filter(User.height >= current_user.min_height)
+        conditions.append(User.height >= current_user.min_height)
     if current_user.max_height:
-        query = query.filter(User.height <= current_user.max_height)
+        conditions.append(User.height <= current_user.max_height)
     
     # Фильтр по весу
     if current_user.min_weight:
-        query = query.filter(User.weight >= current_user.min_weight)
+        conditions.append(User.weight >= current_user.min_weight)
     if current_user.max_weight:
-        query = query.filter(User.weight <= current_user.max_weight)
+        conditions.append(User.weight <= current_user.max_weight)
     
-    return query.limit(limit).all()
+    return conditions
+
+def _search_index(current_user: User, db: Session, after_id: int = 0, limit: int = 50):
+    """Поиск по индексу кандидатов или None, если индекс не загружен"""
+    excluded = requested_users.get(current_user.id, db) if candidate_index.loaded else None
+    return candidate_index.search(current_user, after_id, limit, exclude=excluded)
+
+def search_users(user_id: int, db: Session, limit: int = 10):
+    """Поиск пользователей по критериям"""
+    current_user = db.query(User).filter(User.id == user_id).first()
+    if not current_user:
+        return []
+    
+    ids = _search_index(current_user, db, limit=limit)
+    if ids is not None:
+        return db.query(User).filter(User.id.in_(ids)).order_by(User.id).all() if ids else []
+    return db.query(User).filter(*get_search_conditions(current_user)).limit(limit).all()
+
+def search_user_ids(user_id: int, db: Session, after_id: int = 0, limit: int = 50) -> list:
+    """Id подходящих пользователей по возрастанию (keyset-пагинация по User.id)"""
+    current_user = db.query(User).filter(User.id == user_id).first()
+    if not current_user:
+        return []
+    
+    ids = _search_index(current_user, db, after_id, limit)
+    if ids is not None:
+        return ids
+    rows = db.query(User.id).filter(
+        *get_search_conditions(current_user),
+        User.id > after_id
+    ).order_by(User.id).limit(limit).all()
+    return [row[0] for row in rows]
 
 def is_profile_complete(user: User) -> bool:
     """Проверить, заполнен ли профиль полностью"""
     required_fields = ['gender', 'age', 'height', 'weight', 'marital_status']
-    return all(getattr(user, field) for field in required_fields) 
\ No newline at end of file
+    return all(getattr(user, field) for field in required_fields)
+
+# Асинхронные версии (DB_ASYNC). При обычной Session выполняются синхронные версии в потоке
+
+async def get_user_by_telegram_id_async(telegram_id: int, db: AsyncSession) -> UserSnapshot:
+    """Получить пользователя по Telegram ID (асинхронно, сначала из кэша)"""
+    cached = user_cache.get(telegram_id)
+    if cached is not None:
+        return cached
+    return await _load_user_by_telegram_id_async(telegram_id, db)
+
+@sync_fallback(_load_user_by_telegram_id)
+async def _load_user_by_telegram_id_async(telegram_id: int, db: AsyncSession) -> UserSnapshot:
+    """Загрузить пользователя из БД и положить снимок в кэш (асинхронно)"""
+    try:
+        result = await db.execute(select(User).where(User.telegram_id == telegram_id))
+        user = result.scalars().first()
+        return user_cache.put(user) if user else None
+    except Exception as e:
+        logger.error(f"❌ Ошибка поиска пользователя {telegram_id}: {e}")
+        return None
+
+async def get_user_language_async(telegram_id: int, db: AsyncSession) -> str:
+    """Получить язык пользователя (асинхронно, сначала из кэша)"""
+    lang = user_cache.get_language(telegram_id)
+    if lang is not None:
+        return lang
+    return await _load_user_language_async(telegram_id, db)
+
+@sync_fallback(get_user_language)
+async def _load_user_language_async(telegram_id: int, db: AsyncSession) -> str:
+    """Загрузить язык пользователя запросом одной колонки (асинхронно)"""
+    lang = await db.scalar(select(User.language).where(User.telegram_id == telegram_id))
+    if lang is None:
+        return DEFAULT_LANGUAGE
+    user_cache.put_language(telegram_id, lang)
+    return lang
+
+@sync_fallback(get_user_by_id)
+async def get_user_by_id_async(user_id: int, db: AsyncSession) -> User:
+    """Получить пользователя по ID (асинхронно)"""
+    return await db.get(User, user_id)
+
+@sync_fallback(create_user)
+async def create_user_async(telegram_id: int, username: str = None, first_name: str = None, last_name: str = None, db: AsyncSession = None) -> User:
+    """Создать нового пользователя (асинхронно)"""
+    try:
+        logger.info(f"🆕 Создание пользователя: {telegram_id}")
+        
+        user = User(
+            telegram_id=telegram_id,
+            username=username,
+            first_name=first_name,
+            last_name=last_name
+        )
+        db.add(user)
+        user_cache.invalidate_on_commit(db, telegram_id)
+        await db.flush()
+        
+        logger.info(f"✅ Пользователь создан: {telegram_id} (ID: {user.id})")
+        return user
+    except Exception as e:
+        logger.error(f"❌ Ошибка создания пользователя {telegram_id}: {e}")
+        await db.rollback()
+        raise
+
+@sync_fallback(update_user_profile)
+async def update_user_profile_async(user_id: int, db: AsyncSession = None, **kwargs) -> bool:
+    """Обновить профиль пользователя (асинхронно)"""
+    try:
+        user = await db.get(User, user_id)
+        
+        if not user:
+            logger.error(f"❌ Пользователь {user_id} не найден")
+            return False
+        
+        logger.info(f"🔄 Обновление профиля пользователя: {user_id}")
+        for key, value in kwargs.items():
+            if hasattr(user, key):
+                setattr(user, key, value)
+            else:
+                logger.warning(f"⚠️ Поле {key} не существует в модели User")
+        
+        user_cache.invalidate_on_commit(db, user.telegram_id)
+        await db.flush()
+        logger.info(f"✅ Профиль пользователя {user_id} обновлен успешно")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Ошибка обновления профиля {user_id}: {e}")
+        await db.rollback()
+        return False
+
+async def _search_index_async(current_user: User, db: AsyncSession, after_id: int = 0, limit: int = 50):
+    """Поиск по индексу кандидатов или None, если индекс не загружен (асинхронно)"""
+    excluded = await requested_users.get_async(current_user.id, db) if candidate_index.loaded else None
+    return candidate_index.search(current_user, after_id, limit, exclude=excluded)
+
+@sync_fallback(search_users)
+async def search_users_async(user_id: int, db: AsyncSession, limit: int = 10):
+    """Поиск пользователей по критериям (асинхронно)"""
+    current_user = await db.get(User, user_id)
+    if not current_user:
+        return []
+    
+    ids = await _search_index_async(current_user, db, limit=limit)
+    if ids is not None:
+        if not ids:
+            return []
+        result = await db.execute(select(User).where(User.id.in_(ids)).order_by(User.id))
+        return result.scalars().all()
+    result = await db.execute(select(User).where(*get_search_conditions(current_user)).limit(limit))
+    return result.scalars().all()
+
+@sync_fallback(get_users_stats)
+async def get_users_stats_async(db: AsyncSession, recent_limit: int = 5) -> dict:
+    """Получить статистику пользователей (асинхронно)"""
+    count_users = select(func.count()).select_from(User)
+    recent = await db.execute(select(User).order_by(User.created_at.desc()).limit(recent_limit))
+    return {
+        'total': await db.scalar(count_users),
+        'active': await db.scalar(count_users.where(User.is_active == True)),
+        'with_profiles': await db.scalar(count_users.where(
+            User.gender.isnot(None),
+            User.age.isnot(None),
+            User.height.isnot(None),
+            User.weight.isnot(None)
+        )),
+        'recent': recent.scalars().all()
+    }
+
+@sync_fallback(search_user_ids)
+async def search_user_ids_async(user_id: int, db: AsyncSession, after_id: int = 0, limit: int = 50) -> list:
+    """Id подходящих пользователей после after_id (асинхронно)"""
+    current_user = await db.get(User, user_id)
+    if not current_user:
+        return []
+    
+    ids = await _search_index_async(current_user, db, after_id, limit)
+    if ids is not None:
+        return ids
+    result = await db.scalars(
+        select(User.id)
+        .where(*get_search_conditions(current_user), User.id > after_id)
+        .order_by(User.id)
+        .limit(limit)
+    )
+    return list(result)
@@ -1,51 +1,59 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from locales.translations import get_text
 from config import GENDERS, MARITAL_STATUSES, INTERESTS
+from keyboards.cache import cached_keyboard
+from keyboards.callbacks import (
+    LanguageCallback, GenderCallback, MaritalCallback, RequestActionCallback, SendRequestCallback, NextUserCallback
+)
 
+@cached_keyboard
 def get_language_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура выбора языка"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [
-            InlineKeyboardButton(text="🇷🇺 Русский", callback_data="lang_ru"),
-            InlineKeyboardButton(text="🇺🇿 O'zbekcha", callback_data="lang_uz")
+            InlineKeyboardButton(text="🇷🇺 Русский", callback_data=LanguageCallback(code="ru").pack()),
+            InlineKeyboardButton(text="🇺🇿 O'zbekcha", callback_data=LanguageCallback(code="uz").pack())
         ]
     ])
     return keyboard
 
+@cached_keyboard
 def get_gender_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     """Клавиатура выбора пола"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [
-            InlineKeyboardButton(text="👨 Мужчина", callback_data="gender_male"),
-            InlineKeyboardButton(text="👩 Женщина", callback_data="gender_female")
+            InlineKeyboardButton(text="👨 Мужчина", callback_data=GenderCallback(value="male").pack()),
+            InlineKeyboardButton(text="👩 Женщина", callback_data=GenderCallback(value="female").pack())
         ] if lang == 'ru' else [
-            InlineKeyboardButton(text="👨 Erkak", callback_data="gender_male"),
-            InlineKeyboardButton(text="👩 Ayol", callback_data="gender_female")
+            InlineKeyboardButton(text="👨 Erkak", callback_data=GenderCallback(value="male").pack()),
+            InlineKeyboardButton(text="👩 Ayol", callback_data=GenderCallback(value="female").pack())
         ],
         [InlineKeyboardButton(text="❌ Отмена", callback_data="cancel")]
     ])
     return keyboard
 
+@cached_keyboard
 def get_marital_status_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     """Клавиатура семейного положения"""
     if lang == 'ru':
         buttons = [
-            [InlineKeyboardButton(text="💚 Холост/Не замужем", callback_data="marital_single")],
-            [InlineKeyboardButton(text="💍 Женат/Замужем", callback_data="marital_married")],
-            [InlineKeyboardButton(text="💔 Разведен/Разведена", callback_data="marital_divorced")],
+            [InlineKeyboardButton(text="💚 Холост/Не замужем", callback_data=MaritalCallback(value="single").pack())],
+            [InlineKeyboardButton(text="💍 Женат/Замужем", callback_data=MaritalCallback(value="married").pack())],
+            [InlineKeyboardButton(text="💔 Разведен/Разведена", callback_data=MaritalCallback(value="divorced").pack())],
             [InlineKeyboardButton(text="❌ Отмена", callback_data="cancel")]
         ]
     else:
         buttons = [
-            [InlineKeyboardButton(text="💚 Bekor/Erkak emas", callback_data="marital_single")],
-            [InlineKeyboardButton(text="💍 Uylangan/Turmush qurgan", callback_data="marital_married")],
-            [InlineKeyboardButton(text="💔 Ajrashgan/Ajrashgan", callback_data="marital_divorced")],
+            [InlineKeyboardButton(text="💚 Bekor/Erkak emas", callback_data=MaritalCallback(value="single").pack())],
+            [InlineKeyboardButton(text="💍 Uylangan/Turmush qurgan", callback_data=MaritalCallback(value="married").pack())],
+            [InlineKeyboardButton(text="💔 Ajrashgan/Ajrashgan", callback_data=MaritalCallback(value="divorced").pack())],
             [InlineKeyboardButton(text="❌ Bekor qilish", callback_data="cancel")]
         ]
     
     keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
     return keyboard
 
+@cached_keyboard
 def get_interests_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     """Клавиатура интересов"""
     interests_ru = ["Спорт", "Музыка", "Кино", "Книги", "Путешествия", "Кулинария", "Искусство", "Технологии", "Природа", "Фотография", "Танцы", "Йога", "Игры", "Наука"]
@@ -68,6 +76,7 @@ def get_interests_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
     return keyboard
 
+@cached_keyboard
 def get_main_menu_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     """Главное меню"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -79,6 +88,7 @@ def get_main_menu_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     ])
     return keyboard
 
+@cached_keyboard
 def get_profile_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     """Клавиатура профиля"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -87,6 +97,7 @@ def get_profile_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     ])
     return keyboard
 
+@cached_keyboard
 def get_search_gender_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     """Клавиатура поиска по полу"""
     if lang == 'ru':
@@ -105,11 +116,11 @@ def get_search_gender_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
     return keyboard
 
-def get_user_profile_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
-    """Клавиатура профиля пользователя"""
+def get_user_profile_keyboard(user_id: int, lang: str = 'ru') -> InlineKeyboardMarkup:
+    """Клавиатура профиля пользователя (в callback_data передается id показанного кандидата)"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text=get_text('send_request', lang), callback_data="send_request")],
-        [InlineKeyboardButton(text=get_text('next_user', lang), callback_data="next_user")],
+        [InlineKeyboardButton(text=get_text('send_request', lang), callback_data=SendRequestCallback(user_id=user_id).pack())],
+        [InlineKeyboardButton(text=get_text('next_user', lang), callback_data=NextUserCallback(user_id=user_id).pack())],
         [InlineKeyboardButton(text=get_text('back_to_menu', lang), callback_data="back_to_main")]
     ])
     return keyboard
@@ -118,13 +129,14 @@ def get_request_actions_keyboard(request_id: int, lang: str = 'ru') -> InlineKey
     """Клавиатура действий с запросом"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [
-            InlineKeyboardButton(text=get_text('accept_request', lang), callback_data=f"accept_request_{request_id}"),
-            InlineKeyboardButton(text=get_text('decline_request', lang), callback_data=f"decline_request_{request_id}")
+            InlineKeyboardButton(text=get_text('accept_request', lang), callback_data=RequestActionCallback(action="accept", request_id=request_id).pack()),
+            InlineKeyboardButton(text=get_text('decline_request', lang), callback_data=RequestActionCallback(action="decline", request_id=request_id).pack())
         ],
         [InlineKeyboardButton(text=get_text('back_to_menu', lang), callback_data="back_to_main")]
     ])
     return keyboard
 
+@cached_keyboard
 def get_settings_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     """Клавиатура настроек"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -134,6 +146,7 @@ def get_settings_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     ])
     return keyboard
 
+@cached_keyboard
 def get_cancel_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     """Клавиатура отмены"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
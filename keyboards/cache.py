@@ -0,0 +1,67 @@
+"""
+Кэш клавиатур, зависящих только от языка: строятся один раз на язык
+"""
+
+import functools
+import inspect
+from typing import Callable, List, Tuple
+
+from aiogram.types import InlineKeyboardMarkup
+
+from locales.translations import TRANSLATIONS
+
+# Записей на клавиатуру: по одной на язык (с запасом на неизвестные коды)
+LANGUAGE_CACHE_SIZE = 16
+
+# (закэшированная функция, принимает ли язык)
+_static_keyboards: List[Tuple[Callable, bool]] = []
+
+def copy_markup(markup: InlineKeyboardMarkup) -> InlineKeyboardMarkup:
+    """Независимая копия клавиатуры: новые строки и новые кнопки"""
+    # Поля кнопок с callback_data — строки, поверхностной копии кнопки достаточно;
+    # model_copy(deep=True) дороже, чем построить клавиатуру заново
+    return markup.model_copy(update={
+        'inline_keyboard': [[button.model_copy() for button in row] for row in markup.inline_keyboard]
+    })
+
+def cached_keyboard(func: Callable[..., InlineKeyboardMarkup]) -> Callable[..., InlineKeyboardMarkup]:
+    """
+    Декоратор для клавиатур, зависящих только от языка.
+
+    Объекты aiogram изменяемые, поэтому в кэше лежит эталон, а каждый вызов
+    получает свою копию: правка клавиатуры в одном обработчике не попадет
+    в сообщения других пользователей. Переводы и проверка pydantic
+    выполняются один раз на язык.
+    """
+    cached = functools.lru_cache(maxsize=LANGUAGE_CACHE_SIZE)(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs) -> InlineKeyboardMarkup:
+        return copy_markup(cached(*args, **kwargs))
+
+    wrapper.cache_info = cached.cache_info
+    wrapper.cache_clear = cached.cache_clear
+    _static_keyboards.append((cached, bool(inspect.signature(func).parameters)))
+    return wrapper
+
+def warm_up_keyboards():
+    """Построить клавиатуры для всех языков заранее (вызывается при старте)"""
+    for lang in TRANSLATIONS:
+        for keyboard, takes_lang in _static_keyboards:
+            if takes_lang:
+                keyboard(lang)
+            else:
+                keyboard()
+
+def get_keyboard_cache_stats() -> dict:
+    """Статистика кэша клавиатур"""
+    infos = [cached.cache_info() for cached, _ in _static_keyboards]
+    hits = sum(info.hits for info in infos)
+    misses = sum(info.misses for info in infos)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 3) if total else 0.0,
+        'size': sum(info.currsize for info in infos)
+    }
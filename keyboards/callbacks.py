@@ -0,0 +1,24 @@
+"""
+Типизированные callback_data для клавиатур main.py
+"""
+
+from aiogram.filters.callback_data import CallbackData
+
+class LanguageCallback(CallbackData, prefix="lang"):
+    code: str
+
+class GenderCallback(CallbackData, prefix="gender"):
+    value: str
+
+class MaritalCallback(CallbackData, prefix="marital"):
+    value: str
+
+class RequestActionCallback(CallbackData, prefix="request"):
+    action: str  # accept / decline
+    request_id: int
+
+class SendRequestCallback(CallbackData, prefix="send_request"):
+    user_id: int  # id показанного кандидата
+
+class NextUserCallback(CallbackData, prefix="next_user"):
+    user_id: int  # id показанного кандидата
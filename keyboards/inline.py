@@ -2,7 +2,9 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from config import GENDERS, MARITAL_STATUSES, INTERESTS
 from locales.translations import get_text
+from keyboards.cache import cached_keyboard
 
+@cached_keyboard
 def get_gender_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     """Клавиатура для выбора пола"""
     builder = InlineKeyboardBuilder()
@@ -22,6 +24,7 @@ def get_gender_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     builder.adjust(2)
     return builder.as_markup()
 
+@cached_keyboard
 def get_age_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     """Клавиатура для выбора возрастных групп"""
     builder = InlineKeyboardBuilder()
@@ -39,6 +42,7 @@ def get_age_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     builder.adjust(2)
     return builder.as_markup()
 
+@cached_keyboard
 def get_marital_status_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     """Клавиатура для выбора семейного положения"""
     builder = InlineKeyboardBuilder()
@@ -132,6 +136,7 @@ def get_access_request_keyboard(request_id: int, lang: str = 'ru') -> InlineKeyb
     builder.adjust(2)
     return builder.as_markup()
 
+@cached_keyboard
 def get_main_menu_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     """Главное меню"""
     builder = InlineKeyboardBuilder()
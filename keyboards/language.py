@@ -4,7 +4,9 @@
 
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from keyboards.cache import cached_keyboard
 
+@cached_keyboard
 def get_language_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура выбора языка"""
     builder = InlineKeyboardBuilder()
@@ -21,6 +23,7 @@ def get_language_keyboard() -> InlineKeyboardMarkup:
     builder.adjust(2)
     return builder.as_markup()
 
+@cached_keyboard
 def get_language_settings_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура настроек языка"""
     builder = InlineKeyboardBuilder()
@@ -2,7 +2,9 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from config import INTERESTS
 from locales.translations import get_text
+from keyboards.cache import cached_keyboard
 
+@cached_keyboard
 def get_profile_edit_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     """Клавиатура для редактирования профиля"""
     builder = InlineKeyboardBuilder()
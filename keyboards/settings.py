@@ -2,7 +2,9 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from config import MARITAL_STATUSES
 from locales.translations import get_text
+from keyboards.cache import cached_keyboard
 
+@cached_keyboard
 def get_settings_menu_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     """Клавиатура меню настроек"""
     builder = InlineKeyboardBuilder()
@@ -33,6 +35,7 @@ def get_settings_menu_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     builder.adjust(2)
     return builder.as_markup()
 
+@cached_keyboard
 def get_gender_preference_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     """Клавиатура для выбора предпочтений по полу"""
     builder = InlineKeyboardBuilder()
@@ -55,6 +58,7 @@ def get_gender_preference_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     builder.adjust(2)
     return builder.as_markup()
 
+@cached_keyboard
 def get_marital_preference_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     """Клавиатура для выбора предпочтений по семейному положению"""
     builder = InlineKeyboardBuilder()
@@ -84,6 +88,7 @@ def get_marital_preference_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     builder.adjust(1)
     return builder.as_markup()
 
+@cached_keyboard
 def get_age_range_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     """Клавиатура для быстрого выбора возрастных диапазонов"""
     builder = InlineKeyboardBuilder()
@@ -108,6 +113,7 @@ def get_age_range_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     builder.adjust(2)
     return builder.as_markup()
 
+@cached_keyboard
 def get_height_range_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     """Клавиатура для быстрого выбора диапазонов роста"""
     builder = InlineKeyboardBuilder()
@@ -132,6 +138,7 @@ def get_height_range_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     builder.adjust(2)
     return builder.as_markup()
 
+@cached_keyboard
 def get_weight_range_keyboard(lang: str = 'ru') -> InlineKeyboardMarkup:
     """Клавиатура для быстрого выбора диапазонов веса"""
     builder = InlineKeyboardBuilder()
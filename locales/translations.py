@@ -1,158 +1,134 @@
 """
 Переводы для бота знакомств
-Поддерживаемые языки: русский, узбекский
+
+Тексты лежат в каталогах locales/<язык>.json; новый язык добавляется файлом.
+При загрузке каталоги проверяются и «компилируются» в неизменяемые таблицы.
 """
 
-TRANSLATIONS = {
-    'ru': {
-        'welcome': '👋 Добро пожаловать в бот знакомств!',
-        'choose_language': '🌍 Выберите язык / Tilni tanlang:',
-        'language_changed': '✅ Язык изменен на русский',
-        'start_registration': '📝 Начнем регистрацию!',
-        'enter_gender': 'Укажите ваш пол:',
-        'enter_age': 'Укажите ваш возраст:',
-        'enter_height': 'Укажите ваш рост (в см):',
-        'enter_weight': 'Укажите ваш вес (в кг):',
-        'enter_marital_status': 'Укажите ваше семейное положение:',
-        'enter_interests': 'Выберите ваши интересы (можно выбрать несколько):',
-        'enter_bio': 'Расскажите о себе (необязательно):',
-        'profile_created': '✅ Профиль создан!',
-        'main_menu': '🏠 Главное меню',
-        'search': '🔍 Поиск',
-        'profile': '👤 Профиль',
-        'settings': '⚙️ Настройки',
-        'requests': '📨 Запросы',
-        'no_profile': '❌ У вас нет профиля. Создайте его в настройках.',
-        'search_settings': '🔍 Настройки поиска',
-        'set_search_gender': 'Кого искать:',
-        'set_age_range': 'Укажите возрастной диапазон (от - до):',
-        'set_height_range': 'Укажите диапазон роста (от - до см):',
-        'set_weight_range': 'Укажите диапазон веса (от - до кг):',
-        'searching': '🔍 Ищем подходящих людей...',
-        'no_results': '😔 По вашему запросу ничего не найдено',
-        'found_users': 'Найдено пользователей: {count}',
-        'user_profile': '👤 Профиль пользователя',
-        'send_request': '📨 Отправить запрос',
-        'next_user': '➡️ Следующий',
-        'request_sent': '✅ Запрос отправлен!',
-        'request_received': '📨 Новый запрос на доступ к личным сообщениям',
-        'accept_request': '✅ Принять',
-        'decline_request': '❌ Отклонить',
-        'request_accepted': '✅ Запрос принят!',
-        'request_declined': '❌ Запрос отклонен',
-        'username_shared': '👤 Пользователь поделился своим username: @{username}',
-        'edit_profile': '✏️ Редактировать профиль',
-        'change_language': '🌍 Изменить язык',
-        'back_to_menu': '⬅️ Назад в меню',
-        'cancel': '❌ Отмена',
-        'save': '💾 Сохранить',
-        'error': '❌ Произошла ошибка',
-        'invalid_input': '❌ Неверный ввод',
-        'try_again': 'Попробуйте еще раз',
-        'gender': 'Пол',
-        'age': 'Возраст',
-        'height': 'Рост',
-        'weight': 'Вес',
-        'marital_status': 'Семейное положение',
-        'bio': 'О себе',
-        # Новые переводы
-        'you_selected': 'Вы выбрали: {value}',
-        'age_value': 'Возраст: {age}',
-        'height_value': 'Рост: {height} см',
-        'weight_value': 'Вес: {weight} кг',
-        'marital_status_value': 'Семейное положение: {status}',
-        'age_range_error': 'Возраст должен быть от {min} до {max} лет. Попробуйте еще раз:',
-        'height_range_error': 'Рост должен быть от {min} до {max} см. Попробуйте еще раз:',
-        'weight_range_error': 'Вес должен быть от {min} до {max} кг. Попробуйте еще раз:',
-        'please_enter_number': 'Пожалуйста, введите число. Попробуйте еще раз:',
-        'user_not_found': 'Ошибка: пользователь не найден',
-        'edit_profile_title': '📝 Редактирование профиля',
-        'no_new_requests': '📨 У вас пока нет новых запросов',
-        'settings_title': '⚙️ Настройки',
-        'daily_limit_reached': 'Достигнут дневной лимит запросов',
-        'request_already_sent': 'Запрос уже отправлен',
-        'request_not_found': 'Запрос не найден',
-        'search_results_not_found': 'Ошибка: результаты поиска не найдены',
-        'from_user': 'От: {name}',
-        'user_default': 'Пользователь',
-        'create_profile': '📝 Создать профиль',
-    },
-    'uz': {
-        'welcome': '👋 Tanishuv botiga xush kelibsiz!',
-        'choose_language': '🌍 Tilni tanlang / Выберите язык:',
-        'language_changed': '✅ Til o\'zbekchaga o\'zgartirildi',
-        'start_registration': '📝 Ro\'yxatdan o\'tishni boshlaymiz!',
-        'enter_gender': 'Jinsingizni kiriting:',
-        'enter_age': 'Yoshingizni kiriting:',
-        'enter_height': 'Bo\'yingizni kiriting (sm da):',
-        'enter_weight': 'Vazningizni kiriting (kg da):',
-        'enter_marital_status': 'Oilaviy ahvolingizni kiriting:',
-        'enter_interests': 'Qiziqishlaringizni tanlang (bir nechtasini tanlashingiz mumkin):',
-        'enter_bio': 'O\'zingiz haqida gapirib bering (ixtiyoriy):',
-        'profile_created': '✅ Profil yaratildi!',
-        'main_menu': '🏠 Bosh menyu',
-        'search': '🔍 Qidirish',
-        'profile': '👤 Profil',
-        'settings': '⚙️ Sozlamalar',
-        'requests': '📨 So\'rovlar',
-        'no_profile': '❌ Sizda profil yo\'q. Sozlamalarda yarating.',
-        'search_settings': '🔍 Qidiruv sozlamalari',
-        'set_search_gender': 'Kimni qidiramiz:',
-        'set_age_range': 'Yosh oralig\'ini kiriting (dan - gacha):',
-        'set_height_range': 'Bo\'y oralig\'ini kiriting (dan - gacha sm):',
-        'set_weight_range': 'Vazn oralig\'ini kiriting (dan - gacha kg):',
-        'searching': '🔍 Mos odamlarni qidiramiz...',
-        'no_results': '😔 So\'rovingiz bo\'yicha hech narsa topilmadi',
-        'found_users': 'Topilgan foydalanuvchilar: {count}',
-        'user_profile': '👤 Foydalanuvchi profili',
-        'send_request': '📨 So\'rov yuborish',
-        'next_user': '➡️ Keyingi',
-        'request_sent': '✅ So\'rov yuborildi!',
-        'request_received': '📨 Shaxsiy xabarlarga ruxsat so\'rovi',
-        'accept_request': '✅ Qabul qilish',
-        'decline_request': '❌ Rad etish',
-        'request_accepted': '✅ So\'rov qabul qilindi!',
-        'request_declined': '❌ So\'rov rad etildi',
-        'username_shared': '👤 Foydalanuvchi o\'z username\'ini ulashdi: @{username}',
-        'edit_profile': '✏️ Profilni tahrirlash',
-        'change_language': '🌍 Tilni o\'zgartirish',
-        'back_to_menu': '⬅️ Menyuga qaytish',
-        'cancel': '❌ Bekor qilish',
-        'save': '💾 Saqlash',
-        'error': '❌ Xatolik yuz berdi',
-        'invalid_input': '❌ Noto\'g\'ri kiritish',
-        'try_again': 'Qaytadan urinib ko\'ring',
-        'gender': 'Jins',
-        'age': 'Yosh',
-        'height': 'Bo\'y',
-        'weight': 'Vazn',
-        'marital_status': 'Oilaviy ahvol',
-        'bio': 'O\'zim haqimda',
-        # Новые переводы
-        'you_selected': 'Siz tanladingiz: {value}',
-        'age_value': 'Yosh: {age}',
-        'height_value': 'Bo\'y: {height} sm',
-        'weight_value': 'Vazn: {weight} kg',
-        'marital_status_value': 'Oilaviy ahvol: {status}',
-        'age_range_error': 'Yosh {min} dan {max} gacha bo\'lishi kerak. Qaytadan urinib ko\'ring:',
-        'height_range_error': 'Bo\'y {min} dan {max} sm gacha bo\'lishi kerak. Qaytadan urinib ko\'ring:',
-        'weight_range_error': 'Vazn {min} dan {max} kg gacha bo\'lishi kerak. Qaytadan urinib ko\'ring:',
-        'please_enter_number': 'Iltimos, raqam kiriting. Qaytadan urinib ko\'ring:',
-        'user_not_found': 'Xatolik: foydalanuvchi topilmadi',
-        'edit_profile_title': '📝 Profilni tahrirlash',
-        'no_new_requests': '📨 Sizda hali yangi so\'rovlar yo\'q',
-        'settings_title': '⚙️ Sozlamalar',
-        'daily_limit_reached': 'Kunlik chegaraga yetildi',
-        'request_already_sent': 'So\'rov allaqachon yuborilgan',
-        'request_not_found': 'So\'rov topilmadi',
-        'search_results_not_found': 'Xatolik: qidiruv natijalari topilmadi',
-        'from_user': 'Kimdan: {name}',
-        'user_default': 'Foydalanuvchi',
-        'create_profile': '📝 Profil yaratish',
-    }
-}
+import json
+import logging
+import string
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+LOCALES_DIR = Path(__file__).resolve().parent
+DEFAULT_LANGUAGE = 'ru'
+
+_formatter = string.Formatter()
+
+class TranslationTemplate(str):
+    """
+    Строка с подстановками ({age}, {name} ...), разобранная при загрузке.
+
+    Остается str, поэтому без аргументов get_text возвращает ее как есть.
+    """
+
+    __slots__ = ('fields', 'format_map')
+
+    def __new__(cls, text: str, fields: FrozenSet[str]):
+        template = super().__new__(cls, text)
+        template.fields = fields
+        # Связанный метод исходной строки: без поиска атрибута на каждый вызов
+        template.format_map = text.format_map
+        return template
+
+def _template_fields(text: str) -> FrozenSet[str]:
+    """Имена подстановок в строке формата (ValueError, если формат некорректен)"""
+    return frozenset(
+        field_name.split('.')[0].split('[')[0]
+        for _, field_name, _, _ in _formatter.parse(text)
+        if field_name
+    )
+
+def _compile_text(text: str):
+    fields = _template_fields(text)
+    return TranslationTemplate(text, fields) if fields else text
+
+def _warn_duplicates(pairs):
+    table = {}
+    for key, value in pairs:
+        if key in table:
+            logger.warning(f"⚠️ Повторяющийся ключ перевода: {key}")
+        table[key] = value
+    return table
+
+def load_catalog_file(path: Path) -> Dict[str, str]:
+    """Прочитать каталог одного языка (JSON-объект «ключ -> текст»)"""
+    with open(path, encoding='utf-8') as f:
+        table = json.load(f, object_pairs_hook=_warn_duplicates)
+    if not isinstance(table, dict) or not all(isinstance(value, str) for value in table.values()):
+        raise ValueError(f"{path}: каталог должен быть объектом со строковыми значениями")
+    return table
+
+def compile_catalog(raw: Mapping[str, Mapping[str, str]], default_language: str = DEFAULT_LANGUAGE) -> Dict[str, Dict[str, str]]:
+    """
+    Собрать таблицы переводов.
+
+    Ключи, которых нет в языке, заполняются текстом языка по умолчанию
+    (с предупреждением), поэтому при вызове get_text нужен один поиск.
+    Также проверяется, что подстановки во всех языках совпадают.
+    """
+    if default_language not in raw:
+        raise ValueError(f"Нет каталога языка по умолчанию: {default_language}")
+
+    default = {key: _compile_text(text) for key, text in raw[default_language].items()}
+    catalog = {}
+    for lang, texts in raw.items():
+        table = {key: _compile_text(text) for key, text in texts.items()}
+
+        missing = default.keys() - table.keys()
+        if missing:
+            logger.warning(f"⚠️ В переводе '{lang}' нет ключей: {', '.join(sorted(missing))}")
+        extra = table.keys() - default.keys()
+        if extra:
+            logger.warning(f"⚠️ Ключи '{lang}' отсутствуют в '{default_language}': {', '.join(sorted(extra))}")
+
+        for key in table.keys() & default.keys():
+            if getattr(table[key], 'fields', frozenset()) != getattr(default[key], 'fields', frozenset()):
+                logger.warning(f"⚠️ Подстановки '{lang}.{key}' не совпадают с '{default_language}.{key}'")
+
+        catalog[lang] = {**default, **table}
+    return catalog
+
+def load_catalog(directory: Path = LOCALES_DIR, default_language: str = DEFAULT_LANGUAGE) -> Dict[str, Dict[str, str]]:
+    """Загрузить и скомпилировать все каталоги <язык>.json из директории"""
+    raw = {path.stem: load_catalog_file(path) for path in sorted(Path(directory).glob('*.json'))}
+    catalog = compile_catalog(raw, default_language)
+    logger.info(f"🌍 Загружены переводы: {', '.join(catalog)}")
+    return catalog
+
+# Таблицы после загрузки не меняются; наружу отдаются только представления для чтения
+_tables = load_catalog()
+_default_table = _tables[DEFAULT_LANGUAGE]
+_reported_missing = set()
+
+# Язык -> неизменяемая таблица «ключ -> текст»
+TRANSLATIONS = MappingProxyType({lang: MappingProxyType(table) for lang, table in _tables.items()})
+
+def is_supported_language(lang: Optional[str]) -> bool:
+    """Есть ли каталог для языка"""
+    return lang in _tables
 
 def get_text(key: str, lang: str = 'ru', **kwargs) -> str:
     """Получить переведенный текст"""
-    text = TRANSLATIONS.get(lang, TRANSLATIONS['ru']).get(key, key)
-    return text.format(**kwargs) if kwargs else text 
\ No newline at end of file
+    try:
+        text = _tables[lang][key]
+    except KeyError:
+        text = _fallback_text(key, lang)
+    if not kwargs:
+        return text
+    return text.format_map(kwargs)
+
+def _fallback_text(key: str, lang: str) -> str:
+    # Неизвестный язык — текст языка по умолчанию
+    text = _default_table.get(key)
+    if text is not None:
+        return text
+    # Как и раньше, возвращается сам ключ; в лог — один раз на ключ
+    if key not in _reported_missing:
+        _reported_missing.add(key)
+        logger.warning(f"⚠️ Нет перевода для ключа: {key}")
+    return key
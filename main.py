@@ -2,26 +2,50 @@
 import os
 import sys
 import asyncio
-import threading
 import time
 import logging
 import signal
-from http.server import HTTPServer, BaseHTTPRequestHandler
 from aiogram import Bot, Dispatcher, Router, types
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from sqlalchemy.orm import Session
 
 # Импорты из нашего проекта
-from config import BOT_TOKEN, DATABASE_URL, GENDERS, MARITAL_STATUSES, MIN_AGE, MAX_AGE, MIN_HEIGHT, MAX_HEIGHT, MIN_WEIGHT, MAX_WEIGHT
-from database.database import get_db, create_tables, check_database_connection
+from config import BOT_TOKEN, DATABASE_URL, GENDERS, MARITAL_STATUSES, MIN_AGE, MAX_AGE, MIN_HEIGHT, MAX_HEIGHT, MIN_WEIGHT, MAX_WEIGHT, SEARCH_PAGE_SIZE
+from config import BOT_MODE, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, FSM_STORAGE, CANDIDATE_INDEX
+from config import RATE_LIMIT_BACKEND, RATE_LIMIT_SYNC_INTERVAL, BLOCK_LIST_REFRESH
+from database.database import DbSession, commit_session, create_tables, check_database_connection
 from database.models import User, Request
-from handlers.user import get_user_by_telegram_id, create_user, update_user_profile, search_users, is_profile_complete, get_user_profile_text
-from handlers.requests import create_request, get_user_requests, update_request_status, can_send_request, get_request_by_id
+from handlers.user import (
+    get_user_by_telegram_id_async, get_user_by_id_async, create_user_async, update_user_profile_async,
+    search_user_ids_async, get_users_stats_async, is_profile_complete, get_user_profile_text
+)
+from handlers.requests import (
+    send_request_async, SendOutcome, get_user_requests_async, update_request_status_async,
+    get_request_by_id_async
+)
 from keyboards.base import *
+from keyboards.callbacks import (
+    LanguageCallback, GenderCallback, MaritalCallback, RequestActionCallback, SendRequestCallback, NextUserCallback
+)
+from middlewares.database import db_session_middleware
+from middlewares.scheduler import update_scheduler
+from middlewares.blocklist import blocklist_middleware
+from middlewares.throttling import throttling_middleware
+from middlewares.language import language_middleware
+from middlewares.metrics import update_metrics_middleware, handler_metrics_middleware, telegram_metrics_middleware
+from services.search_sessions import search_sessions
+from services.candidate_index import candidate_index
+from services.fsm_storage import create_fsm_storage
+from services.block_store import SqlBlockStore
+from services.rate_limit_backends import create_rate_limit_backend
+from utils.rate_limiter import spam_protection
+from services.monitoring import register_collectors, monitor_event_loop_lag
+from keyboards.cache import warm_up_keyboards
+from utils.callback_router import CallbackRouter
+from services.web_server import create_web_app, start_web_server, setup_webhook, register_webhook
 from locales.translations import get_text
 
 # Настройка логирования
@@ -40,28 +64,24 @@ print(f"🔗 DATABASE_URL: {DATABASE_URL}")
 # Глобальные переменные для управления ботом
 bot = None
 dp = None
-http_server = None
-shutdown_event = threading.Event()
+web_runner = None
+shutdown_event = asyncio.Event()
 
-def signal_handler(signum, frame):
-    """Обработчик сигналов для корректного завершения"""
+def signal_handler(signum: int):
+    """Обработчик сигналов для корректного завершения (выполняется в event loop)"""
     logger.info(f"📡 Получен сигнал {signum}, начинаем корректное завершение...")
     shutdown_event.set()
     
     if bot and dp:
         logger.info("🛑 Остановка Telegram бота...")
-        asyncio.create_task(dp.stop_polling())
-    
-    if http_server:
-        logger.info("🛑 Остановка HTTP сервера...")
-        http_server.shutdown()
-    
-    logger.info("✅ Завершение работы бота")
-    sys.exit(0)
+        asyncio.create_task(stop_polling())
 
-# Регистрируем обработчики сигналов
-signal.signal(signal.SIGTERM, signal_handler)
-signal.signal(signal.SIGINT, signal_handler)
+async def stop_polling():
+    try:
+        await dp.stop_polling()
+    except RuntimeError:
+        # Polling еще не запущен или уже остановлен
+        pass
 
 # Состояния FSM
 class RegistrationStates(StatesGroup):
@@ -80,22 +100,26 @@ class SearchStates(StatesGroup):
 
 # Инициализация бота
 bot = Bot(token=BOT_TOKEN)
-storage = MemoryStorage()
+# Состояния FSM в общей БД: переживают рестарт и доступны всем репликам
+storage = create_fsm_storage(FSM_STORAGE)
 dp = Dispatcher(storage=storage)
+# Лимиты частоты: общие для всех реплик при RATE_LIMIT_BACKEND=sql/redis
+spam_protection.rate_limiter.set_backend(create_rate_limit_backend(RATE_LIMIT_BACKEND), RATE_LIMIT_SYNC_INTERVAL)
+# Временные блокировки: общие для всех реплик и переживают рестарт
+spam_protection.block_list.set_store(SqlBlockStore(), BLOCK_LIST_REFRESH)
 router = Router()
-
-# Хранилище для поиска пользователей
-user_search_results = {}
+# Callback-кнопки: хендлер выбирается по префиксу callback_data одним поиском в словаре
+callbacks = CallbackRouter()
+callbacks.attach(router)
 
 # Обработчик команды /start
 @router.message(Command("start"))
-async def cmd_start(message: Message):
-    db = next(get_db())
-    user = get_user_by_telegram_id(message.from_user.id, db)
+async def cmd_start(message: Message, db: DbSession, lang: str):
+    user = await get_user_by_telegram_id_async(message.from_user.id, db)
     
     if not user:
         # Создаем нового пользователя
-        user = create_user(
+        user = await create_user_async(
             telegram_id=message.from_user.id,
             username=message.from_user.username,
             first_name=message.from_user.first_name,
@@ -105,11 +129,11 @@ async def cmd_start(message: Message):
         await message.answer(get_text('welcome', 'ru'), reply_markup=get_language_keyboard())
     else:
         # Показываем главное меню
-        await message.answer(get_text('main_menu', user.language), reply_markup=get_main_menu_keyboard(user.language))
+        await message.answer(get_text('main_menu', lang), reply_markup=get_main_menu_keyboard(lang))
 
 # Обработчик команды /stats (только для администратора)
 @router.message(Command("stats"))
-async def cmd_stats(message: Message):
+async def cmd_stats(message: Message, db: DbSession):
     # Проверяем, является ли пользователь администратором
     admin_ids = [123456789]  # Замените на ваш Telegram ID
     
@@ -117,29 +141,17 @@ async def cmd_stats(message: Message):
         await message.answer("❌ У вас нет доступа к этой команде")
         return
     
-    db = next(get_db())
-    
     try:
-        # Получаем статистику
-        total_users = db.query(User).count()
-        active_users = db.query(User).filter(User.is_active == True).count()
-        users_with_profiles = db.query(User).filter(
-            User.gender.isnot(None),
-            User.age.isnot(None),
-            User.height.isnot(None),
-            User.weight.isnot(None)
-        ).count()
-        
-        # Получаем последних 5 пользователей
-        recent_users = db.query(User).order_by(User.created_at.desc()).limit(5).all()
+        # Получаем статистику и последних 5 пользователей
+        stats = await get_users_stats_async(db, 5)
         
         stats_text = f"📊 **Статистика бота:**\n\n"
-        stats_text += f"👥 Всего пользователей: {total_users}\n"
-        stats_text += f"✅ Активных пользователей: {active_users}\n"
-        stats_text += f"📝 Пользователей с профилями: {users_with_profiles}\n\n"
+        stats_text += f"👥 Всего пользователей: {stats['total']}\n"
+        stats_text += f"✅ Активных пользователей: {stats['active']}\n"
+        stats_text += f"📝 Пользователей с профилями: {stats['with_profiles']}\n\n"
         
         stats_text += "🆕 **Последние пользователи:**\n"
-        for user in recent_users:
+        for user in stats['recent']:
             stats_text += f"• {user.first_name or 'Без имени'} (@{user.username or 'без username'})\n"
             stats_text += f"  ID: {user.telegram_id}, Создан: {user.created_at.strftime('%d.%m.%Y %H:%M')}\n"
         
@@ -151,7 +163,7 @@ async def cmd_stats(message: Message):
 
 # Обработчик команды /user (только для администратора)
 @router.message(Command("user"))
-async def cmd_user(message: Message):
+async def cmd_user(message: Message, db: DbSession):
     # Проверяем, является ли пользователь администратором
     admin_ids = [123456789]  # Замените на ваш Telegram ID
     
@@ -166,10 +178,8 @@ async def cmd_user(message: Message):
         await message.answer("❌ Использование: /user <telegram_id>")
         return
     
-    db = next(get_db())
-    
     try:
-        user = db.query(User).filter(User.telegram_id == telegram_id).first()
+        user = await get_user_by_telegram_id_async(telegram_id, db)
         
         if not user:
             await message.answer(f"❌ Пользователь с ID {telegram_id} не найден")
@@ -198,14 +208,13 @@ async def cmd_user(message: Message):
         await message.answer("❌ Ошибка при получении данных пользователя")
 
 # Обработчик выбора языка
-@router.callback_query(lambda c: c.data.startswith('lang_'))
-async def process_language_selection(callback: CallbackQuery):
-    lang = callback.data.split('_')[1]
-    db = next(get_db())
-    user = get_user_by_telegram_id(callback.from_user.id, db)
+@callbacks.register(LanguageCallback)
+async def process_language_selection(callback: CallbackQuery, callback_data: LanguageCallback, db: DbSession):
+    lang = callback_data.code
+    user = await get_user_by_telegram_id_async(callback.from_user.id, db)
     
     if user:
-        update_user_profile(user.id, language=lang)
+        await update_user_profile_async(user.id, db=db, language=lang)
         await callback.message.edit_text(
             get_text('language_changed', lang),
             reply_markup=get_main_menu_keyboard(lang)
@@ -214,26 +223,21 @@ async def process_language_selection(callback: CallbackQuery):
         await callback.message.edit_text(get_text('error', lang))
 
 # Обработчик создания профиля
-@router.callback_query(lambda c: c.data == 'create_profile')
-async def start_profile_creation(callback: CallbackQuery, state: FSMContext):
+@callbacks.register('create_profile')
+async def start_profile_creation(callback: CallbackQuery, state: FSMContext, lang: str):
     await state.set_state(RegistrationStates.waiting_for_gender)
     await callback.message.edit_text(
-        get_text('enter_gender', 'ru'),
-        reply_markup=get_gender_keyboard('ru')
+        get_text('enter_gender', lang),
+        reply_markup=get_gender_keyboard(lang)
     )
 
 # Обработчик выбора пола
-@router.callback_query(lambda c: c.data.startswith('gender_'))
-async def process_gender_selection(callback: CallbackQuery, state: FSMContext):
-    gender = callback.data.split('_')[1]
+@callbacks.register(GenderCallback)
+async def process_gender_selection(callback: CallbackQuery, callback_data: GenderCallback, state: FSMContext, lang: str):
+    gender = callback_data.value
     await state.update_data(gender=gender)
     await state.set_state(RegistrationStates.waiting_for_age)
     
-    # Получаем язык пользователя
-    db = next(get_db())
-    user = get_user_by_telegram_id(callback.from_user.id, db)
-    lang = user.language if user else 'ru'
-    
     gender_text = "Мужчина" if gender == "male" else "Женщина"
     if lang == 'uz':
         gender_text = "Erkak" if gender == "male" else "Ayol"
@@ -244,85 +248,65 @@ async def process_gender_selection(callback: CallbackQuery, state: FSMContext):
 
 # Обработчик ввода возраста
 @router.message(RegistrationStates.waiting_for_age)
-async def process_age_input(message: Message, state: FSMContext):
+async def process_age_input(message: Message, state: FSMContext, lang: str):
     try:
         age = int(message.text)
         if MIN_AGE <= age <= MAX_AGE:
             await state.update_data(age=age)
             await state.set_state(RegistrationStates.waiting_for_height)
             
-            # Получаем язык пользователя
-            db = next(get_db())
-            user = get_user_by_telegram_id(message.from_user.id, db)
-            lang = user.language if user else 'ru'
-            
             await message.answer(
                 f"{get_text('age_value', lang, age=age)}\n\n{get_text('enter_height', lang)} ({MIN_HEIGHT}-{MAX_HEIGHT} см):",
                 reply_markup=get_cancel_keyboard(lang)
             )
         else:
-            await message.answer(get_text('age_range_error', 'ru', min=MIN_AGE, max=MAX_AGE))
+            await message.answer(get_text('age_range_error', lang, min=MIN_AGE, max=MAX_AGE))
     except ValueError:
-        await message.answer(get_text('please_enter_number', 'ru'))
+        await message.answer(get_text('please_enter_number', lang))
 
 # Обработчик ввода роста
 @router.message(RegistrationStates.waiting_for_height)
-async def process_height_input(message: Message, state: FSMContext):
+async def process_height_input(message: Message, state: FSMContext, lang: str):
     try:
         height = int(message.text)
         if MIN_HEIGHT <= height <= MAX_HEIGHT:
             await state.update_data(height=height)
             await state.set_state(RegistrationStates.waiting_for_weight)
             
-            # Получаем язык пользователя
-            db = next(get_db())
-            user = get_user_by_telegram_id(message.from_user.id, db)
-            lang = user.language if user else 'ru'
-            
             await message.answer(
                 f"{get_text('height_value', lang, height=height)}\n\n{get_text('enter_weight', lang)} ({MIN_WEIGHT}-{MAX_WEIGHT} кг):",
                 reply_markup=get_cancel_keyboard(lang)
             )
         else:
-            await message.answer(get_text('height_range_error', 'ru', min=MIN_HEIGHT, max=MAX_HEIGHT))
+            await message.answer(get_text('height_range_error', lang, min=MIN_HEIGHT, max=MAX_HEIGHT))
     except ValueError:
-        await message.answer(get_text('please_enter_number', 'ru'))
+        await message.answer(get_text('please_enter_number', lang))
 
 # Обработчик ввода веса
 @router.message(RegistrationStates.waiting_for_weight)
-async def process_weight_input(message: Message, state: FSMContext):
+async def process_weight_input(message: Message, state: FSMContext, lang: str):
     try:
         weight = int(message.text)
         if MIN_WEIGHT <= weight <= MAX_WEIGHT:
             await state.update_data(weight=weight)
             await state.set_state(RegistrationStates.waiting_for_marital_status)
             
-            # Получаем язык пользователя
-            db = next(get_db())
-            user = get_user_by_telegram_id(message.from_user.id, db)
-            lang = user.language if user else 'ru'
-            
             await message.answer(
                 f"{get_text('weight_value', lang, weight=weight)}\n\n{get_text('enter_marital_status', lang)}",
                 reply_markup=get_marital_status_keyboard(lang)
             )
         else:
-            await message.answer(get_text('weight_range_error', 'ru', min=MIN_WEIGHT, max=MAX_WEIGHT))
+            await message.answer(get_text('weight_range_error', lang, min=MIN_WEIGHT, max=MAX_WEIGHT))
     except ValueError:
-        await message.answer(get_text('please_enter_number', 'ru'))
+        await message.answer(get_text('please_enter_number', lang))
 
 # Обработчик выбора семейного положения
-@router.callback_query(lambda c: c.data.startswith('marital_'))
-async def process_marital_status_selection(callback: CallbackQuery, state: FSMContext):
-    marital_status = callback.data.split('_')[1]
+@callbacks.register(MaritalCallback)
+async def process_marital_status_selection(callback: CallbackQuery, callback_data: MaritalCallback, state: FSMContext, lang: str):
+    marital_status = callback_data.value
     await state.update_data(marital_status=marital_status)
     await state.set_state(RegistrationStates.waiting_for_bio)
     
-    # Получаем язык пользователя
-    db = next(get_db())
-    user = get_user_by_telegram_id(callback.from_user.id, db)
-    lang = user.language if user else 'ru'
-    
     status_text = {
         'single': 'Холост/Не замужем' if lang == 'ru' else 'Bekor/Erkak emas',
         'married': 'Женат/Замужем' if lang == 'ru' else 'Uylangan/Turmush qurgan',
@@ -336,7 +320,7 @@ async def process_marital_status_selection(callback: CallbackQuery, state: FSMCo
 
 # Обработчик ввода описания
 @router.message(RegistrationStates.waiting_for_bio)
-async def process_bio_input(message: Message, state: FSMContext):
+async def process_bio_input(message: Message, state: FSMContext, db: DbSession, lang: str):
     bio = message.text if message.text != '-' else None
     await state.update_data(bio=bio)
     
@@ -345,14 +329,14 @@ async def process_bio_input(message: Message, state: FSMContext):
     logger.info(f"📝 Данные профиля для сохранения: {data}")
     
     # Сохраняем профиль в базу данных
-    db = next(get_db())
-    user = get_user_by_telegram_id(message.from_user.id, db)
+    user = await get_user_by_telegram_id_async(message.from_user.id, db)
     
     if user:
         logger.info(f"🔄 Сохранение профиля для пользователя {user.id}")
         
-        success = update_user_profile(
+        success = await update_user_profile_async(
             user.id,
+            db=db,
             gender=data['gender'],
             age=data['age'],
             height=data['height'],
@@ -364,8 +348,8 @@ async def process_bio_input(message: Message, state: FSMContext):
         if success:
             await state.clear()
             await message.answer(
-                get_text('profile_created', user.language),
-                reply_markup=get_main_menu_keyboard(user.language)
+                get_text('profile_created', lang),
+                reply_markup=get_main_menu_keyboard(lang)
             )
             logger.info(f"✅ Профиль пользователя {user.id} сохранен успешно")
         else:
@@ -376,272 +360,235 @@ async def process_bio_input(message: Message, state: FSMContext):
         logger.error(f"❌ Пользователь не найден для сохранения профиля: {message.from_user.id}")
 
 # Обработчик редактирования профиля
-@router.callback_query(lambda c: c.data == 'profile_edit')
-async def start_profile_edit(callback: CallbackQuery, state: FSMContext):
+@callbacks.register('profile_edit')
+async def start_profile_edit(callback: CallbackQuery, state: FSMContext, lang: str):
     await state.set_state(RegistrationStates.waiting_for_gender)
     
-    # Получаем язык пользователя
-    db = next(get_db())
-    user = get_user_by_telegram_id(callback.from_user.id, db)
-    lang = user.language if user else 'ru'
-    
     await callback.message.edit_text(
         f"{get_text('edit_profile_title', lang)}\n\n{get_text('enter_gender', lang)}:",
         reply_markup=get_gender_keyboard(lang)
     )
 
 # Обработчик отмены
-@router.callback_query(lambda c: c.data == 'cancel')
-async def cancel_action(callback: CallbackQuery, state: FSMContext):
+@callbacks.register('cancel')
+async def cancel_action(callback: CallbackQuery, state: FSMContext, lang: str):
     await state.clear()
-    db = next(get_db())
-    user = get_user_by_telegram_id(callback.from_user.id, db)
     await callback.message.edit_text(
-        get_text('main_menu', user.language if user else 'ru'),
-        reply_markup=get_main_menu_keyboard(user.language if user else 'ru')
+        get_text('main_menu', lang),
+        reply_markup=get_main_menu_keyboard(lang)
     )
 
 # Обработчик главного меню
-@router.callback_query(lambda c: c.data == 'back_to_main')
-async def back_to_main_menu(callback: CallbackQuery):
-    db = next(get_db())
-    user = get_user_by_telegram_id(callback.from_user.id, db)
+@callbacks.register('back_to_main')
+async def back_to_main_menu(callback: CallbackQuery, lang: str):
     await callback.message.edit_text(
-        get_text('main_menu', user.language if user else 'ru'),
-        reply_markup=get_main_menu_keyboard(user.language if user else 'ru')
+        get_text('main_menu', lang),
+        reply_markup=get_main_menu_keyboard(lang)
     )
 
 # Обработчик поиска
-@router.callback_query(lambda c: c.data == 'menu_search')
-async def menu_search(callback: CallbackQuery):
-    db = next(get_db())
-    user = get_user_by_telegram_id(callback.from_user.id, db)
+@callbacks.register('menu_search')
+async def menu_search(callback: CallbackQuery, db: DbSession, lang: str):
+    user = await get_user_by_telegram_id_async(callback.from_user.id, db)
     
     if not user or not is_profile_complete(user):
         await callback.message.edit_text(
-            get_text('no_profile', user.language if user else 'ru'),
-            reply_markup=get_main_menu_keyboard(user.language if user else 'ru')
+            get_text('no_profile', lang),
+            reply_markup=get_main_menu_keyboard(lang)
         )
         return
     
-    # Ищем пользователей
-    users = search_users(user.id, db)
-    if not users:
+    # Ищем пользователей (в сессии поиска хранятся только id)
+    candidate_ids = await search_user_ids_async(user.id, db, limit=SEARCH_PAGE_SIZE)
+    candidate = None
+    if candidate_ids:
+        await search_sessions.save(callback.from_user.id, candidate_ids, db)
+        candidate = await get_user_by_id_async(candidate_ids[0], db)
+    
+    if not candidate:
         await callback.message.edit_text(
-            get_text('no_results', user.language),
-            reply_markup=get_main_menu_keyboard(user.language)
+            get_text('no_results', lang),
+            reply_markup=get_main_menu_keyboard(lang)
         )
         return
     
-    # Сохраняем результаты поиска
-    user_search_results[callback.from_user.id] = users
-    
     # Показываем первого пользователя
-    await show_user_profile(callback.message, users[0], 0, user.language)
+    await show_user_profile(callback.message, candidate, lang)
 
 # Обработчик профиля
-@router.callback_query(lambda c: c.data == 'menu_profile')
-async def menu_profile(callback: CallbackQuery):
-    db = next(get_db())
-    user = get_user_by_telegram_id(callback.from_user.id, db)
+@callbacks.register('menu_profile')
+async def menu_profile(callback: CallbackQuery, db: DbSession, lang: str):
+    user = await get_user_by_telegram_id_async(callback.from_user.id, db)
     
     if not user:
         await callback.message.edit_text(
-            get_text('no_profile', 'ru'),
-            reply_markup=get_main_menu_keyboard('ru')
+            get_text('no_profile', lang),
+            reply_markup=get_main_menu_keyboard(lang)
         )
         return
     
-    profile_text = get_user_profile_text(user, user.language)
+    profile_text = get_user_profile_text(user, lang)
     await callback.message.edit_text(
         profile_text,
-        reply_markup=get_profile_keyboard(user.language)
+        reply_markup=get_profile_keyboard(lang)
     )
 
 # Обработчик запросов
-@router.callback_query(lambda c: c.data == 'menu_requests')
-async def menu_requests(callback: CallbackQuery):
-    db = next(get_db())
-    user = get_user_by_telegram_id(callback.from_user.id, db)
+@callbacks.register('menu_requests')
+async def menu_requests(callback: CallbackQuery, db: DbSession, lang: str):
+    user = await get_user_by_telegram_id_async(callback.from_user.id, db)
     
     if not user:
         await callback.message.edit_text(
-            get_text('no_profile', 'ru'),
-            reply_markup=get_main_menu_keyboard('ru')
+            get_text('no_profile', lang),
+            reply_markup=get_main_menu_keyboard(lang)
         )
         return
     
-    requests = get_user_requests(user.id, db, 'pending')
+    requests = await get_user_requests_async(user.id, db, 'pending')
     
     if not requests:
         await callback.message.edit_text(
-            get_text('no_new_requests', user.language),
-            reply_markup=get_main_menu_keyboard(user.language)
+            get_text('no_new_requests', lang),
+            reply_markup=get_main_menu_keyboard(lang)
         )
         return
     
     # Показываем первый запрос
-    await show_request(callback.message, requests[0], user.language)
+    await show_request(callback.message, requests[0], db, lang)
 
 # Обработчик настроек
-@router.callback_query(lambda c: c.data == 'menu_settings')
-async def menu_settings(callback: CallbackQuery):
-    db = next(get_db())
-    user = get_user_by_telegram_id(callback.from_user.id, db)
+@callbacks.register('menu_settings')
+async def menu_settings(callback: CallbackQuery, db: DbSession, lang: str):
+    user = await get_user_by_telegram_id_async(callback.from_user.id, db)
     
     if not user:
         await callback.message.edit_text(
-            get_text('no_profile', 'ru'),
-            reply_markup=get_main_menu_keyboard('ru')
+            get_text('no_profile', lang),
+            reply_markup=get_main_menu_keyboard(lang)
         )
         return
     
     await callback.message.edit_text(
-        get_text('settings_title', user.language),
-        reply_markup=get_settings_keyboard(user.language)
+        get_text('settings_title', lang),
+        reply_markup=get_settings_keyboard(lang)
     )
 
 # Обработчик отправки запроса
-@router.callback_query(lambda c: c.data == 'send_request')
-async def send_request_handler(callback: CallbackQuery):
-    db = next(get_db())
-    user = get_user_by_telegram_id(callback.from_user.id, db)
+@callbacks.register(SendRequestCallback)
+async def send_request_handler(callback: CallbackQuery, callback_data: SendRequestCallback, db: DbSession, lang: str):
+    user = await get_user_by_telegram_id_async(callback.from_user.id, db)
     
     if not user:
-        await callback.answer(get_text('error', 'ru'))
+        await callback.answer(get_text('error', lang))
         return
     
-    # Получаем текущего пользователя из поиска
-    if callback.from_user.id not in user_search_results:
-        await callback.answer(get_text('search_results_not_found', 'ru'))
-        return
-    
-    current_users = user_search_results[callback.from_user.id]
-    # Получаем индекс из callback_data кнопки "Следующий"
-    current_user_index = 0  # По умолчанию первый пользователь
+    # Id показанного пользователя передается в callback_data
+    target_user = await get_user_by_id_async(callback_data.user_id, db)
     
-    # Пытаемся получить индекс из callback_data
-    try:
-        if hasattr(callback.message, 'reply_markup') and callback.message.reply_markup:
-            for row in callback.message.reply_markup.inline_keyboard:
-                for button in row:
-                    if button.callback_data and button.callback_data.startswith('next_user_'):
-                        current_user_index = int(button.callback_data.split('_')[2])
-                        break
-    except:
-        current_user_index = 0
-    
-    if current_user_index >= len(current_users):
-        current_user_index = 0
-    
-    target_user = current_users[current_user_index]
-    
-    # Проверяем лимит запросов
-    if not can_send_request(user.id, db):
-        await callback.answer(get_text('daily_limit_reached', user.language))
+    if not target_user:
+        await callback.answer(get_text('search_results_not_found', lang))
         return
     
-    # Создаем запрос
-    request = create_request(user.id, target_user.id, db)
-    if request:
-        await callback.answer(get_text('request_sent', user.language))
+    # Создаем запрос (проверка дубликата и дневного лимита — в одной операции)
+    result = await send_request_async(user.id, target_user.id, db)
+    if result.outcome == SendOutcome.QUOTA:
+        await callback.answer(get_text('daily_limit_reached', lang))
+    elif result.outcome == SendOutcome.DUPLICATE:
+        await callback.answer(get_text('request_already_sent', lang))
+    else:
+        # Фиксируем запрос до уведомления: получатель может нажать «Принять»
+        # раньше, чем DbSessionMiddleware закоммитит сессию после обработчика
+        await commit_session(db)
+        await callback.answer(get_text('request_sent', lang))
         
         # Уведомляем получателя
         try:
             await bot.send_message(
                 target_user.telegram_id,
-                get_text('request_received', user.language),
-                reply_markup=get_request_actions_keyboard(request.id, user.language)
+                get_text('request_received', target_user.language),
+                reply_markup=get_request_actions_keyboard(result.request_id, target_user.language)
             )
         except Exception as e:
             print(f"Ошибка отправки уведомления: {e}")
-    else:
-        await callback.answer(get_text('request_already_sent', user.language))
 
 # Обработчик принятия/отклонения запроса
-@router.callback_query(lambda c: c.data.startswith(('accept_request_', 'decline_request_')))
-async def handle_request_action(callback: CallbackQuery):
-    action, request_id = callback.data.split('_', 1)
-    request_id = int(request_id)
+@callbacks.register(RequestActionCallback)
+async def handle_request_action(callback: CallbackQuery, callback_data: RequestActionCallback, db: DbSession, lang: str):
+    action, request_id = callback_data.action, callback_data.request_id
     
-    db = next(get_db())
-    user = get_user_by_telegram_id(callback.from_user.id, db)
+    user = await get_user_by_telegram_id_async(callback.from_user.id, db)
     
     if not user:
-        await callback.answer(get_text('error', 'ru'))
+        await callback.answer(get_text('error', lang))
         return
     
-    request = get_request_by_id(request_id, db)
+    request = await get_request_by_id_async(request_id, db)
     if not request or request.to_user_id != user.id:
-        await callback.answer(get_text('request_not_found', user.language))
+        await callback.answer(get_text('request_not_found', lang))
         return
     
-    if action == 'accept_request':
+    if action == 'accept':
         # Принимаем запрос
-        update_request_status(request_id, 'accepted', db)
-        await callback.message.edit_text(get_text('request_accepted', user.language))
+        await update_request_status_async(request_id, 'accepted', db)
+        await callback.message.edit_text(get_text('request_accepted', lang))
         
         # Уведомляем отправителя
         try:
-            from_user = db.query(User).filter(User.id == request.from_user_id).first()
+            from_user = await get_user_by_id_async(request.from_user_id, db)
             if from_user and user.username:
                 await bot.send_message(
                     from_user.telegram_id,
-                    get_text('username_shared', user.language, username=user.username)
+                    get_text('username_shared', from_user.language, username=user.username)
                 )
         except Exception as e:
             print(f"Ошибка отправки уведомления: {e}")
     
-    elif action == 'decline_request':
+    elif action == 'decline':
         # Отклоняем запрос
-        update_request_status(request_id, 'declined', db)
-        await callback.message.edit_text(get_text('request_declined', user.language))
+        await update_request_status_async(request_id, 'declined', db)
+        await callback.message.edit_text(get_text('request_declined', lang))
 
 # Обработчик следующего пользователя
-@router.callback_query(lambda c: c.data.startswith('next_user'))
-async def next_user_handler(callback: CallbackQuery):
-    if callback.from_user.id not in user_search_results:
-        await callback.answer(get_text('search_results_not_found', 'ru'))
-        return
+@callbacks.register(NextUserCallback)
+async def next_user_handler(callback: CallbackQuery, callback_data: NextUserCallback, db: DbSession, lang: str):
+    user = await get_user_by_telegram_id_async(callback.from_user.id, db)
     
-    users = user_search_results[callback.from_user.id]
+    if not user:
+        await callback.answer(get_text('search_results_not_found', lang))
+        return
     
-    # Получаем текущий индекс
-    current_index = 0
-    try:
-        if callback.data != 'next_user':
-            current_index = int(callback.data.split('_')[2])
-    except:
-        current_index = 0
-    
-    # Показываем следующего пользователя
-    if current_index + 1 < len(users):
-        next_index = current_index + 1
-        await show_user_profile(callback.message, users[next_index], next_index, 'ru')
+    # Показываем пользователя после текущего кандидата из callback_data
+    candidate = await get_next_candidate(callback.from_user.id, user.id, callback_data.user_id, db)
+    if candidate:
+        await show_user_profile(callback.message, candidate, lang)
     else:
         await callback.message.edit_text(
-            get_text('no_results', 'ru'),
-            reply_markup=get_main_menu_keyboard('ru')
+            get_text('no_results', lang),
+            reply_markup=get_main_menu_keyboard(lang)
         )
 
 # Вспомогательные функции
-async def show_user_profile(message: Message, user: User, index: int, lang: str = 'ru'):
+async def get_next_candidate(telegram_id: int, user_id: int, current_id: int, db: DbSession):
+    """Следующий кандидат после current_id: из сессии поиска, иначе следующая страница из БД"""
+    next_id = await search_sessions.next_candidate(telegram_id, current_id, db)
+    if next_id is None:
+        # Сессия истекла или исчерпана — продолжаем keyset-запросом с последнего id
+        candidate_ids = await search_user_ids_async(user_id, db, after_id=current_id, limit=SEARCH_PAGE_SIZE)
+        if not candidate_ids:
+            return None
+        await search_sessions.save(telegram_id, candidate_ids, db)
+        next_id = candidate_ids[0]
+    return await get_user_by_id_async(next_id, db)
+
+async def show_user_profile(message: Message, user: User, lang: str = 'ru'):
     """Показать профиль пользователя"""
     profile_text = get_user_profile_text(user, lang)
-    
-    # Создаем клавиатуру с индексом
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text=get_text('send_request', lang), callback_data="send_request")],
-        [InlineKeyboardButton(text=get_text('next_user', lang), callback_data=f"next_user_{index}")],
-        [InlineKeyboardButton(text=get_text('back_to_menu', lang), callback_data="back_to_main")]
-    ])
-    
-    await message.edit_text(profile_text, reply_markup=keyboard)
+    await message.edit_text(profile_text, reply_markup=get_user_profile_keyboard(user.id, lang))
 
-async def show_request(message: Message, request: Request, lang: str = 'ru'):
+async def show_request(message: Message, request: Request, db: DbSession, lang: str = 'ru'):
     """Показать запрос"""
-    db = next(get_db())
-    from_user = db.query(User).filter(User.id == request.from_user_id).first()
+    from_user = await get_user_by_id_async(request.from_user_id, db)
     
     request_text = f"📨 {get_text('request_received', lang)}\n\n"
     if from_user:
@@ -652,59 +599,42 @@ async def show_request(message: Message, request: Request, lang: str = 'ru'):
         reply_markup=get_request_actions_keyboard(request.id, lang)
     )
 
-# HTTP сервер для healthcheck
-class HealthCheckHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        print(f"Получен запрос: {self.path}")
-        
-        try:
-            if self.path in ['/', '/health']:
-                self.send_response(200)
-                self.send_header('Content-type', 'text/plain; charset=utf-8')
-                self.end_headers()
-                response = "OK - Dating Bot is running!"
-                self.wfile.write(response.encode('utf-8'))
-                print(f"Отправлен ответ: 200 OK для {self.path}")
-            else:
-                self.send_response(404)
-                self.end_headers()
-                print("Отправлен ответ: 404")
-        except Exception as e:
-            print(f"Ошибка в обработке запроса: {e}")
-            try:
-                self.send_response(500)
-                self.end_headers()
-            except:
-                pass
-
-    def log_message(self, format, *args):
-        print(f"HTTP: {format % args}")
-
-# Функция запуска HTTP сервера в фоне
-def run_http_server():
-    """Запуск HTTP сервера в фоновом потоке"""
-    global http_server
-    port = int(os.environ.get("PORT", 8000))
-    print(f"🌐 Запуск HTTP сервера на порту {port}")
+async def run_polling():
+    """Long polling с повторными попытками при конфликте с другим экземпляром"""
+    # Добавляем обработку конфликтов
+    max_retries = 5
+    retry_delay = 10
     
-    try:
-        http_server = HTTPServer(('0.0.0.0', port), HealthCheckHandler)
-        print(f"✅ HTTP сервер запущен на 0.0.0.0:{port}")
-        
-        # Запускаем сервер с проверкой shutdown_event
-        while not shutdown_event.is_set():
-            http_server.handle_request()
+    for attempt in range(max_retries):
+        try:
+            # Проверяем shutdown_event перед запуском
+            if shutdown_event.is_set():
+                logger.info("🛑 Получен сигнал завершения, останавливаем запуск")
+                return
             
-    except Exception as e:
-        print(f"❌ Ошибка запуска HTTP сервера: {e}")
-    finally:
-        if http_server:
-            http_server.server_close()
-            print("🛑 HTTP сервер остановлен")
+            # Сигналы обрабатывает signal_handler выше
+            await dp.start_polling(bot, skip_updates=True, handle_signals=False)
+            break
+        except Exception as e:
+            if "TelegramConflictError" in str(e) or "terminated by other getUpdates request" in str(e):
+                logger.warning(f"⚠️ Конфликт с другим экземпляром бота (попытка {attempt + 1}/{max_retries})")
+                if attempt < max_retries - 1:
+                    logger.info(f"⏳ Ожидание {retry_delay} секунд перед повторной попыткой...")
+                    await asyncio.sleep(retry_delay)
+                    retry_delay *= 2  # Увеличиваем задержку
+                else:
+                    logger.error("❌ Не удалось запустить бота после всех попыток")
+                    return
+            else:
+                logger.error(f"❌ Неожиданная ошибка запуска бота: {e}")
+                raise
 
 # Главная функция
 async def main():
+    global web_runner
     print("=== ЗАПУСК СИСТЕМЫ ===")
+    # Фоновые задачи отменяются при завершении
+    background_tasks = []
     
     try:
         # Проверяем подключение к базе данных
@@ -716,50 +646,70 @@ async def main():
         create_tables()
         print("✅ Таблицы созданы")
         
+        # FSMContextMiddleware aiogram читает состояние на каждом апдейте;
+        # он переносится за блокировки, лимиты и планировщик
+        dp.update.outer_middleware.unregister(dp.fsm)
+        # Блокировки: апдейты заблокированных отбрасываются без обращения к БД
+        dp.update.outer_middleware(blocklist_middleware)
+        background_tasks.append(asyncio.create_task(spam_protection.block_list.run_refresh_loop()))
+        # Лимиты частоты: отбрасывают лишние апдейты без обращения к БД
+        dp.update.outer_middleware(throttling_middleware)
+        # Планировщик: ограничивает параллелизм и упорядочивает апдейты чата
+        dp.update.outer_middleware(update_scheduler)
+        dp.update.outer_middleware(dp.fsm)
+        # Метрики: учитывают полное время апдейта после получения слота
+        dp.update.outer_middleware(update_metrics_middleware)
+        router.message.middleware(handler_metrics_middleware)
+        router.callback_query.middleware(handler_metrics_middleware)
+        bot.session.middleware(telegram_metrics_middleware)
+        register_collectors()
+        background_tasks.append(asyncio.create_task(monitor_event_loop_lag()))
+        
+        # Индекс кандидатов грузится в фоне; до загрузки поиск идет в SQL
+        if CANDIDATE_INDEX and candidate_index.enabled:
+            background_tasks.append(asyncio.create_task(candidate_index.run_refresh_loop()))
+        elif CANDIDATE_INDEX:
+            logger.warning("⚠️ CANDIDATE_INDEX включен, но numpy не установлен — поиск через SQL")
+        
+        # Одна сессия БД на апдейт
+        dp.update.outer_middleware(db_session_middleware)
+        # Язык пользователя определяется один раз на апдейт (после сессии БД)
+        dp.update.outer_middleware(language_middleware)
+        
         # Регистрируем роутеры
         dp.include_router(router)
+        # Статические клавиатуры строятся один раз на язык до первого апдейта
+        warm_up_keyboards()
         
-        # Запускаем HTTP сервер в фоновом потоке
-        http_thread = threading.Thread(target=run_http_server, daemon=True)
-        http_thread.start()
-        print("✅ HTTP сервер запущен в фоне")
-        
-        # Ждем немного
-        await asyncio.sleep(3)
+        # Сигналы завершения обрабатываем в event loop
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, signal_handler, sig)
         
-        # Запускаем бота в основном потоке
-        print("🤖 Запуск Telegram бота...")
+        # HTTP сервер health/ready/metrics на том же event loop
+        web_app = create_web_app(bot)
+        if BOT_MODE == 'webhook':
+            if not WEBHOOK_URL:
+                logger.error("❌ BOT_MODE=webhook требует WEBHOOK_URL")
+                return
+            # Апдейты принимает тот же aiohttp сервер
+            setup_webhook(web_app, dp, bot, WEBHOOK_PATH, WEBHOOK_SECRET)
         
-        # Добавляем обработку конфликтов
-        max_retries = 5
-        retry_delay = 10
+        web_runner = await start_web_server(web_app, int(os.environ.get("PORT", 8000)))
+        print("✅ HTTP сервер запущен")
         
-        for attempt in range(max_retries):
-            try:
-                # Проверяем shutdown_event перед запуском
-                if shutdown_event.is_set():
-                    logger.info("🛑 Получен сигнал завершения, останавливаем запуск")
-                    return
-                
-                await dp.start_polling(bot, skip_updates=True)
-                break
-            except Exception as e:
-                if "TelegramConflictError" in str(e) or "terminated by other getUpdates request" in str(e):
-                    logger.warning(f"⚠️ Конфликт с другим экземпляром бота (попытка {attempt + 1}/{max_retries})")
-                    if attempt < max_retries - 1:
-                        logger.info(f"⏳ Ожидание {retry_delay} секунд перед повторной попыткой...")
-                        await asyncio.sleep(retry_delay)
-                        retry_delay *= 2  # Увеличиваем задержку
-                    else:
-                        logger.error("❌ Не удалось запустить бота после всех попыток")
-                        return
-                else:
-                    logger.error(f"❌ Неожиданная ошибка запуска бота: {e}")
-                    raise
+        if BOT_MODE == 'webhook':
+            await register_webhook(bot, dp, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET)
+            print("🔗 Бот работает в режиме webhook")
+        else:
+            # Запускаем бота в основном потоке
+            print("🤖 Запуск Telegram бота...")
+            await run_polling()
+            # Polling остановлен сигналом или исчерпал попытки: ждать больше нечего
+            shutdown_event.set()
         
         # Ждем завершения
-        while not shutdown_event.is_set():
-            await asyncio.sleep(1)
+        await shutdown_event.wait()
         
     except Exception as e:
         print(f"❌ Критическая ошибка: {e}")
@@ -769,6 +719,14 @@ async def main():
     finally:
         # Корректное завершение
         logger.info("🛑 Завершение работы приложения")
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        if web_runner:
+            await web_runner.cleanup()
+            logger.info("🛑 HTTP сервер остановлен")
+        await spam_protection.rate_limiter.close()
+        await spam_protection.block_list.close()
         if bot:
             await bot.session.close()
 
@@ -15,7 +15,8 @@ from aiogram.enums import ParseMode
 project_path = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_path)
 
-from config import BOT_TOKEN
+from config import BOT_TOKEN, BOT_MODE, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, FSM_STORAGE, REDIS_URL
+from config import RATE_LIMIT_BACKEND, RATE_LIMIT_SYNC_INTERVAL, BLOCK_LIST_REFRESH
 from database.database import create_tables, check_database_connection
 from handlers.registration import router as registration_router
 from handlers.search import router as search_router
@@ -23,6 +24,16 @@ from handlers.requests import router as requests_router
 from handlers.settings import router as settings_router
 from handlers.profile import router as profile_router
 from handlers.language import router as language_router
+from middlewares.language import language_middleware
+from middlewares.scheduler import update_scheduler
+from middlewares.blocklist import blocklist_middleware
+from middlewares.throttling import throttling_middleware
+from keyboards.cache import warm_up_keyboards
+from services.fsm_storage import create_fsm_storage
+from services.block_store import SqlBlockStore
+from services.rate_limit_backends import create_rate_limit_backend
+from utils.rate_limiter import spam_protection
+from services.web_server import serve_webhook
 from utils.logger import setup_logger, log_bot_event, log_error
 
 # Настройка логирования для Beget
@@ -60,7 +71,30 @@ async def main():
         return
     
     # Создаем диспетчер
-    dp = Dispatcher()
+    dp = Dispatcher(storage=create_fsm_storage(FSM_STORAGE, REDIS_URL))
+    
+    # Лимиты частоты: общие для всех процессов при RATE_LIMIT_BACKEND=sql/redis
+    spam_protection.rate_limiter.set_backend(create_rate_limit_backend(RATE_LIMIT_BACKEND, REDIS_URL), RATE_LIMIT_SYNC_INTERVAL)
+    # Временные блокировки в общей БД; загружаются и обновляются в фоне
+    spam_protection.block_list.set_store(SqlBlockStore(), BLOCK_LIST_REFRESH)
+    block_list_task = asyncio.create_task(spam_protection.block_list.run_refresh_loop())
+    
+    # FSMContextMiddleware aiogram читает состояние на каждом апдейте;
+    # он переносится за блокировки, лимиты и планировщик
+    dp.update.outer_middleware.unregister(dp.fsm)
+    
+    # Блокировки: апдейты заблокированных пользователей отбрасываются первыми
+    dp.update.outer_middleware(blocklist_middleware)
+    
+    # Лимиты частоты: лишние апдейты отбрасываются до планировщика и БД
+    dp.update.outer_middleware(throttling_middleware)
+    
+    # Ограничение параллелизма и очередь апдейтов каждого чата
+    dp.update.outer_middleware(update_scheduler)
+    dp.update.outer_middleware(dp.fsm)
+    
+    # Язык пользователя определяется один раз на апдейт
+    dp.update.outer_middleware(language_middleware)
     
     # Регистрируем роутеры
     routers = [
@@ -75,13 +109,20 @@ async def main():
     for router in routers:
         dp.include_router(router)
     
+    # Статические клавиатуры строятся один раз на язык до первого апдейта
+    warm_up_keyboards()
+    
     log_bot_event(logger, "Routers registered", f"Total routers: {len(routers)}")
     logger.info("Бот запущен и готов к работе на Beget!")
     
     # Запускаем бота
     try:
-        log_bot_event(logger, "Starting polling", "Bot is now polling for updates")
-        await dp.start_polling(bot)
+        if BOT_MODE == 'webhook':
+            log_bot_event(logger, "Starting webhook", f"Bot is now serving webhook at {WEBHOOK_PATH}")
+            await serve_webhook(bot, dp, int(os.environ.get("PORT", 8000)), WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET)
+        else:
+            log_bot_event(logger, "Starting polling", "Bot is now polling for updates")
+            await dp.start_polling(bot)
     except KeyboardInterrupt:
         log_bot_event(logger, "Bot stopped", "User interrupted")
         logger.info("Бот остановлен пользователем")
@@ -90,6 +131,10 @@ async def main():
         logger.error(f"Ошибка при работе бота: {e}")
     finally:
         try:
+            block_list_task.cancel()
+            await asyncio.gather(block_list_task, return_exceptions=True)
+            await spam_protection.rate_limiter.close()
+            await spam_protection.block_list.close()
             await bot.session.close()
             log_bot_event(logger, "Bot session closed", "Cleanup completed")
         except Exception as e:
@@ -11,7 +11,8 @@ sys.path.insert(0, str(project_path))
 
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
-from config_railway import BOT_TOKEN
+from config_railway import BOT_TOKEN, BOT_MODE, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, FSM_STORAGE, REDIS_URL
+from config_railway import RATE_LIMIT_BACKEND, RATE_LIMIT_SYNC_INTERVAL, BLOCK_LIST_REFRESH
 from database.database import create_tables, check_database_connection
 from handlers.registration import router as registration_router
 from handlers.search import router as search_router
@@ -19,6 +20,16 @@ from handlers.requests import router as requests_router
 from handlers.settings import router as settings_router
 from handlers.profile import router as profile_router
 from handlers.language import router as language_router
+from middlewares.language import language_middleware
+from middlewares.scheduler import update_scheduler
+from middlewares.blocklist import blocklist_middleware
+from middlewares.throttling import throttling_middleware
+from keyboards.cache import warm_up_keyboards
+from services.fsm_storage import create_fsm_storage
+from services.block_store import SqlBlockStore
+from services.rate_limit_backends import create_rate_limit_backend
+from utils.rate_limiter import spam_protection
+from services.web_server import serve_webhook
 from utils.logger import setup_logger, log_bot_event, log_error
 
 # Настройка логирования для Railway
@@ -48,7 +59,29 @@ async def main():
 
     # Инициализация бота с оптимизированными настройками
     bot = Bot(token=BOT_TOKEN, parse_mode=ParseMode.HTML)
-    dp = Dispatcher()
+    dp = Dispatcher(storage=create_fsm_storage(FSM_STORAGE, REDIS_URL))
+    # Лимиты частоты: общие для всех процессов при RATE_LIMIT_BACKEND=sql/redis
+    spam_protection.rate_limiter.set_backend(create_rate_limit_backend(RATE_LIMIT_BACKEND, REDIS_URL), RATE_LIMIT_SYNC_INTERVAL)
+    # Временные блокировки в общей БД; загружаются и обновляются в фоне
+    spam_protection.block_list.set_store(SqlBlockStore(), BLOCK_LIST_REFRESH)
+    block_list_task = asyncio.create_task(spam_protection.block_list.run_refresh_loop())
+
+    # FSMContextMiddleware aiogram читает состояние на каждом апдейте;
+    # он переносится за блокировки, лимиты и планировщик
+    dp.update.outer_middleware.unregister(dp.fsm)
+
+    # Блокировки: апдейты заблокированных пользователей отбрасываются первыми
+    dp.update.outer_middleware(blocklist_middleware)
+
+    # Лимиты частоты: лишние апдейты отбрасываются до планировщика и БД
+    dp.update.outer_middleware(throttling_middleware)
+
+    # Ограничение параллелизма и очередь апдейтов каждого чата
+    dp.update.outer_middleware(update_scheduler)
+    dp.update.outer_middleware(dp.fsm)
+
+    # Язык пользователя определяется один раз на апдейт
+    dp.update.outer_middleware(language_middleware)
 
     # Регистрация роутеров
     dp.include_router(registration_router)
@@ -58,19 +91,31 @@ async def main():
     dp.include_router(profile_router)
     dp.include_router(language_router)
 
+    # Статические клавиатуры строятся один раз на язык до первого апдейта
+    warm_up_keyboards()
+
     # Оптимизированные настройки для Railway
     try:
-        log_bot_event(logger, "Bot polling", "Starting bot polling on Railway...")
-        await dp.start_polling(
-            bot, 
-            skip_updates=True,  # Пропускать старые обновления
-            polling_timeout=30,  # Увеличенный таймаут
-            polling_limit=100    # Увеличенный лимит
-        )
+        if BOT_MODE == 'webhook':
+            # Несколько реплик за балансировщиком Railway
+            log_bot_event(logger, "Bot webhook", f"Serving webhook at {WEBHOOK_PATH} on Railway...")
+            await serve_webhook(bot, dp, int(os.environ.get("PORT", 8000)), WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET)
+        else:
+            log_bot_event(logger, "Bot polling", "Starting bot polling on Railway...")
+            await dp.start_polling(
+                bot, 
+                skip_updates=True,  # Пропускать старые обновления
+                polling_timeout=30,  # Увеличенный таймаут
+                polling_limit=100    # Увеличенный лимит
+            )
     except Exception as e:
         log_error(logger, e, "Bot polling")
         logger.error(f"Ошибка при запуске бота: {e}")
     finally:
+        block_list_task.cancel()
+        await asyncio.gather(block_list_task, return_exceptions=True)
+        await spam_protection.rate_limiter.close()
+        await spam_protection.block_list.close()
         await bot.session.close()
 
 if __name__ == "__main__":
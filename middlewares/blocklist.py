@@ -0,0 +1,47 @@
+"""
+Middleware временных блокировок: апдейты заблокированных пользователей отбрасываются первыми
+"""
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from middlewares.throttling import get_update_action, notify_rejected, throttled_updates
+from utils.rate_limiter import spam_protection, SpamProtection
+
+# Уведомление о блокировке не чаще раза в окно этого действия
+NOTICE_ACTION = 'block_notice'
+
+class BlocklistMiddleware(BaseMiddleware):
+    """
+    Отбрасывает апдейты заблокированных пользователей (внешний middleware dp.update).
+
+    Проверка — поиск в словаре BlockList. Регистрируется перед ограничителем,
+    планировщиком и FSMContextMiddleware aiogram (который в entry points
+    переносится после них), поэтому апдейт заблокированного пользователя
+    не читает состояние FSM, не открывает сессию БД и не доходит до хендлеров.
+    О блокировке сообщается один раз в окно block_notice; остальные апдейты
+    отбрасываются без ответа.
+    """
+
+    def __init__(self, protection: SpamProtection = spam_protection):
+        self.protection = protection
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get('event_from_user')
+        if user is None or not self.protection.block_list.is_blocked(user.id):
+            return await handler(event, data)
+
+        throttled_updates.inc(reason='blocked', action=get_update_action(event) or 'other')
+        if self.protection.rate_limiter.is_allowed(user.id, NOTICE_ACTION):
+            await notify_rejected(event, user.id, 'temporarily_blocked')
+        return None
+
+# Глобальный экземпляр
+blocklist_middleware = BlocklistMiddleware()
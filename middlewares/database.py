@@ -0,0 +1,71 @@
+"""
+Middleware сессии базы данных: одна сессия и одна транзакция на апдейт
+"""
+
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from database.database import get_session, commit_session, rollback_session, get_pool_status
+
+logger = logging.getLogger(__name__)
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Открывает ровно одну сессию на апдейт и передает ее в хендлер аргументом `db`.
+    
+    Транзакция фиксируется один раз после хендлера (или откатывается при ошибке),
+    а соединение всегда возвращается в пул.
+    """
+    
+    def __init__(self, pool_warning_ratio: float = 0.8):
+        self.pool_warning_ratio = pool_warning_ratio
+        # Gauge: количество открытых сессий и пиковое занятие пула
+        self.active_sessions = 0
+        self.peak_checked_out = 0
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        self.active_sessions += 1
+        try:
+            async with get_session() as db:
+                data['db'] = db
+                try:
+                    result = await handler(event, data)
+                except Exception:
+                    self._check_pool()
+                    await rollback_session(db)
+                    raise
+                # Снимаем gauge до коммита, пока соединение еще занято
+                self._check_pool()
+                await commit_session(db)
+                return result
+        finally:
+            self.active_sessions -= 1
+    
+    def _check_pool(self):
+        """Обновить gauge пула и предупредить, если он близок к исчерпанию"""
+        status = get_pool_status()
+        self.peak_checked_out = max(self.peak_checked_out, status['checked_out'])
+        if status['capacity'] and status['checked_out'] >= status['capacity'] * self.pool_warning_ratio:
+            logger.warning(
+                f"⚠️ Пул соединений почти исчерпан: {status['checked_out']}/{status['capacity']} "
+                f"(открытых сессий: {self.active_sessions})"
+            )
+    
+    def get_stats(self) -> dict:
+        """Получить статистику сессий и пула соединений"""
+        return {
+            'active_sessions': self.active_sessions,
+            'peak_checked_out': self.peak_checked_out,
+            **get_pool_status()
+        }
+
+# Глобальный экземпляр
+db_session_middleware = DbSessionMiddleware()
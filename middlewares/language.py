@@ -0,0 +1,38 @@
+"""
+Middleware определения языка пользователя: один раз на апдейт
+"""
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from database.database import get_session
+from handlers.user import get_user_language_async, DEFAULT_LANGUAGE
+
+class LanguageMiddleware(BaseMiddleware):
+    """
+    Определяет язык пользователя и передает его в хендлер аргументом `lang`.
+    
+    Язык берется из кэша пользователей, а при промахе — запросом одной колонки.
+    Использует сессию DbSessionMiddleware, если она уже открыта.
+    """
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get('event_from_user')
+        if user is None:
+            data['lang'] = DEFAULT_LANGUAGE
+        elif 'db' in data:
+            data['lang'] = await get_user_language_async(user.id, data['db'])
+        else:
+            async with get_session() as db:
+                data['lang'] = await get_user_language_async(user.id, db)
+        return await handler(event, data)
+
+# Глобальный экземпляр
+language_middleware = LanguageMiddleware()
@@ -0,0 +1,83 @@
+"""
+Middleware метрик: поток апдейтов, латентность хендлеров и вызовов Telegram API
+"""
+
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import TelegramObject
+
+from utils.metrics import metrics
+
+updates_total = metrics.counter("bot_updates_total", "Обработанные апдейты", ("type",))
+update_errors = metrics.counter("bot_update_errors_total", "Апдейты, завершившиеся ошибкой", ("type",))
+update_duration = metrics.histogram(
+    "bot_update_duration_seconds", "Полное время обработки апдейта", ("type",)
+)
+handler_duration = metrics.histogram(
+    "bot_handler_duration_seconds", "Время выполнения хендлера", ("handler",)
+)
+telegram_duration = metrics.histogram(
+    "telegram_api_duration_seconds", "Время вызовов Telegram Bot API", ("method",)
+)
+telegram_errors = metrics.counter(
+    "telegram_api_errors_total", "Ошибки вызовов Telegram Bot API", ("method", "error")
+)
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Считает апдейты и полное время их обработки (регистрируется внешним на dp.update)"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        update_type = getattr(event, 'event_type', 'unknown')
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            update_errors.inc(type=update_type)
+            raise
+        finally:
+            updates_total.inc(type=update_type)
+            update_duration.observe(time.perf_counter() - start, type=update_type)
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Время выполнения конкретного хендлера (внутренний middleware роутера)"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get('handler')
+        name = getattr(getattr(handler_object, 'callback', None), '__name__', 'unknown')
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            handler_duration.observe(time.perf_counter() - start, handler=name)
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """Латентность и ошибки исходящих вызовов Bot API (bot.session.middleware)"""
+
+    async def __call__(self, make_request, bot, method):
+        name = getattr(method, '__api_method__', type(method).__name__)
+        start = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            telegram_errors.inc(method=name, error=type(e).__name__)
+            raise
+        finally:
+            telegram_duration.observe(time.perf_counter() - start, method=name)
+
+# Глобальные экземпляры
+update_metrics_middleware = UpdateMetricsMiddleware()
+handler_metrics_middleware = HandlerMetricsMiddleware()
+telegram_metrics_middleware = TelegramMetricsMiddleware()
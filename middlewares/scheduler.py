@@ -0,0 +1,98 @@
+"""
+Планировщик апдейтов: ограничение параллелизма и последовательная обработка в рамках чата
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from config import MAX_CONCURRENT_UPDATES
+from utils.metrics import metrics
+
+queue_wait = metrics.histogram(
+    "scheduler_wait_seconds", "Ожидание апдейта в очереди планировщика",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+class UpdateSchedulerMiddleware(BaseMiddleware):
+    """
+    Апдейты разных чатов обрабатываются параллельно, но не больше max_concurrency
+    одновременно; апдейты одного чата — строго по очереди (FSM-переходы не гоняются).
+
+    Регистрируется на dp.update после блокировок и лимитов частоты (они
+    отбрасывают апдейты без БД), но перед FSMContextMiddleware aiogram
+    и сессией БД: состояние FSM читается и сессия открывается только после
+    получения слота, и пул не исчерпывается при всплеске нагрузки.
+    """
+
+    def __init__(self, max_concurrency: int = 20):
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # chat_id -> [Lock, число апдейтов чата в работе]; запись удаляется, когда счетчик 0
+        self._chat_locks: Dict[int, list] = {}
+        self.waiting = 0
+        self.in_flight = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        chat_id = self._get_chat_id(data)
+        start = time.perf_counter()
+        started = False
+        self.waiting += 1
+
+        entry = None
+        if chat_id is not None:
+            entry = self._chat_locks.setdefault(chat_id, [asyncio.Lock(), 0])
+            entry[1] += 1
+        try:
+            # Сначала очередь чата, затем общий слот: ждущие апдейты одного чата не занимают слоты
+            if entry is not None:
+                await entry[0].acquire()
+            try:
+                async with self._semaphore:
+                    started = True
+                    self.waiting -= 1
+                    queue_wait.observe(time.perf_counter() - start)
+                    self.in_flight += 1
+                    try:
+                        return await handler(event, data)
+                    finally:
+                        self.in_flight -= 1
+            finally:
+                if entry is not None:
+                    entry[0].release()
+        finally:
+            if not started:
+                # Апдейт отменен, не дождавшись слота
+                self.waiting -= 1
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._chat_locks.pop(chat_id, None)
+
+    @staticmethod
+    def _get_chat_id(data: Dict[str, Any]) -> Optional[int]:
+        chat = data.get('event_chat')
+        if chat is not None:
+            return chat.id
+        user = data.get('event_from_user')
+        return user.id if user is not None else None
+
+    def get_stats(self) -> dict:
+        """Получить состояние очереди планировщика"""
+        return {
+            'waiting': self.waiting,
+            'in_flight': self.in_flight,
+            'active_chats': len(self._chat_locks),
+            'max_concurrency': self.max_concurrency
+        }
+
+# Глобальный экземпляр
+update_scheduler = UpdateSchedulerMiddleware(max_concurrency=MAX_CONCURRENT_UPDATES)
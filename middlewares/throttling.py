@@ -0,0 +1,140 @@
+"""
+Middleware ограничения частоты: лишние апдейты отбрасываются до сессии БД и хендлеров
+"""
+
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from database.user_cache import user_cache
+from locales.translations import get_text
+from utils.metrics import metrics
+from utils.rate_limiter import spam_protection, SpamProtection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LANGUAGE = 'ru'
+
+# Префикс callback_data -> действие RateLimiter; остальные апдейты — 'message'.
+# Меню, возврат назад и шаги анкеты — 'navigation' с большим лимитом:
+# обычная регистрация или просмотр меню не должны упираться в лимит сообщений
+CALLBACK_ACTIONS = {
+    # main.py
+    'menu_search': 'search',
+    'send_request': 'request',
+    'request': 'request_answer',
+    'profile_edit': 'profile_edit',
+    'next_user': 'browse',
+    'menu_profile': 'navigation',
+    'menu_requests': 'navigation',
+    'menu_settings': 'navigation',
+    'back_to_main': 'navigation',
+    'cancel': 'navigation',
+    'create_profile': 'navigation',
+    'lang': 'navigation',
+    'gender': 'navigation',
+    'marital': 'navigation',
+    # handlers/*
+    'search': 'search',
+    'request_access': 'request',
+    'skip_profile': 'browse',
+    'language': 'navigation',
+    'set_language': 'navigation',
+    'language_settings': 'navigation',
+    'age': 'navigation',
+    'height': 'navigation',
+    'weight': 'navigation',
+    'interest': 'navigation',
+    'interests_done': 'navigation',
+    'edit_profile': 'profile_edit',
+    'edit_age': 'profile_edit',
+    'edit_height': 'profile_edit',
+    'edit_weight': 'profile_edit',
+    'edit_marital': 'profile_edit',
+    'edit_interests': 'profile_edit',
+    'edit_bio': 'profile_edit',
+    'interest_edit': 'profile_edit',
+    'interests_save': 'profile_edit',
+    'search_settings': 'settings_edit',
+    'change_gender_preference': 'settings_edit',
+    'change_age_range': 'settings_edit',
+    'change_height_range': 'settings_edit',
+    'change_weight_range': 'settings_edit',
+    'change_marital_preference': 'settings_edit',
+    'gender_pref': 'settings_edit',
+    'marital_pref': 'settings_edit',
+}
+
+# Уведомление о лимите не чаще раза в окно этого действия
+NOTICE_ACTION = 'throttle_notice'
+# Отклоненные апдейты сверх лимита этого действия ведут к временной блокировке
+STRIKE_ACTION = 'throttle_strike'
+
+throttled_updates = metrics.counter(
+    "throttled_updates_total", "Апдейты, отклоненные до обработки", ("reason", "action")
+)
+
+def get_update_action(update: Update) -> Optional[str]:
+    """Действие RateLimiter для апдейта (None — апдейт не ограничивается)"""
+    if update.callback_query is not None:
+        prefix = (update.callback_query.data or '').partition(':')[0]
+        return CALLBACK_ACTIONS.get(prefix, 'message')
+    if update.message is not None:
+        return 'message'
+    return None
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Проверяет лимит пользователя для действия апдейта (внешний middleware dp.update).
+
+    Проверка — один поиск в памяти процесса, без БД, поэтому регистрируется
+    перед планировщиком и сессией БД: лишний апдейт не занимает ни слот,
+    ни соединение. Пользователь получает уведомление не чаще раза
+    в окно throttle_notice; нажатие кнопки подтверждается всегда.
+    Если отклонения продолжаются сверх лимита throttle_strike, пользователь
+    временно блокируется.
+    """
+
+    def __init__(self, protection: SpamProtection = spam_protection):
+        self.protection = protection
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get('event_from_user')
+        action = get_update_action(event) if user is not None else None
+        if action is None:
+            return await handler(event, data)
+
+        limiter = self.protection.rate_limiter
+        if limiter.is_allowed(user.id, action):
+            return await handler(event, data)
+
+        throttled_updates.inc(reason='rate_limit', action=action)
+        # Блокировка — только если отклонения продолжаются сверх throttle_strike;
+        # об этом сообщит BlocklistMiddleware на следующем апдейте
+        if not limiter.is_allowed(user.id, STRIKE_ACTION):
+            self.protection.block_user(user.id, 'rapid_requests')
+        text_key = 'rate_limited' if limiter.is_allowed(user.id, NOTICE_ACTION) else None
+        await notify_rejected(event, user.id, text_key)
+        return None
+
+async def notify_rejected(update: Update, user_id: int, text_key: Optional[str]):
+    """Ответить на отклоненный апдейт: нажатие кнопки подтверждается всегда, текст — если text_key задан"""
+    # Язык только из кэша: отклоненный апдейт не должен обращаться к БД
+    text = get_text(text_key, user_cache.get_language(user_id) or DEFAULT_LANGUAGE) if text_key else None
+    try:
+        if update.callback_query is not None:
+            await update.callback_query.answer(text)
+        elif text is not None and update.message is not None:
+            await update.message.answer(text)
+    except Exception as e:
+        logger.warning(f"⚠️ Не удалось уведомить {user_id} об отклонении апдейта: {e}")
+
+# Глобальный экземпляр
+throttling_middleware = ThrottlingMiddleware()
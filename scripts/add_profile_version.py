@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Скрипт для добавления поля profile_version в существующую базу данных
+"""
+
+import os
+import sys
+
+# Добавляем корневую директорию в путь
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.database import engine
+from sqlalchemy import inspect, text
+
+def add_profile_version_field():
+    """Добавить поле profile_version в таблицу users"""
+    
+    print("🔧 Добавление поля profile_version в таблицу users...")
+    
+    try:
+        with engine.connect() as connection:
+            # Проверяем, существует ли уже поле (SQLite и PostgreSQL)
+            columns = [column['name'] for column in inspect(connection).get_columns('users')]
+            
+            if 'profile_version' in columns:
+                print("✅ Поле profile_version уже существует")
+                return True
+            
+            # Добавляем поле; существующие строки получают версию 1
+            connection.execute(text("ALTER TABLE users ADD COLUMN profile_version INTEGER NOT NULL DEFAULT 1"))
+            connection.commit()
+            
+            print("✅ Поле profile_version успешно добавлено")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Ошибка при добавлении поля profile_version: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = add_profile_version_field()
+    if success:
+        print("\n✅ Миграция завершена успешно!")
+    else:
+        print("\n❌ Ошибка при выполнении миграции!")
+        sys.exit(1)
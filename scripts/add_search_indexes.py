@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Скрипт для добавления составных индексов поиска и запросов в существующую базу данных
+"""
+
+import os
+import sys
+
+# Добавляем корневую директорию в путь
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.database import engine
+from database.models import User, Request
+from sqlalchemy import text
+
+def remove_duplicate_requests(connection) -> int:
+    """Удалить повторные запросы (from_user_id, to_user_id), оставив самый ранний"""
+    result = connection.execute(text(
+        "DELETE FROM requests WHERE id NOT IN ("
+        "SELECT MIN(id) FROM requests GROUP BY from_user_id, to_user_id)"
+    ))
+    return result.rowcount
+
+def add_search_indexes():
+    """Создать индексы из __table_args__ моделей User и Request"""
+
+    print("🔧 Добавление индексов для поиска и запросов...")
+
+    try:
+        with engine.connect() as connection:
+            # Уникальный индекс не создастся, пока в таблице есть дубликаты
+            removed = remove_duplicate_requests(connection)
+            if removed:
+                print(f"🧹 Удалено повторных запросов: {removed}")
+
+            for table in (User.__table__, Request.__table__):
+                for index in sorted(table.indexes, key=lambda i: i.name):
+                    index.create(bind=connection, checkfirst=True)
+                    print(f"✅ {table.name}: {index.name}")
+
+            connection.commit()
+            return True
+
+    except Exception as e:
+        print(f"❌ Ошибка при добавлении индексов: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = add_search_indexes()
+    if success:
+        print("\n✅ Миграция завершена успешно!")
+    else:
+        print("\n❌ Ошибка при выполнении миграции!")
+        sys.exit(1)
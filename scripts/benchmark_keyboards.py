@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Стоимость одного вызова функций клавиатур: без кэша и с кэшем
+
+Использование:
+    python scripts/benchmark_keyboards.py            # 10000 вызовов на функцию
+    python scripts/benchmark_keyboards.py 50000
+"""
+
+import os
+import sys
+import timeit
+
+# Добавляем корневую директорию в путь
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyboards.base import get_main_menu_keyboard, get_settings_keyboard, get_gender_keyboard
+from keyboards.cache import warm_up_keyboards
+
+def per_call_us(func, number: int) -> float:
+    """Лучшее из трех измерений, микросекунд на вызов"""
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e6
+
+def benchmark(number: int = 10000):
+    warm_up_keyboards()
+
+    cases = [
+        ("get_main_menu_keyboard",
+         lambda: get_main_menu_keyboard.__wrapped__('ru'),
+         lambda: get_main_menu_keyboard('ru')),
+        ("get_settings_keyboard",
+         lambda: get_settings_keyboard.__wrapped__('uz'),
+         lambda: get_settings_keyboard('uz')),
+        ("get_gender_keyboard",
+         lambda: get_gender_keyboard.__wrapped__('ru'),
+         lambda: get_gender_keyboard('ru')),
+    ]
+
+    # Кэшированная клавиатура должна совпадать с построенной заново,
+    # но каждый вызов получает свой экземпляр
+    for name, before, after in cases:
+        assert before() == after(), f"{name}: клавиатуры различаются"
+        first, second = after(), after()
+        assert first is not second and first.inline_keyboard[0][0] is not second.inline_keyboard[0][0], \
+            f"{name}: вызовы делят один экземпляр"
+
+    print(f"⏱️ Клавиатуры, мкс на вызов ({number} вызовов)\n")
+    print(f"{'функция':<32}{'без кэша':>12}{'с кэшем':>12}{'ускорение':>12}")
+    for name, before, after in cases:
+        before_us = per_call_us(before, number)
+        after_us = per_call_us(after, number)
+        print(f"{name:<32}{before_us:>12.2f}{after_us:>12.2f}{before_us / after_us:>11.1f}x")
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Стоимость проверки текста на спам: прежние проверки и однопроходный анализатор
+
+Использование:
+    python scripts/benchmark_text_analysis.py            # 2000 вызовов на текст
+    python scripts/benchmark_text_analysis.py 10000
+"""
+
+import os
+import re
+import sys
+import timeit
+
+# Добавляем корневую директорию в путь
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.rate_limiter import SpamProtection
+from utils.text_analysis import analyze_text
+from utils.validators import validate_bio
+
+URL_PATTERN = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
+
+def old_has_repeated_chars(text: str) -> bool:
+    """Прежняя реализация: цикл по индексам"""
+    if len(text) < 3:
+        return False
+    for i in range(len(text) - 2):
+        if text[i] == text[i+1] == text[i+2]:
+            return True
+    return False
+
+def old_is_all_caps(text: str) -> bool:
+    """Прежняя реализация: список букв на каждый вызов"""
+    if len(text) < 5:
+        return False
+    letters = [c for c in text if c.isalpha()]
+    if not letters:
+        return False
+    return all(c.isupper() for c in letters)
+
+def old_contains_links(text: str) -> bool:
+    """Прежняя реализация: поиск по некомпилированному шаблону"""
+    return bool(re.search(URL_PATTERN, text))
+
+def old_check_message_content(text: str) -> dict:
+    result = {'is_spam': False, 'reason': None, 'action': 'allow'}
+    if old_has_repeated_chars(text):
+        result = {'is_spam': True, 'reason': 'repeated_characters', 'action': 'warn'}
+    if old_is_all_caps(text):
+        result = {'is_spam': True, 'reason': 'all_caps', 'action': 'warn'}
+    if old_contains_links(text):
+        result = {'is_spam': True, 'reason': 'contains_links', 'action': 'block'}
+    return result
+
+def old_validate_bio(bio: str):
+    """Прежняя реализация: четыре поиска по некомпилированным шаблонам"""
+    if not bio:
+        return True, None
+    if len(bio) > 500:
+        return False, "Описание не должно превышать 500 символов"
+    for pattern in (URL_PATTERN, r'@\w+', r'#\w+', r'<[^>]+>'):
+        if re.search(pattern, bio):
+            return False, "Описание содержит запрещенные символы или ссылки"
+    return True, None
+
+BIO = (
+    "Люблю путешествовать, читать книги и готовить для друзей. Работаю инженером, "
+    "по выходным хожу в горы или катаюсь на велосипеде. Ищу человека с чувством юмора, "
+    "с которым интересно разговаривать обо всем на свете и молчать тоже комфортно. "
+    "Ценю честность, доброту и уважение. Мечтаю однажды объехать всю Центральную Азию. "
+    "Немного играю на гитаре, учу английский и турецкий, люблю кошек и крепкий чай"
+)[:500]
+
+TEXTS = [
+    ("короткое сообщение", "Привет, как дела?"),
+    ("длинное описание", BIO),
+    ("описание со ссылкой в конце", BIO[:470] + " http://x.io"),
+    ("капс", "ПРИВЕТ ВСЕМ, КТО ЗДЕСЬ ЕСТЬ"),
+]
+
+def per_call_us(func, number: int) -> float:
+    """Лучшее из трех измерений, микросекунд на вызов"""
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e6
+
+def benchmark(number: int = 2000):
+    new_check = SpamProtection().check_message_content
+
+    # Решения должны совпадать с прежними
+    for name, text in TEXTS:
+        assert old_check_message_content(text) == new_check(text), f"{name}: разные результаты проверки"
+        assert old_validate_bio(text) == validate_bio(text), f"{name}: разные результаты validate_bio"
+
+    print(f"⏱️ Проверка текста, мкс на вызов ({number} вызовов)\n")
+    print(f"{'текст':<30}{'проверка':<22}{'прежняя':>10}{'новая':>10}{'ускорение':>12}")
+    for name, text in TEXTS:
+        for check, before, after in (
+            ("check_message_content", lambda: old_check_message_content(text), lambda: new_check(text)),
+            ("validate_bio", lambda: old_validate_bio(text), lambda: validate_bio(text)),
+        ):
+            before_us = per_call_us(before, number)
+            after_us = per_call_us(after, number)
+            print(f"{name:<30}{check:<22}{before_us:>10.2f}{after_us:>10.2f}{before_us / after_us:>11.1f}x")
+
+    analyze_us = per_call_us(lambda: analyze_text(BIO), number)
+    print(f"\nanalyze_text по описанию из {len(BIO)} символов: {analyze_us:.2f} мкс")
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
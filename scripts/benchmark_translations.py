@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Стоимость одного вызова get_text: скомпилированный каталог и прежний поиск по JSON-словарям
+
+Использование:
+    python scripts/benchmark_translations.py            # 100000 вызовов на случай
+    python scripts/benchmark_translations.py 500000
+"""
+
+import os
+import sys
+import timeit
+
+# Добавляем корневую директорию в путь
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from locales.translations import get_text, load_catalog_file, LOCALES_DIR, TRANSLATIONS
+
+# Прежняя реализация: словари из файлов, два поиска и format(**kwargs)
+RAW = {lang: load_catalog_file(LOCALES_DIR / f"{lang}.json") for lang in TRANSLATIONS}
+
+def legacy_get_text(key: str, lang: str = 'ru', **kwargs) -> str:
+    """Прежний get_text"""
+    text = RAW.get(lang, RAW['ru']).get(key, key)
+    return text.format(**kwargs) if kwargs else text
+
+def per_call_ns(func, number: int) -> float:
+    """Лучшее из трех измерений, наносекунд на вызов"""
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e9
+
+def benchmark(number: int = 100000):
+    cases = [
+        ("без подстановок",
+         lambda: legacy_get_text('main_menu', 'uz'),
+         lambda: get_text('main_menu', 'uz')),
+        ("с подстановкой",
+         lambda: legacy_get_text('age_value', 'uz', age=25),
+         lambda: get_text('age_value', 'uz', age=25)),
+        ("неизвестный язык",
+         lambda: legacy_get_text('main_menu', 'xx'),
+         lambda: get_text('main_menu', 'xx')),
+    ]
+
+    # Тексты должны совпадать с прежней реализацией
+    for name, before, after in cases:
+        assert before() == after(), f"{name}: тексты различаются"
+
+    print(f"⏱️ get_text, нс на вызов ({number} вызовов)\n")
+    print(f"{'случай':<24}{'прежний':>12}{'каталог':>12}{'ускорение':>12}")
+    for name, before, after in cases:
+        before_ns = per_call_ns(before, number)
+        after_ns = per_call_ns(after, number)
+        print(f"{name:<24}{before_ns:>12.0f}{after_ns:>12.0f}{before_ns / after_ns:>11.1f}x")
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
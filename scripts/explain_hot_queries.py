@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Планы выполнения (EXPLAIN) для частых запросов бота на SQLite и PostgreSQL
+
+Использование:
+    python scripts/explain_hot_queries.py            # EXPLAIN / EXPLAIN QUERY PLAN
+    python scripts/explain_hot_queries.py --analyze  # EXPLAIN ANALYZE (только PostgreSQL)
+"""
+
+import os
+import sys
+from datetime import datetime
+
+# Добавляем корневую директорию в путь
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.database import engine
+from database.models import User, Request
+from handlers.user import get_search_conditions
+from sqlalchemy import select, func, text
+
+def get_hot_queries() -> dict:
+    """Частые запросы в том виде, в котором их строят обработчики"""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    # Условия поиска строятся той же функцией, что и в search_user_ids (включая анти-join по запросам)
+    searcher = User(id=1, search_gender='Женщина', min_age=20, max_age=30)
+
+    return {
+        'user_by_telegram_id': select(User).where(User.telegram_id == 123456789),
+        'search_user_ids': (
+            select(User.id)
+            .where(*get_search_conditions(searcher), User.id > 0)
+            .order_by(User.id)
+            .limit(50)
+        ),
+        'recent_users': select(User).order_by(User.created_at.desc()).limit(5),
+        'requests_today': (
+            select(func.count())
+            .select_from(Request)
+            .where(Request.from_user_id == 1, Request.created_at >= today)
+        ),
+        'existing_request': (
+            select(Request.id)
+            .where(Request.from_user_id == 1, Request.to_user_id == 2)
+            .limit(1)
+        ),
+        'pending_requests': select(Request).where(Request.to_user_id == 1, Request.status == 'pending'),
+    }
+
+def explain_prefix(dialect: str, analyze: bool) -> str:
+    if dialect == 'sqlite':
+        return "EXPLAIN QUERY PLAN "
+    return "EXPLAIN ANALYZE " if analyze else "EXPLAIN "
+
+def explain_hot_queries(analyze: bool = False):
+    """Вывести план каждого частого запроса"""
+    dialect = engine.dialect.name
+    prefix = explain_prefix(dialect, analyze)
+
+    print(f"🔍 EXPLAIN для {dialect} ({engine.url.render_as_string(hide_password=True)})\n")
+
+    with engine.connect() as connection:
+        for name, query in get_hot_queries().items():
+            sql = str(query.compile(engine, compile_kwargs={"literal_binds": True}))
+            rows = connection.execute(text(prefix + sql)).fetchall()
+
+            print(f"📊 {name}")
+            for row in rows:
+                # SQLite: (id, parent, notused, detail); PostgreSQL: (QUERY PLAN,)
+                print(f"    {row[-1]}")
+            print()
+
+if __name__ == "__main__":
+    explain_hot_queries(analyze="--analyze" in sys.argv)
@@ -28,6 +28,128 @@ def test_database():
         print(f"❌ Ошибка тестирования БД: {e}")
         return False
 
+def test_send_request():
+    """Тест отправки запросов: дубликаты и дневной лимит"""
+    print("\n📨 Тестирование отправки запросов...")
+    
+    try:
+        from config import MAX_REQUESTS_PER_DAY
+        from database.database import SessionLocal, create_tables
+        from database.models import Request, RequestQuota, User
+        from handlers.requests import send_request, SendOutcome
+        
+        create_tables()
+        db = SessionLocal()
+        try:
+            # Тестовые пользователи; все изменения откатываются в конце
+            users = [User(telegram_id=-1000 - i, first_name="test") for i in range(MAX_REQUESTS_PER_DAY + 2)]
+            db.add_all(users)
+            db.flush()
+            sender, targets = users[0], users[1:]
+            
+            first = send_request(sender.id, targets[0].id, db)
+            assert first.outcome == SendOutcome.SENT and first.request_id, "Первый запрос должен быть отправлен"
+            
+            duplicate = send_request(sender.id, targets[0].id, db)
+            assert duplicate.outcome == SendOutcome.DUPLICATE, "Повторный запрос тому же пользователю — дубликат"
+            
+            outcomes = [send_request(sender.id, target.id, db).outcome for target in targets[1:]]
+            assert outcomes[:-1] == [SendOutcome.SENT] * (MAX_REQUESTS_PER_DAY - 1), "Запросы в пределах лимита должны отправляться"
+            assert outcomes[-1] == SendOutcome.QUOTA, "Запрос сверх дневного лимита должен отклоняться"
+            
+            sent = db.query(Request).filter(Request.from_user_id == sender.id).count()
+            assert sent == MAX_REQUESTS_PER_DAY, "Отклоненные запросы не должны сохраняться"
+            quota = db.query(RequestQuota).filter(RequestQuota.user_id == sender.id).one()
+            assert quota.count == MAX_REQUESTS_PER_DAY, "Дубликат и отклоненный запрос не должны расходовать лимит"
+        finally:
+            db.rollback()
+            db.close()
+        
+        print("✅ Отправка запросов работает корректно")
+        return True
+    except Exception as e:
+        print(f"❌ Ошибка тестирования отправки запросов: {e}")
+        return False
+
+def test_search_pagination():
+    """Тест keyset-пагинации ленты поиска по User.id"""
+    print("\n🔎 Тестирование пагинации поиска...")
+    
+    try:
+        from database.database import SessionLocal, create_tables
+        from database.models import User
+        from handlers.user import search_user_ids
+        
+        create_tables()
+        db = SessionLocal()
+        try:
+            # Тестовые пользователи с уникальным полом, чтобы в выборку не попали реальные анкеты
+            searcher = User(telegram_id=-2000, search_gender='test_gender')
+            candidates = [User(telegram_id=-2001 - i, gender='test_gender', is_active=True) for i in range(7)]
+            hidden = User(telegram_id=-2100, gender='test_gender', is_active=False)
+            db.add_all([searcher, *candidates, hidden])
+            db.flush()
+            
+            pages, after_id = [], 0
+            while True:
+                page = search_user_ids(searcher.id, db, after_id=after_id, limit=3)
+                if not page:
+                    break
+                assert page == sorted(page) and page[0] > after_id, "Страница должна идти по возрастанию после курсора"
+                pages.append(page)
+                after_id = page[-1]
+            
+            assert [len(page) for page in pages] == [3, 3, 1], "Страницы должны заполняться до limit"
+            assert sum(pages, []) == sorted(user.id for user in candidates), "Страницы без пропусков и повторов, без неактивных"
+        finally:
+            db.rollback()
+            db.close()
+        
+        print("✅ Пагинация поиска работает корректно")
+        return True
+    except Exception as e:
+        print(f"❌ Ошибка тестирования пагинации поиска: {e}")
+        return False
+
+def test_fsm_storage():
+    """Тест хранилища FSM в БД: буфер записей и видимость для других процессов"""
+    print("\n💾 Тестирование хранилища FSM...")
+    
+    try:
+        import asyncio
+        from aiogram.fsm.storage.base import StorageKey
+        from database.database import create_tables
+        from services.fsm_storage import SqlStorage
+        
+        async def check():
+            key = StorageKey(bot_id=0, chat_id=-1, user_id=-1)
+            writer = SqlStorage(flush_interval=60)
+            # Второй процесс без кэша чтения видит только записанное в БД
+            reader = SqlStorage(flush_interval=60, read_cache_ttl=0)
+            try:
+                await writer.set_state(key, 'Registration:age')
+                await writer.set_data(key, {'age': 25})
+                await writer.set_state(key, 'Registration:height')
+                assert await writer.get_state(key) == 'Registration:height', "Процесс должен видеть свои записи до сброса"
+                assert await reader.get_state(key) is None, "До сброса запись не должна попадать в БД"
+                
+                await writer.flush()
+                assert await reader.get_state(key) == 'Registration:height', "После сброса видна последняя запись"
+                assert await reader.get_data(key) == {'age': 25}, "Данные должны сохраняться"
+            finally:
+                await writer.set_state(key, None)
+                await writer.set_data(key, {})
+                await writer.close()
+            assert await reader.get_state(key) is None and await reader.get_data(key) == {}, "Очищенный ключ удаляется"
+        
+        create_tables()
+        asyncio.run(check())
+        print("✅ Хранилище FSM работает корректно")
+        return True
+    except Exception as e:
+        print(f"❌ Ошибка тестирования хранилища FSM: {e}")
+        return False
+
 def test_translations():
     """Тест переводов"""
     print("\n🌍 Тестирование переводов...")
@@ -58,6 +180,44 @@ def test_translations():
         print(f"❌ Ошибка тестирования переводов: {e}")
         return False
 
+def test_translation_catalog():
+    """Скомпилированный каталог дает те же тексты, что прежний get_text по JSON-файлам"""
+    print("\n📚 Каталог переводов...")
+    
+    try:
+        from locales.translations import get_text, load_catalog_file, LOCALES_DIR, TRANSLATIONS
+        
+        # Прежняя реализация: словари из файлов, два поиска и format(**kwargs)
+        raw = {lang: load_catalog_file(LOCALES_DIR / f"{lang}.json") for lang in TRANSLATIONS}
+        def legacy_get_text(key, lang='ru', **kwargs):
+            text = raw.get(lang, raw['ru']).get(key, key)
+            return text.format(**kwargs) if kwargs else text
+        
+        # Каждый шаблон подставляется с объявленными полями и совпадает с прежним результатом
+        for lang, table in TRANSLATIONS.items():
+            for key, text in table.items():
+                fields = getattr(text, 'fields', ())
+                values = {field: f"<{field}>" for field in fields}
+                result = get_text(key, lang, **values)
+                assert all(value in result for value in values.values()), f"{lang}.{key}: подстановка потеряна"
+                if key in raw[lang]:
+                    assert result == legacy_get_text(key, lang, **values), f"{lang}.{key}: текст отличается"
+                    assert get_text(key, lang) == raw[lang][key], f"{lang}.{key}: текст без подстановок отличается"
+        print("✅ Все шаблоны форматируются и совпадают с прежней реализацией")
+        
+        # Неизвестный язык — русский текст, неизвестный ключ — сам ключ
+        assert get_text('age_value', 'xx', age=25) == legacy_get_text('age_value', 'ru', age=25)
+        assert get_text('main_menu', 'xx') == raw['ru']['main_menu']
+        assert get_text('no_such_key', 'uz') == 'no_such_key'
+        print("✅ Запасной язык и неизвестные ключи работают")
+        return True
+    except AssertionError as e:
+        print(f"❌ Ошибка каталога переводов: {e}")
+        return False
+    except Exception as e:
+        print(f"❌ Ошибка тестирования каталога переводов: {e}")
+        return False
+
 def test_keyboards():
     """Тест клавиатур"""
     print("\n⌨️ Тестирование клавиатур...")
@@ -123,7 +283,11 @@ def main():
     
     tests = [
         ("База данных", test_database),
+        ("Отправка запросов", test_send_request),
+        ("Хранилище FSM", test_fsm_storage),
+        ("Пагинация поиска", test_search_pagination),
         ("Переводы", test_translations),
+        ("Каталог переводов", test_translation_catalog),
         ("Клавиатуры", test_keyboards),
         ("Конфигурация", test_config)
     ]
@@ -5,11 +5,22 @@
 
 import os
 import sys
-import time
 
 # Добавляем корневую директорию в путь
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+class FakeClock:
+    """Часы, которые идут только по команде (тесты без time.sleep)"""
+    
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+    
+    def __call__(self) -> float:
+        return self.now
+    
+    def advance(self, seconds: float):
+        self.now += seconds
+
 def test_validators():
     """Тест валидаторов"""
     print("🔒 Тестирование валидаторов...")
@@ -86,6 +97,29 @@ def test_rate_limiter():
         limiter.reset_user_limits(user_id)
         assert limiter.is_allowed(user_id, 'message') == True, "После сброса запрос должен быть разрешен"
         
+        # GCRA: всплеск до count подряд, затем один запрос на каждые window / count секунд
+        clock = FakeClock()
+        gcra = RateLimiter(clock=clock)
+        gcra.limits['burst'] = {'count': 4, 'window': 40}
+        assert all(gcra.is_allowed(user_id, 'burst') for _ in range(4)), "Всплеск в пределах лимита должен быть разрешен"
+        assert gcra.is_allowed(user_id, 'burst') == False, "Запрос сверх всплеска должен быть заблокирован"
+        assert gcra.get_reset_time(user_id, 'burst') is not None, "У исчерпанного лимита должно быть время сброса"
+        clock.advance(9.9)
+        assert gcra.is_allowed(user_id, 'burst') == False, "До истечения window / count запрос не восстанавливается"
+        clock.advance(0.1)
+        assert gcra.get_remaining_requests(user_id, 'burst') == 1, "Через window / count должен восстановиться один запрос"
+        assert gcra.is_allowed(user_id, 'burst') == True, "Восстановленный запрос должен быть разрешен"
+        assert gcra.is_allowed(user_id, 'burst') == False, "Второй запрос еще не восстановился"
+        clock.advance(40)
+        assert gcra.get_remaining_requests(user_id, 'burst') == 4, "Через окно лимит восстанавливается полностью"
+        assert gcra.get_reset_time(user_id, 'burst') is None, "Восстановленный лимит не имеет времени сброса"
+        
+        # Память ограничена: давно не использованные ключи вытесняются
+        small = RateLimiter(max_keys=3)
+        for other_user in range(10):
+            small.is_allowed(other_user, 'message')
+        assert small.get_stats()['keys'] <= 3, "Число ключей не должно превышать max_keys"
+        
         print("✅ Rate limiter работает корректно")
         return True
         
@@ -132,6 +166,82 @@ def test_spam_protection():
         print(f"❌ Ошибка тестирования защиты от спама: {e}")
         return False
 
+def test_block_list():
+    """Тест временных блокировок"""
+    print("\n🚫 Тестирование блокировок...")
+    
+    try:
+        import asyncio
+        from utils.block_list import BlockList, BlockStore
+        from utils.rate_limiter import SpamProtection
+        
+        class MemoryBlockStore(BlockStore):
+            """Хранилище в памяти вместо таблицы user_blocks"""
+            def __init__(self):
+                self.rows = {}
+            
+            async def save(self, changes):
+                for user_id, block in changes.items():
+                    if block is None:
+                        self.rows.pop(user_id, None)
+                    else:
+                        self.rows[user_id] = block
+            
+            async def load_active(self, now):
+                return {user_id: block for user_id, block in self.rows.items() if block[0] > now}
+        
+        async def check_persistence():
+            clock = FakeClock()
+            store = MemoryBlockStore()
+            first = BlockList(store, clock=clock)
+            first.block(1, 60, 'invalid_inputs')
+            first.block(2, 10, 'repeated_errors')
+            first.block(3, 60, 'invalid_inputs')
+            first.unblock(3)
+            await first.close()
+            
+            # Другой процесс (или рестарт) видит блокировки из хранилища
+            second = BlockList(store, clock=clock)
+            await second.load()
+            assert second.is_blocked(1) and second.is_blocked(2), "Блокировки должны загружаться из хранилища"
+            assert not second.is_blocked(3), "Снятая блокировка не должна загружаться"
+            clock.advance(10)
+            assert not second.is_blocked(2) and second.is_blocked(1), "Истекшая блокировка должна сниматься"
+            await second.load()
+            assert len(second) == 1, "Истекшие блокировки не должны загружаться"
+        
+        # Истечение и продление
+        clock = FakeClock()
+        blocks = BlockList(clock=clock)
+        blocks.block(1, 10, 'repeated_errors')
+        blocks.block(1, 5, 'repeated_errors')
+        assert blocks.is_blocked(1), "Блокировка должна действовать сразу"
+        clock.advance(7)
+        assert blocks.is_blocked(1), "Более короткая блокировка не должна сокращать текущую"
+        blocks.block(1, 20, 'repeated_errors')
+        clock.advance(10)
+        assert blocks.is_blocked(1), "Продленная блокировка не должна сниматься по старому сроку"
+        clock.advance(17)
+        assert not blocks.is_blocked(1) and len(blocks) == 0, "Блокировка должна истекать"
+        
+        asyncio.run(check_persistence())
+        
+        # SpamProtection блокирует после порога ошибок и сбрасывает счетчики
+        protection = SpamProtection()
+        for _ in range(protection.suspicion_thresholds['invalid_inputs'] - 1):
+            protection.record_error(777, 'invalid_inputs')
+        assert not protection.is_user_blocked(777), "До порога пользователь не блокируется"
+        protection.record_error(777, 'invalid_inputs')
+        assert protection.is_user_blocked(777), "На пороге пользователь блокируется"
+        assert protection.suspicious_users.get(777) is None, "После блокировки счетчики начинаются заново"
+        
+        print("✅ Блокировки работают корректно")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Ошибка тестирования блокировок: {e}")
+        return False
+
 def test_integration():
     """Интеграционный тест"""
     print("\n🔗 Интеграционный тест...")
@@ -171,6 +281,7 @@ def main():
         ("Валидаторы", test_validators),
         ("Rate Limiter", test_rate_limiter),
         ("Защита от спама", test_spam_protection),
+        ("Блокировки", test_block_list),
         ("Интеграционный тест", test_integration)
     ]
     
@@ -0,0 +1,78 @@
+"""
+Хранилище временных блокировок в таблице user_blocks
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import commit_session, get_session, sync_fallback
+from database.models import UserBlock
+from utils.block_list import Block, BlockStore
+
+class SqlBlockStore(BlockStore):
+    """
+    Блокировки в общей БД: переживают рестарт и видны всем процессам.
+
+    Новые и продленные блокировки записываются одним UPSERT, снятые —
+    одним DELETE; истекшие строки удаляются при каждой загрузке.
+    """
+
+    async def save(self, changes: Dict[int, Optional[Block]]):
+        async with get_session() as db:
+            await _save_blocks_async(changes, db)
+            await commit_session(db)
+
+    async def load_active(self, now: float) -> Dict[int, Block]:
+        async with get_session() as db:
+            blocks = await _load_active_blocks_async(datetime.utcfromtimestamp(now), db)
+            await commit_session(db)
+        return blocks
+
+def _build_save_statements(changes: Dict[int, Optional[Block]], db):
+    statements = []
+    rows = [
+        {'telegram_id': user_id, 'reason': block[1], 'expires_at': datetime.utcfromtimestamp(block[0])}
+        for user_id, block in changes.items() if block is not None
+    ]
+    if rows:
+        insert = postgresql.insert if db.get_bind().dialect.name == 'postgresql' else sqlite.insert
+        stmt = insert(UserBlock).values(rows)
+        statements.append(stmt.on_conflict_do_update(
+            index_elements=[UserBlock.telegram_id],
+            set_={'reason': stmt.excluded.reason, 'expires_at': stmt.excluded.expires_at}
+        ))
+    removed = [user_id for user_id, block in changes.items() if block is None]
+    if removed:
+        statements.append(delete(UserBlock).where(UserBlock.telegram_id.in_(removed)))
+    return statements
+
+def _to_blocks(rows) -> Dict[int, Block]:
+    # expires_at хранится в UTC без часового пояса
+    epoch = datetime(1970, 1, 1)
+    return {
+        telegram_id: ((expires_at - epoch).total_seconds(), reason)
+        for telegram_id, reason, expires_at in rows
+    }
+
+def _save_blocks(changes: Dict[int, Optional[Block]], db: Session):
+    for statement in _build_save_statements(changes, db):
+        db.execute(statement)
+
+def _load_active_blocks(now: datetime, db: Session) -> Dict[int, Block]:
+    db.execute(delete(UserBlock).where(UserBlock.expires_at <= now))
+    return _to_blocks(db.execute(select(UserBlock.telegram_id, UserBlock.reason, UserBlock.expires_at)))
+
+@sync_fallback(_save_blocks)
+async def _save_blocks_async(changes: Dict[int, Optional[Block]], db: AsyncSession):
+    for statement in _build_save_statements(changes, db):
+        await db.execute(statement)
+
+@sync_fallback(_load_active_blocks)
+async def _load_active_blocks_async(now: datetime, db: AsyncSession) -> Dict[int, Block]:
+    await db.execute(delete(UserBlock).where(UserBlock.expires_at <= now))
+    return _to_blocks(await db.execute(select(UserBlock.telegram_id, UserBlock.reason, UserBlock.expires_at)))
@@ -0,0 +1,205 @@
+"""
+Индекс кандидатов в памяти: колонки анкет в массивах NumPy и фильтрация масками
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import List, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from config import CANDIDATE_INDEX, CANDIDATE_INDEX_REFRESH
+from database.database import get_session, sync_fallback
+from database.models import User
+from utils.metrics import metrics
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Значение для NULL: не проходит ни один заданный диапазон, как NULL в SQL
+MISSING = -1
+
+# Колонки, по которым фильтрует get_search_conditions
+INDEX_COLUMNS = (User.id, User.is_active, User.gender, User.age, User.height, User.weight)
+
+index_queries = metrics.counter("candidate_index_queries_total", "Поиски кандидатов", ("source",))
+
+class CandidateIndex:
+    """
+    Колоночный индекс анкет для search_user_ids.
+
+    Id хранятся по возрастанию, поэтому keyset-пагинация (id > after_id) — это
+    бинарный поиск начала, а фильтры пола, возраста, роста и веса — одна
+    булева маска по срезу массивов. Результат совпадает с get_search_conditions.
+
+    Пока индекс не загружен (или NumPy не установлен), search возвращает None
+    и вызывающий код идет в SQL. Изменения анкет из этого процесса применяются
+    после коммита; изменения из других процессов — при полной перезагрузке
+    раз в refresh_interval.
+    """
+
+    def __init__(self, refresh_interval: float = 300):
+        self.refresh_interval = refresh_interval
+        self.loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._gender_codes = {}
+        self._ids = self._active = self._gender = self._age = self._height = self._weight = None
+
+    @property
+    def enabled(self) -> bool:
+        return np is not None
+
+    @property
+    def loaded(self) -> bool:
+        return self._ids is not None
+
+    @property
+    def size(self) -> int:
+        return 0 if self._ids is None else len(self._ids)
+
+    def _gender_code(self, gender: Optional[str]) -> int:
+        if gender is None:
+            return MISSING
+        return self._gender_codes.setdefault(gender, len(self._gender_codes))
+
+    def _row_values(self, row) -> tuple:
+        _, is_active, gender, age, height, weight = row
+        return (
+            bool(is_active),
+            self._gender_code(gender),
+            MISSING if age is None else age,
+            MISSING if height is None else height,
+            MISSING if weight is None else weight,
+        )
+
+    def rebuild(self, rows):
+        """Полностью пересобрать индекс из строк (id, is_active, gender, age, height, weight)"""
+        rows = sorted(rows, key=lambda row: row[0])
+        with self._lock:
+            values = [self._row_values(row) for row in rows]
+            self._ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            self._active = np.fromiter((v[0] for v in values), dtype=np.bool_, count=len(rows))
+            self._gender = np.fromiter((v[1] for v in values), dtype=np.int16, count=len(rows))
+            self._age = np.fromiter((v[2] for v in values), dtype=np.int32, count=len(rows))
+            self._height = np.fromiter((v[3] for v in values), dtype=np.int32, count=len(rows))
+            self._weight = np.fromiter((v[4] for v in values), dtype=np.int32, count=len(rows))
+            self.loaded_at = time.monotonic()
+
+    def upsert(self, row):
+        """Обновить или добавить одну анкету (после коммита)"""
+        if self._ids is None:
+            return
+        with self._lock:
+            active, gender, age, height, weight = self._row_values(row)
+            position = int(np.searchsorted(self._ids, row[0]))
+            if position < len(self._ids) and self._ids[position] == row[0]:
+                self._active[position] = active
+                self._gender[position] = gender
+                self._age[position] = age
+                self._height[position] = height
+                self._weight[position] = weight
+            else:
+                # Новый пользователь: вставка с сохранением порядка id
+                self._ids = np.insert(self._ids, position, row[0])
+                self._active = np.insert(self._active, position, active)
+                self._gender = np.insert(self._gender, position, gender)
+                self._age = np.insert(self._age, position, age)
+                self._height = np.insert(self._height, position, height)
+                self._weight = np.insert(self._weight, position, weight)
+
+    def search(self, current_user, after_id: int = 0, limit: int = 50, exclude=None) -> Optional[List[int]]:
+        """
+        Id подходящих пользователей после after_id или None, если индекс не загружен.
+
+        exclude — отсортированный массив id ('q'), которые нужно пропустить
+        (уже запрошенные анкеты).
+        """
+        if self._ids is None:
+            index_queries.inc(source='sql')
+            return None
+
+        with self._lock:
+            start = int(np.searchsorted(self._ids, after_id, side='right'))
+            ids = self._ids[start:]
+            mask = self._active[start:] & (ids != current_user.id)
+
+            if current_user.search_gender and current_user.search_gender != 'all':
+                code = self._gender_codes.get(current_user.search_gender)
+                if code is None:
+                    index_queries.inc(source='index')
+                    return []
+                mask &= self._gender[start:] == code
+
+            for column, low, high in (
+                (self._age, current_user.min_age, current_user.max_age),
+                (self._height, current_user.min_height, current_user.max_height),
+                (self._weight, current_user.min_weight, current_user.max_weight),
+            ):
+                # Как в get_search_conditions: 0/None — фильтра нет
+                if low:
+                    mask &= column[start:] >= low
+                if high:
+                    mask &= column[start:] <= high
+                    mask &= column[start:] != MISSING
+
+            if exclude:
+                mask &= ~np.isin(ids, np.frombuffer(exclude, dtype=np.int64), assume_unique=True)
+
+            result = ids[mask][:limit].tolist()
+        index_queries.inc(source='index')
+        return result
+
+    async def load(self):
+        """Загрузить все анкеты из БД"""
+        async with get_session() as db:
+            rows = await _load_index_rows_async(db)
+        await asyncio.to_thread(self.rebuild, rows)
+        logger.info(f"🗂️ Индекс кандидатов загружен: {self.size} анкет")
+
+    async def run_refresh_loop(self):
+        """Фоновая задача: загрузка при старте и периодическая полная перезагрузка"""
+        while True:
+            try:
+                await self.load()
+            except Exception as e:
+                logger.error(f"❌ Ошибка загрузки индекса кандидатов: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+def _load_index_rows(db: Session) -> list:
+    return [tuple(row) for row in db.execute(select(*INDEX_COLUMNS))]
+
+@sync_fallback(_load_index_rows)
+async def _load_index_rows_async(db) -> list:
+    return [tuple(row) for row in await db.execute(select(*INDEX_COLUMNS))]
+
+# Глобальный экземпляр
+candidate_index = CandidateIndex(refresh_interval=CANDIDATE_INDEX_REFRESH)
+
+# Изменения анкет копятся в сессии и попадают в индекс только после коммита
+
+def _remember_user_change(mapper, connection, target):
+    session = object_session(target)
+    if session is not None and candidate_index.loaded:
+        session.info.setdefault('candidate_index_rows', {})[target.id] = tuple(
+            getattr(target, column.key) for column in INDEX_COLUMNS
+        )
+
+def _apply_user_changes(session):
+    for row in session.info.pop('candidate_index_rows', {}).values():
+        candidate_index.upsert(row)
+
+def _discard_user_changes(session, previous_transaction):
+    session.info.pop('candidate_index_rows', None)
+
+if CANDIDATE_INDEX and candidate_index.enabled:
+    event.listen(User, 'after_insert', _remember_user_change)
+    event.listen(User, 'after_update', _remember_user_change)
+    event.listen(Session, 'after_commit', _apply_user_changes)
+    event.listen(Session, 'after_soft_rollback', _discard_user_changes)
@@ -0,0 +1,233 @@
+"""
+Хранилище состояний FSM в общей БД: анкеты переживают рестарт и видны всем процессам
+"""
+
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import BOT_MODE, FSM_STATE_TTL, FSM_FLUSH_INTERVAL, FSM_READ_CACHE_TTL, REDIS_URL
+from database.database import commit_session, get_session, sync_fallback
+from database.models import FsmState
+from utils.cache import TTLCache
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Строк в одном INSERT (лимит параметров SQLite)
+WRITE_CHUNK = 300
+
+flush_batch = metrics.histogram(
+    "fsm_flush_batch_size", "Записей FSM в одной пакетной записи",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500)
+)
+flush_errors = metrics.counter("fsm_flush_errors_total", "Неудачные пакетные записи FSM")
+
+class SqlStorage(BaseStorage):
+    """
+    FSM-хранилище в таблице fsm_states.
+
+    Состояние и данные — отдельные строки (<ключ>:state и <ключ>:data), поэтому
+    каждая запись — полная строка без чтения перед записью. Записи копятся
+    в буфере и сбрасываются одним пакетом раз в flush_interval; повторные записи
+    одного ключа между сбросами схлопываются. Чтение сначала смотрит в буфер,
+    так что процесс всегда видит свои записи. Другие процессы видят их с задержкой
+    не больше flush_interval; при flush_interval=0 запись синхронная.
+
+    Каждая запись продлевает срок жизни на ttl; просроченные строки не читаются
+    и удаляются раз в cleanup_interval.
+
+    FSMContextMiddleware читает состояние на каждом апдейте. Кэш чтения
+    (read_cache_ttl > 0) включается явно и только для одного процесса в режиме
+    polling: прочитанные значения (в том числе отсутствие состояния) хранятся
+    read_cache_ttl секунд, а запись сразу обновляет кэш, так что запрос к БД —
+    только на первом апдейте пользователя за read_cache_ttl. Запись другого
+    процесса видна здесь лишь после истечения кэша, поэтому с несколькими
+    репликами (webhook) кэш выключен: read_cache_ttl=0 по умолчанию.
+    """
+
+    def __init__(self, ttl: int = 86400, flush_interval: float = 0.5, cleanup_interval: int = 3600,
+                 read_cache_ttl: float = 0, read_cache_size: int = 10000):
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.cleanup_interval = cleanup_interval
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        # ключ -> значение (None — удалить строку)
+        self._pending: Dict[str, Optional[str]] = {}
+        self._flushing: Dict[str, Optional[str]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._last_cleanup = time.monotonic()
+        # ключ -> (значение,); кортеж отличает закэшированное None от промаха
+        self._read_cache = TTLCache(maxsize=read_cache_size, ttl=read_cache_ttl) if read_cache_ttl > 0 else None
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        await self._write(self.key_builder.build(key, 'state'), value)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await self._read(self.key_builder.build(key, 'state'))
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(f"Data must be a dict or dict-like object, got {type(data).__name__}")
+        # Сериализуем сразу: несериализуемые данные — ошибка хендлера, а не фоновой записи
+        value = json.dumps(data, ensure_ascii=False) if data else None
+        await self._write(self.key_builder.build(key, 'data'), value)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        value = await self._read(self.key_builder.build(key, 'data'))
+        return json.loads(value) if value else {}
+
+    async def close(self) -> None:
+        """Остановить фоновую запись и сбросить буфер (вызывается при shutdown диспетчера)"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        """Записать накопленные изменения одной транзакцией"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            self._flushing = batch
+            cleanup = time.monotonic() - self._last_cleanup >= self.cleanup_interval
+            written = False
+            try:
+                expires_at = datetime.utcnow() + timedelta(seconds=self.ttl)
+                async with get_session() as db:
+                    await _write_states_async(batch, expires_at, db)
+                    if cleanup:
+                        await _delete_expired_states_async(db)
+                    await commit_session(db)
+                written = True
+                flush_batch.observe(len(batch))
+                if cleanup:
+                    self._last_cleanup = time.monotonic()
+            except Exception as e:
+                flush_errors.inc()
+                logger.error(f"❌ Ошибка записи состояний FSM ({len(batch)} шт.): {e}")
+            finally:
+                self._flushing = {}
+                if not written:
+                    # Вернуть в буфер то, что не перезаписано за время сброса (ошибка или отмена)
+                    for storage_key, value in batch.items():
+                        self._pending.setdefault(storage_key, value)
+
+    async def _write(self, storage_key: str, value: Optional[str]):
+        self._pending[storage_key] = value
+        if self._read_cache is not None:
+            self._read_cache.set(storage_key, (value,))
+        if self.flush_interval <= 0:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _read(self, storage_key: str) -> Optional[str]:
+        for buffer in (self._pending, self._flushing):
+            if storage_key in buffer:
+                return buffer[storage_key]
+        if self._read_cache is not None:
+            cached = self._read_cache.get(storage_key)
+            if cached is not None:
+                return cached[0]
+        async with get_session() as db:
+            value = await _read_state_async(storage_key, db)
+        # Запись, сделанная во время чтения, уже в кэше и новее прочитанного
+        if self._read_cache is not None and self._read_cache.get(storage_key) is None:
+            self._read_cache.set(storage_key, (value,))
+        return value
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+def _insert(db):
+    return postgresql.insert if db.get_bind().dialect.name == 'postgresql' else sqlite.insert
+
+def _build_write_statements(batch: Dict[str, Optional[str]], expires_at: datetime, db):
+    """UPSERT для новых значений и DELETE для очищенных ключей"""
+    statements = []
+    rows = [
+        {'key': storage_key, 'value': value, 'expires_at': expires_at}
+        for storage_key, value in batch.items() if value is not None
+    ]
+    insert = _insert(db)
+    for start in range(0, len(rows), WRITE_CHUNK):
+        stmt = insert(FsmState).values(rows[start:start + WRITE_CHUNK])
+        statements.append(stmt.on_conflict_do_update(
+            index_elements=[FsmState.key],
+            set_={'value': stmt.excluded.value, 'expires_at': stmt.excluded.expires_at}
+        ))
+    removed = [storage_key for storage_key, value in batch.items() if value is None]
+    if removed:
+        statements.append(delete(FsmState).where(FsmState.key.in_(removed)))
+    return statements
+
+def _read_state(storage_key: str, db: Session) -> Optional[str]:
+    return db.scalar(
+        select(FsmState.value).where(FsmState.key == storage_key, FsmState.expires_at > datetime.utcnow())
+    )
+
+def _write_states(batch: Dict[str, Optional[str]], expires_at: datetime, db: Session):
+    for statement in _build_write_statements(batch, expires_at, db):
+        db.execute(statement)
+
+def _delete_expired_states(db: Session):
+    db.execute(delete(FsmState).where(FsmState.expires_at < datetime.utcnow()))
+
+@sync_fallback(_read_state)
+async def _read_state_async(storage_key: str, db: AsyncSession) -> Optional[str]:
+    return await db.scalar(
+        select(FsmState.value).where(FsmState.key == storage_key, FsmState.expires_at > datetime.utcnow())
+    )
+
+@sync_fallback(_write_states)
+async def _write_states_async(batch: Dict[str, Optional[str]], expires_at: datetime, db: AsyncSession):
+    for statement in _build_write_statements(batch, expires_at, db):
+        await db.execute(statement)
+
+@sync_fallback(_delete_expired_states)
+async def _delete_expired_states_async(db: AsyncSession):
+    await db.execute(delete(FsmState).where(FsmState.expires_at < datetime.utcnow()))
+
+def create_fsm_storage(backend: str = 'sql', redis_url: str = REDIS_URL) -> BaseStorage:
+    """Создать хранилище FSM по имени бэкенда (FSM_STORAGE)"""
+    if backend == 'redis':
+        try:
+            from aiogram.fsm.storage.redis import RedisStorage
+            return RedisStorage.from_url(
+                redis_url,
+                key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
+                state_ttl=FSM_STATE_TTL,
+                data_ttl=FSM_STATE_TTL
+            )
+        except ImportError:
+            logger.warning("⚠️ Пакет redis не установлен, состояния FSM хранятся в БД")
+            backend = 'sql'
+    if backend == 'sql':
+        if FSM_READ_CACHE_TTL > 0 and BOT_MODE == 'webhook':
+            logger.warning("⚠️ FSM_READ_CACHE_TTL включен в режиме webhook: реплики могут читать устаревшее состояние")
+        return SqlStorage(ttl=FSM_STATE_TTL, flush_interval=FSM_FLUSH_INTERVAL, read_cache_ttl=FSM_READ_CACHE_TTL)
+    if backend != 'memory':
+        logger.warning(f"⚠️ Неизвестный FSM_STORAGE={backend}, используется memory")
+    return MemoryStorage()
@@ -0,0 +1,97 @@
+"""
+Метрики состояния процесса: пул БД, кэши и задержка event loop
+"""
+
+import asyncio
+import logging
+import time
+
+from database.database import get_pool_status
+from database.user_cache import user_cache
+from keyboards.cache import get_keyboard_cache_stats
+from middlewares.database import db_session_middleware
+from middlewares.scheduler import update_scheduler
+from services.candidate_index import candidate_index
+from services.profile_cards import profile_cards
+from services.requested_users import requested_users
+from services.search_sessions import search_sessions
+from utils.metrics import metrics
+from utils.rate_limiter import spam_protection
+
+logger = logging.getLogger(__name__)
+
+# Бакеты задержки event loop (секунды)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+loop_lag = metrics.gauge("event_loop_lag_seconds", "Последняя измеренная задержка event loop")
+loop_lag_histogram = metrics.histogram(
+    "event_loop_lag_distribution_seconds", "Распределение задержки event loop", buckets=LOOP_LAG_BUCKETS
+)
+
+def _cache_stats() -> dict:
+    stats = {
+        'users': user_cache.get_stats(),
+        'keyboards': get_keyboard_cache_stats(),
+        'profile_cards': profile_cards.get_stats(),
+        'requested_users': requested_users.get_stats()
+    }
+    if hasattr(search_sessions, 'get_stats'):
+        stats['search_sessions'] = search_sessions.get_stats()
+    return stats
+
+def _cache_field(field: str):
+    return lambda: {(name,): values[field] for name, values in _cache_stats().items()}
+
+def register_collectors():
+    """Метрики, которые вычисляются в момент чтения /metrics"""
+    metrics.gauge(
+        "db_pool_checked_out", "Занятые соединения пула БД",
+        function=lambda: get_pool_status()['checked_out']
+    )
+    metrics.gauge(
+        "db_pool_capacity", "Размер пула БД с учетом overflow",
+        function=lambda: get_pool_status()['capacity']
+    )
+    metrics.gauge(
+        "db_sessions_active", "Открытые сессии БД (апдейты в обработке)",
+        function=lambda: db_session_middleware.active_sessions
+    )
+    metrics.gauge(
+        "scheduler_waiting", "Апдейты в очереди планировщика",
+        function=lambda: update_scheduler.waiting
+    )
+    metrics.gauge(
+        "scheduler_in_flight", "Апдейты в обработке",
+        function=lambda: update_scheduler.in_flight
+    )
+    metrics.gauge(
+        "scheduler_active_chats", "Чаты с апдейтами в обработке или в очереди",
+        function=lambda: update_scheduler.get_stats()['active_chats']
+    )
+    metrics.gauge(
+        "candidate_index_size", "Анкет в индексе кандидатов",
+        function=lambda: candidate_index.size
+    )
+    metrics.gauge(
+        "rate_limiter_keys", "Ключи (пользователь, действие) в rate limiter",
+        function=lambda: spam_protection.rate_limiter.get_stats()['keys']
+    )
+    metrics.gauge(
+        "blocked_users", "Временно заблокированные пользователи",
+        function=lambda: len(spam_protection.block_list)
+    )
+    metrics.gauge("cache_hits", "Попадания в кэш", ("cache",), function=_cache_field('hits'))
+    metrics.gauge("cache_misses", "Промахи кэша", ("cache",), function=_cache_field('misses'))
+    metrics.gauge("cache_hit_ratio", "Доля попаданий в кэш", ("cache",), function=_cache_field('hit_rate'))
+    metrics.gauge("cache_entries", "Записей в кэше", ("cache",), function=_cache_field('size'))
+
+async def monitor_event_loop_lag(interval: float = 1.0):
+    """Фоновая задача: насколько позже запланированного просыпается event loop"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(time.perf_counter() - start - interval, 0.0)
+        loop_lag.set(lag)
+        loop_lag_histogram.observe(lag)
+        if lag > 0.5:
+            logger.warning(f"⚠️ Event loop заблокирован на {lag * 1000:.0f} мс")
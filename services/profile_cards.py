@@ -0,0 +1,43 @@
+"""
+Кэш отрисованных карточек профилей
+"""
+
+from typing import Callable
+
+from config import PROFILE_CARD_CACHE_SIZE, PROFILE_CARD_CACHE_TTL
+from utils.cache import TTLCache
+
+class ProfileCardCache:
+    """
+    Текст карточки по ключу (user_id, profile_version, язык).
+
+    Популярный профиль, который видят тысячи ищущих, отрисовывается один раз
+    на язык. Изменение профиля увеличивает profile_version, поэтому старые
+    карточки больше не запрашиваются и вытесняются по LRU/TTL.
+    """
+
+    def __init__(self, maxsize: int = 20000, ttl: float = 3600):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get_or_render(self, user, lang: str, render: Callable[..., str]) -> str:
+        """Карточка из кэша или render(user, lang), если ее еще нет"""
+        version = getattr(user, 'profile_version', None)
+        if version is None:
+            # Объект еще не сохранен или БД не мигрирована — без кэша
+            return render(user, lang)
+
+        key = (user.id, version, lang)
+        text = self._cache.get(key)
+        if text is None:
+            text = render(user, lang)
+            self._cache.set(key, text)
+        return text
+
+    def clear(self):
+        self._cache.clear()
+
+    def get_stats(self) -> dict:
+        return self._cache.get_stats()
+
+# Глобальный экземпляр
+profile_cards = ProfileCardCache(maxsize=PROFILE_CARD_CACHE_SIZE, ttl=PROFILE_CARD_CACHE_TTL)
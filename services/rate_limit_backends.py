@@ -0,0 +1,189 @@
+"""
+Общие хранилища лимитов: лимиты действуют на все процессы бота и переживают рестарт
+"""
+
+import logging
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import case, delete, or_, and_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import REDIS_URL
+from database.database import commit_session, get_session, sync_fallback
+from database.models import RateLimitState
+from utils.metrics import metrics
+from utils.rate_limiter import LimitKey, RateLimitBackend
+
+logger = logging.getLogger(__name__)
+
+# Строк в одном INSERT (лимит параметров SQLite)
+WRITE_CHUNK = 300
+
+sync_batch = metrics.histogram(
+    "rate_limit_sync_batch_size", "Ключей лимитов в одной синхронизации",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500)
+)
+
+class SqlRateLimitBackend(RateLimitBackend):
+    """
+    Лимиты в таблице rate_limits.
+
+    Пакет — один многострочный UPSERT на WRITE_CHUNK ключей: новое значение
+    min(max(tat, now) + cost, now + window) считается в самой БД, поэтому
+    параллельные процессы не теряют расход друг друга, а суммарный расход
+    не блокирует ключ дольше окна (как в Redis-бэкенде). Ключи со свободным лимитом удаляются раз
+    в cleanup_interval.
+    """
+
+    def __init__(self, cleanup_interval: int = 3600):
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = time.monotonic()
+
+    async def sync(self, batch: Dict[LimitKey, Tuple[float, float]], now: float) -> Dict[LimitKey, float]:
+        cleanup = time.monotonic() - self._last_cleanup >= self.cleanup_interval
+        async with get_session() as db:
+            tats = await _advance_tats_async(batch, now, db)
+            if cleanup:
+                await _delete_expired_tats_async(now, db)
+            await commit_session(db)
+        if cleanup:
+            self._last_cleanup = time.monotonic()
+        sync_batch.observe(len(batch))
+        return tats
+
+    async def reset(self, keys: Iterable[LimitKey]):
+        async with get_session() as db:
+            await _delete_tats_async(list(keys), db)
+            await commit_session(db)
+
+def _build_advance_statements(batch: Dict[LimitKey, Tuple[float, float]], now: float, db):
+    """UPSERT пакета: вставленное значение now + cost, при конфликте max(tat, now) + cost; не дальше now + window"""
+    insert = postgresql.insert if db.get_bind().dialect.name == 'postgresql' else sqlite.insert
+    items = list(batch.items())
+    statements = []
+    for start in range(0, len(items), WRITE_CHUNK):
+        chunk = items[start:start + WRITE_CHUNK]
+        stmt = insert(RateLimitState).values([
+            {'user_id': user_id, 'action': action, 'tat': now + min(cost, window)}
+            for (user_id, action), (cost, window) in chunk
+        ])
+        # Окно зависит только от действия: предел TAT — now + window, как в Redis-скрипте
+        limit = case(
+            {action: now + window for (_user_id, action), (_cost, window) in chunk},
+            value=RateLimitState.action
+        )
+        # excluded.tat - now — расход ключа в этом пакете
+        advanced = case(
+            (RateLimitState.tat > now, RateLimitState.tat + stmt.excluded.tat - now),
+            else_=stmt.excluded.tat
+        )
+        statements.append(stmt.on_conflict_do_update(
+            index_elements=[RateLimitState.user_id, RateLimitState.action],
+            set_={'tat': case((advanced > limit, limit), else_=advanced)}
+        ).returning(RateLimitState.user_id, RateLimitState.action, RateLimitState.tat))
+    return statements
+
+def _keys_condition(keys):
+    return or_(*(and_(RateLimitState.user_id == user_id, RateLimitState.action == action) for user_id, action in keys))
+
+def _advance_tats(batch: Dict[LimitKey, Tuple[float, float]], now: float, db: Session) -> Dict[LimitKey, float]:
+    tats = {}
+    for statement in _build_advance_statements(batch, now, db):
+        for user_id, action, tat in db.execute(statement):
+            tats[(user_id, action)] = tat
+    return tats
+
+def _delete_tats(keys, db: Session):
+    if keys:
+        db.execute(delete(RateLimitState).where(_keys_condition(keys)))
+
+def _delete_expired_tats(now: float, db: Session):
+    db.execute(delete(RateLimitState).where(RateLimitState.tat < now))
+
+@sync_fallback(_advance_tats)
+async def _advance_tats_async(batch: Dict[LimitKey, Tuple[float, float]], now: float, db: AsyncSession) -> Dict[LimitKey, float]:
+    tats = {}
+    for statement in _build_advance_statements(batch, now, db):
+        for user_id, action, tat in await db.execute(statement):
+            tats[(user_id, action)] = tat
+    return tats
+
+@sync_fallback(_delete_tats)
+async def _delete_tats_async(keys, db: AsyncSession):
+    if keys:
+        await db.execute(delete(RateLimitState).where(_keys_condition(keys)))
+
+@sync_fallback(_delete_expired_tats)
+async def _delete_expired_tats_async(now: float, db: AsyncSession):
+    await db.execute(delete(RateLimitState).where(RateLimitState.tat < now))
+
+# Весь пакет — один вызов скрипта: атомарно и за один сетевой round-trip.
+# Значения возвращаются строками, иначе Redis обрежет дробную часть
+ADVANCE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local result = {}
+for i, key in ipairs(KEYS) do
+    local cost = tonumber(ARGV[i * 2])
+    local window = tonumber(ARGV[i * 2 + 1])
+    local tat = tonumber(redis.call('GET', key) or now)
+    if tat < now then
+        tat = now
+    end
+    tat = math.min(tat + cost, now + window)
+    redis.call('SET', key, tostring(tat), 'PX', math.ceil((tat - now) * 1000) + 1)
+    result[i] = tostring(tat)
+end
+return result
+"""
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    Лимиты в Redis: ключ ratelimit:<user_id>:<action> со значением TAT.
+
+    Срок жизни ключа равен остатку окна, поэтому свободные лимиты удаляет
+    сам Redis. Для кластера все ключи пакета должны попадать в один слот.
+    """
+
+    def __init__(self, redis, prefix: str = 'ratelimit'):
+        self.redis = redis
+        self.prefix = prefix
+        self._advance = redis.register_script(ADVANCE_SCRIPT)
+
+    def _key(self, key: LimitKey) -> str:
+        user_id, action = key
+        return f"{self.prefix}:{user_id}:{action}"
+
+    async def sync(self, batch: Dict[LimitKey, Tuple[float, float]], now: float) -> Dict[LimitKey, float]:
+        keys = list(batch)
+        args = [now]
+        for key in keys:
+            args.extend(batch[key])
+        values = await self._advance(keys=[self._key(key) for key in keys], args=args)
+        sync_batch.observe(len(batch))
+        return {key: float(value) for key, value in zip(keys, values)}
+
+    async def reset(self, keys: Iterable[LimitKey]):
+        names = [self._key(key) for key in keys]
+        if names:
+            await self.redis.delete(*names)
+
+    async def close(self):
+        await self.redis.aclose()
+
+def create_rate_limit_backend(backend: str = 'memory', redis_url: str = REDIS_URL) -> Optional[RateLimitBackend]:
+    """Создать хранилище лимитов по имени (RATE_LIMIT_BACKEND); None — только память процесса"""
+    if backend == 'redis':
+        try:
+            from redis.asyncio import Redis
+            return RedisRateLimitBackend(Redis.from_url(redis_url))
+        except ImportError:
+            logger.warning("⚠️ Пакет redis не установлен, лимиты хранятся в БД")
+            backend = 'sql'
+    if backend == 'sql':
+        return SqlRateLimitBackend()
+    if backend != 'memory':
+        logger.warning(f"⚠️ Неизвестный RATE_LIMIT_BACKEND={backend}, используется memory")
+    return None
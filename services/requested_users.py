@@ -0,0 +1,78 @@
+"""
+Множества пользователей, которым уже отправлен запрос: исключаются из поиска
+"""
+
+from array import array
+from bisect import bisect_left
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import REQUESTED_CACHE_SIZE, REQUESTED_CACHE_TTL
+from database.database import sync_fallback
+from database.models import Request
+from utils.cache import TTLCache
+
+# Тип элементов массива: 64-битные целые (id пользователей), как в сессиях поиска
+ID_TYPECODE = 'q'
+
+def _load_requested_ids(user_id: int, db: Session) -> array:
+    rows = db.query(Request.to_user_id).filter(Request.from_user_id == user_id).order_by(Request.to_user_id)
+    return array(ID_TYPECODE, (row[0] for row in rows))
+
+@sync_fallback(_load_requested_ids)
+async def _load_requested_ids_async(user_id: int, db: AsyncSession) -> array:
+    result = await db.scalars(
+        select(Request.to_user_id).where(Request.from_user_id == user_id).order_by(Request.to_user_id)
+    )
+    return array(ID_TYPECODE, result)
+
+class RequestedUsersCache:
+    """
+    Отсортированные массивы to_user_id по отправителю.
+
+    Загружаются одним запросом по индексу (from_user_id, to_user_id) при
+    первом поиске и дополняются после коммита отправки запроса, поэтому
+    повторный поиск исключает уже запрошенные анкеты без обращения к БД.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 1800):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, user_id: int, db: Session) -> array:
+        ids = self._cache.get(user_id)
+        if ids is None:
+            ids = _load_requested_ids(user_id, db)
+            self._cache.set(user_id, ids)
+        return ids
+
+    async def get_async(self, user_id: int, db: AsyncSession) -> array:
+        ids = self._cache.get(user_id)
+        if ids is None:
+            ids = await _load_requested_ids_async(user_id, db)
+            self._cache.set(user_id, ids)
+        return ids
+
+    def add(self, user_id: int, to_user_id: int):
+        """Добавить получателя в уже загруженное множество"""
+        ids = self._cache.get(user_id)
+        if ids is None:
+            return
+        index = bisect_left(ids, to_user_id)
+        if index == len(ids) or ids[index] != to_user_id:
+            ids.insert(index, to_user_id)
+
+    def add_on_commit(self, db, user_id: int, to_user_id: int):
+        """Добавить получателя после коммита транзакции с запросом"""
+        session = db.sync_session if isinstance(db, AsyncSession) else db
+        event.listen(session, 'after_commit', lambda _session: self.add(user_id, to_user_id), once=True)
+
+    def clear(self):
+        self._cache.clear()
+
+    def get_stats(self) -> dict:
+        return self._cache.get_stats()
+
+# Глобальный экземпляр
+requested_users = RequestedUsersCache(maxsize=REQUESTED_CACHE_SIZE, ttl=REQUESTED_CACHE_TTL)
@@ -0,0 +1,150 @@
+"""
+Сессии поиска: компактные массивы id кандидатов вместо списков ORM-объектов
+"""
+
+import logging
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import SEARCH_SESSION_BACKEND, SEARCH_SESSION_MAX, SEARCH_SESSION_TTL
+from database.database import sync_fallback
+from database.models import SearchSession
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Тип элементов массива: 64-битные целые (id пользователей)
+ID_TYPECODE = 'q'
+
+class SearchSessionStore:
+    """
+    Базовое хранилище сессий поиска.
+
+    Сессия — отсортированный по возрастанию массив id кандидатов.
+    Следующий кандидат ищется бинарным поиском по id текущего,
+    поэтому в callback_data достаточно передавать только id.
+    """
+
+    async def load(self, telegram_id: int, db) -> Optional[array]:
+        raise NotImplementedError
+
+    async def save(self, telegram_id: int, candidate_ids, db) -> array:
+        raise NotImplementedError
+
+    async def drop(self, telegram_id: int, db):
+        raise NotImplementedError
+
+    async def next_candidate(self, telegram_id: int, current_id: int, db) -> Optional[int]:
+        """Id кандидата после current_id или None, если сессии нет или она исчерпана"""
+        ids = await self.load(telegram_id, db)
+        if not ids:
+            return None
+        index = bisect_right(ids, current_id)
+        return ids[index] if index < len(ids) else None
+
+class MemorySearchSessionStore(SearchSessionStore):
+    """Сессии в памяти процесса (LRU + TTL)"""
+
+    def __init__(self, maxsize: int = 10000, ttl: int = 1800):
+        self._sessions = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def load(self, telegram_id: int, db=None) -> Optional[array]:
+        return self._sessions.get(telegram_id)
+
+    async def save(self, telegram_id: int, candidate_ids, db=None) -> array:
+        ids = array(ID_TYPECODE, sorted(candidate_ids))
+        self._sessions.set(telegram_id, ids)
+        return ids
+
+    async def drop(self, telegram_id: int, db=None):
+        self._sessions.pop(telegram_id)
+
+    def get_stats(self) -> dict:
+        return self._sessions.get_stats()
+
+class SqlSearchSessionStore(SearchSessionStore):
+    """
+    Сессии в таблице search_sessions (общие для нескольких процессов, переживают рестарт).
+
+    Запись выполняется в сессии апдейта, коммит делает DbSessionMiddleware.
+    Просроченные записи удаляются раз в cleanup_every сохранений.
+    """
+
+    def __init__(self, ttl: int = 1800, cleanup_every: int = 100):
+        self.ttl = ttl
+        self.cleanup_every = cleanup_every
+        self._saves = 0
+
+    async def load(self, telegram_id: int, db) -> Optional[array]:
+        return await _load_session_async(telegram_id, db)
+
+    async def save(self, telegram_id: int, candidate_ids, db) -> array:
+        ids = array(ID_TYPECODE, sorted(candidate_ids))
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl)
+        await _save_session_async(telegram_id, ids.tobytes(), expires_at, db)
+
+        self._saves += 1
+        if self._saves % self.cleanup_every == 0:
+            await _delete_expired_sessions_async(db)
+        return ids
+
+    async def drop(self, telegram_id: int, db):
+        await _drop_session_async(telegram_id, db)
+
+def _unpack_ids(data: bytes) -> array:
+    ids = array(ID_TYPECODE)
+    ids.frombytes(data)
+    return ids
+
+def _load_session(telegram_id: int, db: Session) -> Optional[array]:
+    row = db.get(SearchSession, telegram_id)
+    if row is None or row.expires_at < datetime.utcnow():
+        return None
+    return _unpack_ids(row.candidate_ids)
+
+def _save_session(telegram_id: int, data: bytes, expires_at: datetime, db: Session):
+    db.merge(SearchSession(telegram_id=telegram_id, candidate_ids=data, expires_at=expires_at))
+    db.flush()
+
+def _drop_session(telegram_id: int, db: Session):
+    db.execute(delete(SearchSession).where(SearchSession.telegram_id == telegram_id))
+
+def _delete_expired_sessions(db: Session):
+    db.execute(delete(SearchSession).where(SearchSession.expires_at < datetime.utcnow()))
+
+@sync_fallback(_load_session)
+async def _load_session_async(telegram_id: int, db: AsyncSession) -> Optional[array]:
+    row = await db.get(SearchSession, telegram_id)
+    if row is None or row.expires_at < datetime.utcnow():
+        return None
+    return _unpack_ids(row.candidate_ids)
+
+@sync_fallback(_save_session)
+async def _save_session_async(telegram_id: int, data: bytes, expires_at: datetime, db: AsyncSession):
+    await db.merge(SearchSession(telegram_id=telegram_id, candidate_ids=data, expires_at=expires_at))
+    await db.flush()
+
+@sync_fallback(_drop_session)
+async def _drop_session_async(telegram_id: int, db: AsyncSession):
+    await db.execute(delete(SearchSession).where(SearchSession.telegram_id == telegram_id))
+
+@sync_fallback(_delete_expired_sessions)
+async def _delete_expired_sessions_async(db: AsyncSession):
+    await db.execute(delete(SearchSession).where(SearchSession.expires_at < datetime.utcnow()))
+
+def create_search_session_store(backend: str = 'memory') -> SearchSessionStore:
+    """Создать хранилище сессий поиска по имени бэкенда"""
+    if backend == 'sql':
+        return SqlSearchSessionStore(ttl=SEARCH_SESSION_TTL)
+    if backend != 'memory':
+        logger.warning(f"⚠️ Неизвестный SEARCH_SESSION_BACKEND={backend}, используется memory")
+    return MemorySearchSessionStore(maxsize=SEARCH_SESSION_MAX, ttl=SEARCH_SESSION_TTL)
+
+# Глобальный экземпляр
+search_sessions = create_search_session_store(SEARCH_SESSION_BACKEND)
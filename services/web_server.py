@@ -0,0 +1,113 @@
+"""
+HTTP-сервер health/readiness/metrics на event loop бота (aiohttp)
+"""
+
+import asyncio
+import logging
+import time
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from database.database import ping_database
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Успешная проверка Telegram кэшируется, чтобы пробы не упирались в лимиты Bot API
+TELEGRAM_CHECK_TTL = 30
+TELEGRAM_CHECK_TIMEOUT = 5
+
+class ReadinessChecker:
+    """Проверка готовности: БД и Telegram Bot API доступны"""
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self._telegram_ok_until = 0.0
+
+    async def check_telegram(self) -> bool:
+        if time.monotonic() < self._telegram_ok_until:
+            return True
+        try:
+            await asyncio.wait_for(self.bot.get_me(), timeout=TELEGRAM_CHECK_TIMEOUT)
+        except Exception as e:
+            logger.error(f"❌ Telegram API недоступен: {e}")
+            return False
+        self._telegram_ok_until = time.monotonic() + TELEGRAM_CHECK_TTL
+        return True
+
+    async def check(self) -> dict:
+        database_ok, telegram_ok = await asyncio.gather(ping_database(), self.check_telegram())
+        return {'database': database_ok, 'telegram': telegram_ok}
+
+async def health_handler(request: web.Request) -> web.Response:
+    """Liveness: процесс жив и event loop отвечает"""
+    return web.Response(text="OK - Dating Bot is running!")
+
+async def ready_handler(request: web.Request) -> web.Response:
+    """Readiness: 200, только если доступны БД и Telegram"""
+    checks = await request.app['readiness'].check()
+    status = 200 if all(checks.values()) else 503
+    return web.json_response({'ready': status == 200, **checks}, status=status)
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    """Метрики в текстовом формате Prometheus"""
+    return web.Response(
+        body=metrics.render().encode('utf-8'),
+        headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+    )
+
+def create_web_app(bot: Bot) -> web.Application:
+    """Создать приложение с эндпоинтами /, /health, /ready и /metrics"""
+    app = web.Application()
+    app['readiness'] = ReadinessChecker(bot)
+    app.router.add_get('/', health_handler)
+    app.router.add_get('/health', health_handler)
+    app.router.add_get('/ready', ready_handler)
+    app.router.add_get('/metrics', metrics_handler)
+    return app
+
+async def start_web_server(app: web.Application, port: int, host: str = '0.0.0.0') -> web.AppRunner:
+    """Запустить сервер на текущем event loop; остановка — runner.cleanup()"""
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info(f"🌐 HTTP сервер запущен на {host}:{port}")
+    return runner
+
+def setup_webhook(app: web.Application, dp: Dispatcher, bot: Bot, path: str, secret: str = ""):
+    """Зарегистрировать обработчик вебхука Telegram (POST path) в приложении"""
+    if not secret:
+        logger.warning("⚠️ WEBHOOK_SECRET не задан: запросы к вебхуку не проверяются")
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=secret or None).register(app, path=path)
+    setup_application(app, dp, bot=bot)
+
+async def register_webhook(bot: Bot, dp: Dispatcher, url: str, path: str, secret: str = ""):
+    """
+    Сообщить Telegram адрес вебхука.
+    
+    Вызывается каждой репликой при старте: адрес и секрет у всех одинаковые,
+    поэтому повторная установка безопасна. При остановке вебхук не удаляется,
+    чтобы не отключить остальные реплики.
+    """
+    webhook_url = url.rstrip('/') + path
+    await bot.set_webhook(
+        webhook_url,
+        secret_token=secret or None,
+        allowed_updates=dp.resolve_used_update_types(),
+        drop_pending_updates=False
+    )
+    logger.info(f"🔗 Вебхук установлен: {webhook_url}")
+
+async def serve_webhook(bot: Bot, dp: Dispatcher, port: int, url: str, path: str, secret: str = ""):
+    """Запустить health/metrics и вебхук на одном сервере и работать до отмены"""
+    app = create_web_app(bot)
+    setup_webhook(app, dp, bot, path, secret)
+    runner = await start_web_server(app, port)
+    try:
+        await register_webhook(bot, dp, url, path, secret)
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
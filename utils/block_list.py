@@ -0,0 +1,148 @@
+"""
+Временные блокировки пользователей с истечением срока
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Блокировка: (истекает, Unix-время; причина)
+Block = Tuple[float, str]
+
+class BlockStore:
+    """Постоянное хранилище блокировок (общее для всех процессов бота)"""
+
+    async def save(self, changes: Dict[int, Optional[Block]]):
+        """Записать изменения: user_id -> блокировка или None (снять)"""
+        raise NotImplementedError
+
+    async def load_active(self, now: float) -> Dict[int, Block]:
+        """Все блокировки, которые еще не истекли"""
+        raise NotImplementedError
+
+class BlockList:
+    """
+    Заблокированные пользователи в памяти процесса.
+
+    Проверка — поиск в словаре. Сроки лежат в куче, поэтому истекшие записи
+    удаляются с ее вершины за O(log n) и без обхода всего словаря; проверка
+    вершины кучи — одно сравнение. Изменения записываются в хранилище
+    фоновой задачей, а блокировки других процессов подтягиваются раз
+    в refresh_interval.
+
+    clock — Unix-время в секундах (сроки общие для процессов; в тестах подменяется).
+    """
+
+    def __init__(self, store: Optional[BlockStore] = None, refresh_interval: float = 60,
+                 clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self._blocks: Dict[int, Block] = {}
+        self._heap: List[Tuple[float, int]] = []
+        self._pending: Dict[int, Optional[Block]] = {}
+        # Изменения, сделанные во время load (не должны затираться прочитанным)
+        self._changed_during_load: Optional[Dict[int, Optional[Block]]] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def is_blocked(self, user_id: int) -> bool:
+        now = self.clock()
+        if self._heap and self._heap[0][0] <= now:
+            self._expire(now)
+        return user_id in self._blocks
+
+    def block(self, user_id: int, seconds: float, reason: str):
+        """Заблокировать на seconds секунд (более ранний срок не сокращает текущий)"""
+        expires_at = self.clock() + seconds
+        current = self._blocks.get(user_id)
+        if current is not None and current[0] >= expires_at:
+            return
+        self._set(user_id, (expires_at, reason))
+        self._persist(user_id, (expires_at, reason))
+
+    def unblock(self, user_id: int):
+        if self._blocks.pop(user_id, None) is not None:
+            self._persist(user_id, None)
+
+    def set_store(self, store: Optional[BlockStore], refresh_interval: Optional[float] = None):
+        self.store = store
+        if refresh_interval is not None:
+            self.refresh_interval = refresh_interval
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def _set(self, user_id: int, block: Block):
+        self._blocks[user_id] = block
+        heapq.heappush(self._heap, (block[0], user_id))
+
+    def _expire(self, now: float):
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, user_id = heapq.heappop(self._heap)
+            block = self._blocks.get(user_id)
+            # Запись кучи могла устареть: блокировку продлили или сняли
+            if block is not None and block[0] == expires_at:
+                del self._blocks[user_id]
+
+    def _persist(self, user_id: int, block: Optional[Block]):
+        if self.store is None:
+            return
+        if self._changed_during_load is not None:
+            self._changed_during_load[user_id] = block
+        self._pending[user_id] = block
+        if self._flush_task is None or self._flush_task.done():
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+            except RuntimeError:
+                # Вне event loop: запишется при следующем flush
+                pass
+
+    async def flush(self):
+        """Записать накопленные изменения в хранилище"""
+        if self.store is None or not self._pending:
+            return
+        changes, self._pending = self._pending, {}
+        try:
+            await self.store.save(changes)
+        except Exception as e:
+            logger.error(f"❌ Ошибка записи блокировок ({len(changes)} шт.): {e}")
+            for user_id, block in changes.items():
+                self._pending.setdefault(user_id, block)
+
+    async def load(self):
+        """Заменить блокировки в памяти активными блокировками из хранилища"""
+        if self.store is None:
+            return
+        await self.flush()
+        self._changed_during_load = {}
+        try:
+            active = await self.store.load_active(self.clock())
+            # Локальные изменения, которые еще не записаны или сделаны во время чтения, важнее прочитанного
+            for user_id, block in {**self._pending, **self._changed_during_load}.items():
+                if block is None:
+                    active.pop(user_id, None)
+                else:
+                    active[user_id] = block
+        finally:
+            self._changed_during_load = None
+        self._blocks = active
+        self._heap = [(expires_at, user_id) for user_id, (expires_at, _reason) in active.items()]
+        heapq.heapify(self._heap)
+
+    async def run_refresh_loop(self):
+        """Фоновая задача: загрузка при старте и периодическое обновление из хранилища"""
+        while True:
+            try:
+                await self.load()
+            except Exception as e:
+                logger.error(f"❌ Ошибка загрузки блокировок: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def close(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        await self.flush()
@@ -0,0 +1,70 @@
+"""
+Маршрутизация callback-запросов по префиксу callback_data через словарь
+"""
+
+from typing import Any, Dict, Optional, Tuple, Type, Union
+
+from aiogram import Router
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.filters import Filter
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery
+
+# Разделитель CallbackData по умолчанию
+SEPARATOR = ":"
+
+class CallbackRouter(Filter):
+    """
+    Таблица «префикс callback_data -> хендлер».
+
+    В aiogram фильтры хендлеров проверяются по очереди для каждого callback,
+    здесь же один фильтр находит хендлер одним поиском в словаре, независимо
+    от их числа. Ключ — префикс CallbackData (данные распаковываются один раз
+    и передаются в хендлер аргументом callback_data) или строка целиком
+    для кнопок без параметров.
+
+    Найденный хендлер подставляется в data['handler'], поэтому внутренние
+    middleware (метрики, флаги) видят его, а не общий диспетчер.
+    """
+
+    def __init__(self):
+        self._routes: Dict[str, Tuple[Optional[Type[CallbackData]], HandlerObject]] = {}
+
+    def register(self, key: Union[str, Type[CallbackData]]):
+        """Декоратор: зарегистрировать хендлер для префикса CallbackData или точной строки"""
+        if isinstance(key, str):
+            factory, prefix = None, key
+        else:
+            factory, prefix = key, key.__prefix__
+            if key.__separator__ != SEPARATOR:
+                raise ValueError(f"{key.__name__}: поддерживается только разделитель {SEPARATOR!r}")
+
+        def decorator(callback):
+            if prefix in self._routes:
+                raise ValueError(f"Для {prefix!r} уже зарегистрирован хендлер")
+            self._routes[prefix] = (factory, HandlerObject(callback=callback))
+            return callback
+        return decorator
+
+    async def __call__(self, callback: CallbackQuery) -> Union[bool, Dict[str, Any]]:
+        """Фильтр aiogram: найти хендлер и распаковать callback_data"""
+        if not callback.data:
+            return False
+        route = self._routes.get(callback.data.partition(SEPARATOR)[0])
+        if route is None:
+            return False
+
+        factory, handler = route
+        if factory is None:
+            return {'handler': handler}
+        try:
+            return {'handler': handler, 'callback_data': factory.unpack(callback.data)}
+        except (TypeError, ValueError):
+            return False
+
+    async def dispatch(self, callback: CallbackQuery, **data: Any) -> Any:
+        return await data['handler'].call(callback, **data)
+
+    def attach(self, router: Router):
+        """Подключить таблицу к роутеру одним хендлером callback_query"""
+        router.callback_query.register(self.dispatch, self)
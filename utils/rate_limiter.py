@@ -2,17 +2,81 @@
 Система защиты от спама с rate limiting
 """
 
+import asyncio
+import logging
 import time
-from typing import Dict, List, Optional
-from collections import defaultdict
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
 from datetime import datetime, timedelta
 
+from utils.block_list import BlockList
+from utils.cache import TTLCache
+from utils.text_analysis import analyze_text
+
+logger = logging.getLogger(__name__)
+
+# Ключ лимита: (user_id, action)
+LimitKey = Tuple[Hashable, str]
+
+class RateLimitBackend:
+    """
+    Общее хранилище лимитов для нескольких процессов бота.
+    
+    Состояние ключа — TAT в секундах Unix-времени. sync атомарно сдвигает TAT
+    каждого ключа пакета: max(TAT, now) + cost, и возвращает новые значения;
+    так процесс сообщает, сколько разрешил сам, и узнает расход остальных.
+    """
+    
+    async def sync(self, batch: Dict[LimitKey, Tuple[float, float]], now: float) -> Dict[LimitKey, float]:
+        """batch: ключ -> (cost, window). Возвращает ключ -> общий TAT"""
+        raise NotImplementedError
+    
+    async def reset(self, keys: Iterable[LimitKey]):
+        """Удалить состояние ключей"""
+        raise NotImplementedError
+    
+    async def close(self):
+        pass
+
 class RateLimiter:
-    """Система ограничения частоты запросов"""
+    """
+    Система ограничения частоты запросов (GCRA)
     
-    def __init__(self):
-        # Хранилище запросов пользователей
-        self.user_requests: Dict[int, List[float]] = defaultdict(list)
+    Для каждого ключа (user_id, action) хранится одно число — теоретическое
+    время следующего запроса (TAT). Лимит count запросов за window секунд
+    означает, что каждый запрос сдвигает TAT на window / count, а запрос
+    отклоняется, если TAT ушел вперед больше чем на window. Проверка — O(1)
+    и без списков временных меток.
+    
+    Ключ с TAT в прошлом ничем не отличается от отсутствующего, поэтому такие
+    ключи периодически удаляются; размер хранилища ограничен max_keys (LRU).
+    
+    С общим бэкендом решение по-прежнему принимается локально, без обращения
+    к сети. Разрешенные запросы копятся и раз в sync_interval отправляются
+    бэкенду одним пакетом, а в ответ локальный TAT сдвигается до общего.
+    Несколько процессов вместе могут превысить лимит не больше чем на расход
+    за один sync_interval, а после рестарта лимиты восстанавливаются из бэкенда.
+    
+    clock — монотонные часы процесса в секундах (в тестах подменяется).
+    """
+    
+    def __init__(self, max_keys: int = 100000, cleanup_interval: float = 60,
+                 backend: Optional[RateLimitBackend] = None, sync_interval: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        # (user_id, action) -> TAT по clock(); порядок — от давно не использованных
+        self._tats: "OrderedDict[LimitKey, float]" = OrderedDict()
+        self.max_keys = max_keys
+        self.cleanup_interval = cleanup_interval
+        self._next_cleanup = clock() + cleanup_interval
+        
+        self.backend = backend
+        self.sync_interval = sync_interval
+        # Расход (секунды TAT), еще не отправленный бэкенду, и ключи для сброса
+        self._pending: Dict[LimitKey, float] = {}
+        self._pending_resets: set = set()
+        self._sync_lock = asyncio.Lock()
+        self._sync_task: Optional[asyncio.Task] = None
         
         # Лимиты для разных действий
         self.limits = {
@@ -21,6 +85,12 @@ class RateLimiter:
             'request': {'count': 3, 'window': 300},  # 3 запроса в 5 минут
             'profile_edit': {'count': 10, 'window': 300},  # 10 изменений профиля в 5 минут
             'settings_edit': {'count': 10, 'window': 300},  # 10 изменений настроек в 5 минут
+            'browse': {'count': 30, 'window': 60},   # 30 анкет в ленте в минуту
+            'navigation': {'count': 60, 'window': 60},  # 60 нажатий меню и шагов анкеты в минуту
+            'request_answer': {'count': 30, 'window': 60},  # 30 ответов на входящие запросы в минуту
+            'throttle_notice': {'count': 1, 'window': 30},  # 1 уведомление о лимите в 30 секунд
+            'throttle_strike': {'count': 20, 'window': 60},  # 20 отклоненных апдейтов в минуту, дальше — блокировка
+            'block_notice': {'count': 1, 'window': 600},  # 1 уведомление о блокировке в 10 минут
         }
     
     def is_allowed(self, user_id: int, action: str) -> bool:
@@ -34,24 +104,29 @@ class RateLimiter:
         Returns:
             True если запрос разрешен
         """
-        if action not in self.limits:
+        limit = self.limits.get(action)
+        if limit is None:
             return True  # Если лимит не установлен, разрешаем
         
-        limit = self.limits[action]
-        current_time = time.time()
-        
-        # Очищаем старые запросы
-        self._cleanup_old_requests(user_id, current_time - limit['window'])
+        now = self.clock()
+        if now >= self._next_cleanup:
+            self._evict_idle(now)
         
-        # Проверяем количество запросов
-        user_key = f"{user_id}_{action}"
-        requests = self.user_requests[user_key]
-        
-        if len(requests) >= limit['count']:
+        key = (user_id, action)
+        interval = limit['window'] / limit['count']
+        tat = max(self._tats.get(key, now), now)
+        new_tat = tat + interval
+        if new_tat - now > limit['window']:
             return False
         
-        # Добавляем новый запрос
-        requests.append(current_time)
+        self._tats[key] = new_tat
+        self._tats.move_to_end(key)
+        if len(self._tats) > self.max_keys:
+            self._tats.popitem(last=False)
+        
+        if self.backend is not None:
+            self._pending[key] = self._pending.get(key, 0.0) + interval
+            self._schedule_sync()
         return True
     
     def get_remaining_requests(self, user_id: int, action: str) -> int:
@@ -65,19 +140,15 @@ class RateLimiter:
         Returns:
             Количество оставшихся запросов
         """
-        if action not in self.limits:
+        limit = self.limits.get(action)
+        if limit is None:
             return 999  # Неограниченно
         
-        limit = self.limits[action]
-        current_time = time.time()
-        
-        # Очищаем старые запросы
-        self._cleanup_old_requests(user_id, current_time - limit['window'])
-        
-        user_key = f"{user_id}_{action}"
-        requests = self.user_requests[user_key]
-        
-        return max(0, limit['count'] - len(requests))
+        now = self.clock()
+        used = max(self._tats.get((user_id, action), now) - now, 0.0)
+        interval = limit['window'] / limit['count']
+        # Небольшой допуск на погрешность деления окна на интервалы
+        return max(0, int((limit['window'] - used) / interval + 1e-9))
     
     def get_reset_time(self, user_id: int, action: str) -> Optional[datetime]:
         """
@@ -88,48 +159,131 @@ class RateLimiter:
             action: Тип действия
             
         Returns:
-            Время сброса лимита
+            Время, когда лимит полностью восстановится (None, если он не расходовался)
         """
         if action not in self.limits:
             return None
         
-        limit = self.limits[action]
-        user_key = f"{user_id}_{action}"
-        requests = self.user_requests[user_key]
-        
-        if not requests:
+        now = self.clock()
+        tat = self._tats.get((user_id, action))
+        if tat is None or tat <= now:
             return None
         
-        # Время самого старого запроса + окно
-        oldest_request = min(requests)
-        return datetime.fromtimestamp(oldest_request + limit['window'])
+        return datetime.now() + timedelta(seconds=tat - now)
     
-    def _cleanup_old_requests(self, user_id: int, cutoff_time: float):
-        """Очищает старые запросы"""
-        for action in self.limits.keys():
-            user_key = f"{user_id}_{action}"
-            requests = self.user_requests[user_key]
-            self.user_requests[user_key] = [req for req in requests if req > cutoff_time]
+    def _evict_idle(self, now: float):
+        """
+        Удаляет ключи, лимит которых уже полностью восстановился
+        
+        Ключи упорядочены по последнему использованию, поэтому проход идет
+        с начала и останавливается на первом активном ключе: все ключи,
+        не использованные дольше самого длинного окна, гарантированно удаляются.
+        """
+        while self._tats:
+            key, tat = next(iter(self._tats.items()))
+            if tat > now:
+                break
+            del self._tats[key]
+        self._next_cleanup = now + self.cleanup_interval
     
     def reset_user_limits(self, user_id: int):
         """Сбрасывает все лимиты для пользователя"""
-        for action in self.limits.keys():
-            user_key = f"{user_id}_{action}"
-            self.user_requests[user_key] = []
+        for action in self.limits:
+            key = (user_id, action)
+            self._tats.pop(key, None)
+            if self.backend is not None:
+                self._pending.pop(key, None)
+                self._pending_resets.add(key)
+        if self.backend is not None:
+            self._schedule_sync()
+    
+    def set_backend(self, backend: Optional[RateLimitBackend], sync_interval: Optional[float] = None):
+        """Подключить общее хранилище лимитов (None — только память процесса)"""
+        self.backend = backend
+        if sync_interval is not None:
+            self.sync_interval = sync_interval
+    
+    async def sync(self):
+        """Отправить накопленный расход бэкенду и подтянуть общие TAT"""
+        async with self._sync_lock:
+            if self.backend is None or not (self._pending or self._pending_resets):
+                return
+            batch, self._pending = self._pending, {}
+            resets, self._pending_resets = self._pending_resets, set()
+            try:
+                if resets:
+                    await self.backend.reset(resets)
+                if not batch:
+                    return
+                windows = {key: (cost, self.limits[key[1]]['window']) for key, cost in batch.items()}
+                tats = await self.backend.sync(windows, time.time())
+            except Exception as e:
+                logger.error(f"❌ Ошибка синхронизации лимитов ({len(batch)} шт.): {e}")
+                # Расход не потерян: отправится со следующим пакетом
+                for key, cost in batch.items():
+                    self._pending[key] = self._pending.get(key, 0.0) + cost
+                self._pending_resets |= resets
+                return
+            
+            now_wall, now = time.time(), self.clock()
+            for key, tat_wall in tats.items():
+                # Общий TAT в часы процесса; не дальше одного окна вперед
+                tat = min(tat_wall - now_wall + now, now + windows[key][1])
+                if tat > self._tats.get(key, now):
+                    self._tats[key] = tat
+    
+    async def close(self):
+        """Остановить фоновую синхронизацию и отправить остаток"""
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+        await self.sync()
+        if self.backend is not None:
+            await self.backend.close()
+    
+    def _schedule_sync(self):
+        if self._sync_task is not None and not self._sync_task.done():
+            return
+        try:
+            self._sync_task = asyncio.get_running_loop().create_task(self._sync_loop())
+        except RuntimeError:
+            # Вызов вне event loop (скрипты): расход отправится при следующем вызове в loop
+            pass
+    
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            await self.sync()
+    
+    def get_stats(self) -> dict:
+        """Размер хранилища лимитов"""
+        return {'keys': len(self._tats), 'max_keys': self.max_keys}
 
 class SpamProtection:
     """Система защиты от спама"""
     
-    def __init__(self):
+    def __init__(self, max_suspicious: int = 10000, suspicion_window: float = 600):
         self.rate_limiter = RateLimiter()
-        self.suspicious_users: Dict[int, Dict] = defaultdict(dict)
+        self.block_list = BlockList()
+        # Счетчики нарушений за окно suspicion_window от первой ошибки; новые ошибки окно не продлевают
+        self.suspicious_users = TTLCache(maxsize=max_suspicious, ttl=suspicion_window)
         
-        # Пороги для подозрительной активности
+        # Пороги для подозрительной активности (за окно)
         self.suspicion_thresholds = {
             'repeated_errors': 5,  # 5 ошибок подряд
-            'rapid_requests': 20,  # 20 запросов за короткое время
             'invalid_inputs': 10,  # 10 неверных вводов
         }
+        
+        # Длительность временной блокировки по причине (секунды)
+        self.block_durations = {
+            'repeated_errors': 600,  # 10 минут
+            'rapid_requests': 900,   # 15 минут (превышение throttle_strike)
+            'invalid_inputs': 600,   # 10 минут
+        }
     
     def check_message_spam(self, user_id: int, message_text: str) -> Dict[str, any]:
         """
@@ -139,6 +293,28 @@ class SpamProtection:
             user_id: ID пользователя
             message_text: Текст сообщения
             
+        Returns:
+            Результат проверки
+        """
+        # Проверяем rate limiting
+        if not self.rate_limiter.is_allowed(user_id, 'message'):
+            return {
+                'is_spam': True,
+                'reason': 'rate_limit_exceeded',
+                'action': 'block'
+            }
+        
+        return self.check_message_content(message_text)
+    
+    def check_message_content(self, message_text: str) -> Dict[str, any]:
+        """
+        Проверяет текст сообщения на спам без учета частоты
+        
+        Частоту проверяет ThrottlingMiddleware до хендлера.
+        
+        Args:
+            message_text: Текст сообщения
+            
         Returns:
             Результат проверки
         """
@@ -147,28 +323,23 @@ class SpamProtection:
             'reason': None,
             'action': 'allow'
         }
-        
-        # Проверяем rate limiting
-        if not self.rate_limiter.is_allowed(user_id, 'message'):
-            result['is_spam'] = True
-            result['reason'] = 'rate_limit_exceeded'
-            result['action'] = 'block'
-            return result
+        # Все признаки за один проход по тексту
+        signals = analyze_text(message_text)
         
         # Проверяем на повторяющиеся символы
-        if self._has_repeated_chars(message_text):
+        if signals.repeated_chars:
             result['is_spam'] = True
             result['reason'] = 'repeated_characters'
             result['action'] = 'warn'
         
         # Проверяем на капс
-        if self._is_all_caps(message_text):
+        if signals.all_caps:
             result['is_spam'] = True
             result['reason'] = 'all_caps'
             result['action'] = 'warn'
         
         # Проверяем на ссылки
-        if self._contains_links(message_text):
+        if signals.links:
             result['is_spam'] = True
             result['reason'] = 'contains_links'
             result['action'] = 'block'
@@ -210,65 +381,40 @@ class SpamProtection:
     
     def record_error(self, user_id: int, error_type: str):
         """Записывает ошибку пользователя"""
-        if user_id not in self.suspicious_users:
-            self.suspicious_users[user_id] = {
+        user_data = self.suspicious_users.get(user_id)
+        if user_data is None:
+            user_data = {
                 'repeated_errors': 0,
-                'rapid_requests': 0,
                 'invalid_inputs': 0,
                 'last_error_time': None
             }
-        
-        user_data = self.suspicious_users[user_id]
-        current_time = time.time()
+            # Срок жизни отсчитывается от первой ошибки; дальше словарь меняется на месте
+            self.suspicious_users.set(user_id, user_data)
         
         # Увеличиваем счетчик ошибок
         if error_type in user_data:
             user_data[error_type] += 1
         
-        user_data['last_error_time'] = current_time
+        user_data['last_error_time'] = time.time()
         
         # Проверяем на подозрительную активность
-        if user_data['repeated_errors'] >= self.suspicion_thresholds['repeated_errors']:
-            # Временно блокируем пользователя
-            self._temporary_block(user_id, 'repeated_errors')
-    
-    def _has_repeated_chars(self, text: str) -> bool:
-        """Проверяет на повторяющиеся символы"""
-        if len(text) < 3:
-            return False
-        
-        for i in range(len(text) - 2):
-            if text[i] == text[i+1] == text[i+2]:
-                return True
-        return False
-    
-    def _is_all_caps(self, text: str) -> bool:
-        """Проверяет на капс"""
-        if len(text) < 5:
-            return False
-        
-        letters = [c for c in text if c.isalpha()]
-        if not letters:
-            return False
-        
-        return all(c.isupper() for c in letters)
-    
-    def _contains_links(self, text: str) -> bool:
-        """Проверяет на наличие ссылок"""
-        import re
-        url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-        return bool(re.search(url_pattern, text))
+        for reason, threshold in self.suspicion_thresholds.items():
+            if user_data[reason] >= threshold:
+                # Временно блокируем пользователя
+                self.block_user(user_id, reason)
+                break
     
-    def _temporary_block(self, user_id: int, reason: str):
+    def block_user(self, user_id: int, reason: str):
         """Временно блокирует пользователя"""
-        # Здесь можно добавить логику временной блокировки
-        # Например, добавить в базу данных или кэш
-        print(f"Temporary block for user {user_id} due to {reason}")
+        duration = self.block_durations.get(reason, 600)
+        self.block_list.block(user_id, duration, reason)
+        # Счетчики начинаются заново после блокировки
+        self.suspicious_users.pop(user_id)
+        logger.warning(f"🚫 Пользователь {user_id} заблокирован на {duration} с: {reason}")
     
     def is_user_blocked(self, user_id: int) -> bool:
         """Проверяет, заблокирован ли пользователь"""
-        # Здесь можно добавить проверку блокировки
-        return False
+        return self.block_list.is_blocked(user_id)
 
 # Глобальный экземпляр
 spam_protection = SpamProtection() 
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Анализ текста на признаки спама скомпилированными выражениями
+"""
+
+import re
+from typing import NamedTuple
+
+# Ссылки, HTML, упоминания и хэштеги — одно выражение. Каждая ветка начинается
+# с литерала (h, <, @, #), поэтому re пропускает остальные символы без попыток
+# сопоставления. Кроме ссылки, ветки поглощают только свой литерал (остальное —
+# lookahead), чтобы ссылка внутри тега или сразу после хэштега не терялась
+MARKUP_PATTERN = re.compile(
+    r"h(?P<link>ttps?://(?:[a-zA-Z0-9$-_@.&+!*(),]|%[0-9a-fA-F]{2})+)"
+    r"|<(?P<html>(?=[^>]+>))"
+    r"|@(?P<mention>(?=\w))"
+    r"|#(?P<hashtag>(?=\w))"
+)
+
+# Три одинаковых символа подряд (включая пробелы и переводы строк)
+REPEAT_PATTERN = re.compile(r"(.)\1\1", re.DOTALL)
+
+HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Капс проверяется только у сообщений не короче этого
+CAPS_MIN_LENGTH = 5
+
+class TextSignals(NamedTuple):
+    """Признаки спама в тексте"""
+    links: int = 0
+    mentions: int = 0
+    hashtags: int = 0
+    html_tags: int = 0
+    repeated_chars: bool = False
+    all_caps: bool = False
+
+    @property
+    def has_markup(self) -> bool:
+        return bool(self.links or self.mentions or self.hashtags or self.html_tags)
+
+NO_SIGNALS = TextSignals()
+
+def analyze_text(text: str) -> TextSignals:
+    """
+    Все признаки спама в тексте.
+
+    Строка просматривается двумя скомпилированными выражениями и str.isupper,
+    без цикла по символам в Python. Капс — все буквы с регистром заглавные;
+    буквы без регистра не учитываются.
+    """
+    if not text:
+        return NO_SIGNALS
+
+    counts = {'link': 0, 'html': 0, 'mention': 0, 'hashtag': 0}
+    for match in MARKUP_PATTERN.finditer(text):
+        counts[match.lastgroup] += 1
+
+    return TextSignals(
+        links=counts['link'],
+        mentions=counts['mention'],
+        hashtags=counts['hashtag'],
+        html_tags=counts['html'],
+        repeated_chars=REPEAT_PATTERN.search(text) is not None,
+        all_caps=len(text) >= CAPS_MIN_LENGTH and text.isupper()
+    )
+
+def has_markup(text: str) -> bool:
+    """Есть ли в тексте ссылки, упоминания, хэштеги или HTML (до первого совпадения)"""
+    return MARKUP_PATTERN.search(text) is not None
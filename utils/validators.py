@@ -2,8 +2,8 @@
 Система валидации данных для безопасности
 """
 
-import re
 from typing import Optional, Tuple, List
+from utils.text_analysis import has_markup, HTML_TAG_PATTERN, WHITESPACE_PATTERN
 from config import MIN_AGE, MAX_AGE, MIN_HEIGHT, MAX_HEIGHT, MIN_WEIGHT, MAX_WEIGHT, GENDERS, MARITAL_STATUSES, INTERESTS
 
 class ValidationError(Exception):
@@ -133,17 +133,9 @@ def validate_bio(bio: str) -> Tuple[bool, Optional[str]]:
     if len(bio) > 500:
         return False, "Описание не должно превышать 500 символов"
     
-    # Проверяем на запрещенные символы
-    forbidden_patterns = [
-        r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+',
-        r'@\w+',
-        r'#\w+',
-        r'<[^>]+>'
-    ]
-    
-    for pattern in forbidden_patterns:
-        if re.search(pattern, bio):
-            return False, "Описание содержит запрещенные символы или ссылки"
+    # Проверяем на ссылки, упоминания, хэштеги и HTML (одно выражение)
+    if has_markup(bio):
+        return False, "Описание содержит запрещенные символы или ссылки"
     
     return True, None
 
@@ -161,10 +153,10 @@ def sanitize_text(text: str) -> str:
         return ""
     
     # Удаляем HTML теги
-    text = re.sub(r'<[^>]+>', '', text)
+    text = HTML_TAG_PATTERN.sub('', text)
     
     # Удаляем множественные пробелы
-    text = re.sub(r'\s+', ' ', text)
+    text = WHITESPACE_PATTERN.sub(' ', text)
     
     # Обрезаем пробелы
     text = text.strip()